@@ -0,0 +1,262 @@
+"""
+임계값 알림 - 지표별 정렬 임계값 색인으로 스냅샷마다 O(log n + 발생 건수) 평가, 대기열을 통해 비동기 발송
+"""
+
+import math
+import time
+import queue
+import itertools
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from structured_log import get_logger
+from config import (
+    ALERT_METRICS,
+    ALERT_MAX_COUNT,
+    ALERT_DEFAULT_COOLDOWN_SECONDS,
+    ALERT_WEBHOOK_URL,
+    ALERT_WEBHOOK_TIMEOUT,
+    ALERT_QUEUE_SIZE,
+    ALERT_RECENT_EVENTS
+)
+
+# cross_above/cross_below: 직전 값 → 현재 값 사이에서 임계값을 지날 때
+# above/below: 현재 값이 임계값보다 클/작을 때 (쿨다운 간격으로 반복)
+CONDITIONS = ("cross_above", "cross_below", "above", "below")
+
+log = get_logger("alerts")
+
+
+class ThresholdIndex:
+    """임계값 오름차순 정렬 배열 + 같은 위치의 알림 ID"""
+
+    def __init__(self):
+        self.thresholds = []
+        self.ids = []
+
+    def add(self, threshold, alert_id):
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.ids.insert(i, alert_id)
+
+    def remove(self, threshold, alert_id):
+        i = bisect_left(self.thresholds, threshold)
+        while i < len(self.ids) and self.thresholds[i] == threshold:
+            if self.ids[i] == alert_id:
+                del self.thresholds[i]
+                del self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def match(self, condition, previous, value):
+        """조건을 만족하는 알림 ID 구간"""
+        th = self.thresholds
+        if condition == "cross_above":
+            if previous is None or value <= previous:
+                return []
+            lo, hi = bisect_right(th, previous), bisect_right(th, value)      # previous < t <= value
+        elif condition == "cross_below":
+            if previous is None or value >= previous:
+                return []
+            lo, hi = bisect_left(th, value), bisect_left(th, previous)        # value <= t < previous
+        elif condition == "above":
+            lo, hi = 0, bisect_left(th, value)                                # t < value
+        else:
+            lo, hi = bisect_right(th, value), len(th)                         # t > value
+        return self.ids[lo:hi]
+
+
+_alerts = {}            # 알림 ID -> 알림 dict
+_indexes = {}           # (지표, 조건) -> ThresholdIndex
+_previous = {}          # (지표, 대상) -> 직전 값
+_ids = itertools.count(1)
+_lock = threading.Lock()
+
+_queue = queue.Queue(maxsize=ALERT_QUEUE_SIZE)
+_events = deque(maxlen=ALERT_RECENT_EVENTS)
+_stats = {"evaluations": 0, "fired": 0, "suppressed": 0, "dropped": 0, "delivered": 0, "delivery_failed": 0}
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def register_alert(metric, condition, threshold, subject=None, cooldown_seconds=None, label=None):
+    """알림 등록 - subject: 종목코드 등 대상 한정 (None이면 전체)"""
+    if metric not in ALERT_METRICS:
+        raise ValueError(f"지원하지 않는 지표: {metric} (가능: {', '.join(ALERT_METRICS)})")
+    if condition not in CONDITIONS:
+        raise ValueError(f"지원하지 않는 조건: {condition} (가능: {', '.join(CONDITIONS)})")
+    threshold = float(threshold)
+    if not math.isfinite(threshold):
+        raise ValueError("threshold 는 유한한 숫자여야 합니다")
+    cooldown_seconds = ALERT_DEFAULT_COOLDOWN_SECONDS if cooldown_seconds is None else float(cooldown_seconds)
+    if not math.isfinite(cooldown_seconds) or cooldown_seconds < 0:
+        raise ValueError("cooldown_seconds 는 0 이상의 유한한 숫자여야 합니다")
+
+    alert = {
+        "id": next(_ids),
+        "metric": metric,
+        "condition": condition,
+        "threshold": threshold,
+        "subject": subject,
+        "cooldown_seconds": cooldown_seconds,
+        "label": label,
+        "created_at": time.time(),
+        "last_fired_at": None,
+        "last_value": None,
+        "fire_count": 0
+    }
+
+    with _lock:
+        if len(_alerts) >= ALERT_MAX_COUNT:
+            raise ValueError(f"알림은 최대 {ALERT_MAX_COUNT}개까지 등록할 수 있습니다")
+        _alerts[alert["id"]] = alert
+        index = _indexes.get((metric, condition))
+        if index is None:
+            index = _indexes[(metric, condition)] = ThresholdIndex()
+        index.add(alert["threshold"], alert["id"])
+    return dict(alert)
+
+
+def remove_alert(alert_id):
+    """알림 삭제"""
+    with _lock:
+        alert = _alerts.pop(alert_id, None)
+        if alert is None:
+            return False
+        _indexes[(alert["metric"], alert["condition"])].remove(alert["threshold"], alert_id)
+        return True
+
+
+def list_alerts():
+    """등록된 알림 목록"""
+    with _lock:
+        return [dict(alert) for alert in _alerts.values()]
+
+
+def evaluate_metric(metric, value, subject=None, ts=None):
+    """지표 값 1건 평가 - 발생한 알림 이벤트 목록 반환 (발송은 대기열에서 비동기 처리)"""
+    if value is None:
+        return []
+
+    ts = ts or time.time()
+    value = float(value)
+    fired = []
+
+    with _lock:
+        _stats["evaluations"] += 1
+        previous = _previous.get((metric, subject))
+        _previous[(metric, subject)] = value
+
+        for condition in CONDITIONS:
+            index = _indexes.get((metric, condition))
+            if index is None:
+                continue
+
+            for alert_id in index.match(condition, previous, value):
+                alert = _alerts[alert_id]
+                if alert["subject"] is not None and alert["subject"] != subject:
+                    continue
+
+                # 쿨다운 중이거나 직전 발송과 같은 값(같은 스냅샷 재평가)이면 중복으로 보고 생략
+                in_cooldown = alert["last_fired_at"] is not None and ts - alert["last_fired_at"] < alert["cooldown_seconds"]
+                if in_cooldown or alert["last_value"] == value:
+                    _stats["suppressed"] += 1
+                    continue
+
+                alert["last_fired_at"] = ts
+                alert["last_value"] = value
+                alert["fire_count"] += 1
+                fired.append({
+                    "alert_id": alert_id,
+                    "label": alert["label"],
+                    "metric": metric,
+                    "condition": alert["condition"],
+                    "threshold": alert["threshold"],
+                    "subject": subject,
+                    "value": value,
+                    "previous": previous,
+                    "ts": ts
+                })
+
+        _stats["fired"] += len(fired)
+
+    for event in fired:
+        _enqueue(event)
+    return fired
+
+
+def evaluate_premium_snapshot(premium_data):
+    """금 프리미엄 조회 결과 → 프리미엄/환율/환율 변동률 알림 평가"""
+    with _lock:
+        previous_rate = _previous.get(("usd_krw_rate", None))
+
+    events = evaluate_metric("premium_percentage", premium_data.get('premium_percentage'))
+
+    rate = premium_data.get('usd_krw_rate')
+    if rate and rate != previous_rate:
+        events += evaluate_metric("usd_krw_rate", rate)
+        if previous_rate:
+            events += evaluate_metric("fx_move_pct", abs(rate - previous_rate) / previous_rate * 100)
+    return events
+
+
+def _enqueue(event):
+    _ensure_worker()
+    try:
+        _queue.put_nowait(event)
+    except queue.Full:
+        with _lock:
+            _stats["dropped"] += 1
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_deliver_loop, daemon=True)
+            _worker.start()
+
+
+def _deliver_loop():
+    """발송 대기열 처리 - ALERT_WEBHOOK_URL(운영자 설정)로만 발송, 없으면 최근 이벤트 목록(로컬 sink)에만 보관
+
+    발송 주소는 API로 지정할 수 없고, 실패 사유는 조회 API에 노출하지 않고 서버 로그에만 남김
+    """
+    import requests
+
+    while True:
+        event = _queue.get()
+        event["delivered_to"] = "webhook" if ALERT_WEBHOOK_URL else "local"
+
+        if ALERT_WEBHOOK_URL:
+            try:
+                response = requests.post(ALERT_WEBHOOK_URL, json=event, timeout=ALERT_WEBHOOK_TIMEOUT)
+                response.raise_for_status()
+                event["delivery"] = "ok"
+            except Exception as e:
+                event["delivery"] = "failed"
+                log.warning("알림 발송 실패 (#%d): %s", event["alert_id"], e, extra={"alert_id": event["alert_id"]})
+        else:
+            event["delivery"] = "ok"
+
+        with _lock:
+            _stats["delivered" if event["delivery"] == "ok" else "delivery_failed"] += 1
+            _events.append(event)
+
+
+def get_alert_events(n=None):
+    """최근 발송된 알림 이벤트 (최신 순)"""
+    with _lock:
+        events = list(_events)
+    events.reverse()
+    return events[:n] if n else events
+
+
+def get_alert_stats():
+    """알림 평가/발송 통계"""
+    with _lock:
+        return {**_stats, "alerts": len(_alerts), "queued": _queue.qsize()}
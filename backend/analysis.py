@@ -3,9 +3,15 @@
 """
 
 import datetime
+import threading
 import numpy as np
 import pandas as pd
 
+import metrics
+from tracing import traced
+from structured_log import get_logger
+from config import KOREAN_GOLD_ETFS, GOLD_ETF_CODES, ETF_ANALYSIS_WINDOW
+
 try:
     import cot_reports
     COT_AVAILABLE = True
@@ -13,6 +19,13 @@ except ImportError:
     COT_AVAILABLE = False
     print("COT reports 라이브러리가 없습니다. COT 분석은 건너뜁니다.")
 
+log = get_logger("analysis")
+
+# ETF 롤링 모멘트 / 분석 결과 캐시
+_etf_moments = None
+_etf_analysis_cache = {"key": None, "result": None}
+_etf_lock = threading.Lock()
+
 
 def analyze_cot_positions():
     """COT 보고서 분석 - 금 선물 포지션"""
@@ -38,7 +51,7 @@ def analyze_cot_positions():
         }
         
     except Exception as e:
-        print(f"COT 분석 오류: {e}")
+        log.warning("COT 분석 오류: %s", e)
         return None
 
 
@@ -57,44 +70,166 @@ def get_cot_market_signal(commercial_net, large_spec_net):
         return {"signal": "중립", "reason": "명확한 방향성 없음"}
 
 
+def _update_rolling_moments(returns):
+    """로그수익률 누적합(1차/2차 모멘트) 증분 갱신 - 변경된 행부터만 다시 누적"""
+    global _etf_moments
+    
+    labels = list(returns.columns)
+    index = returns.index
+    values = returns.to_numpy(dtype=float)
+    
+    start = 0
+    state = _etf_moments
+    if state and state["labels"] == labels:
+        old_index, old_values = state["index"], state["values"]
+        n = min(len(old_index), len(index))
+        unchanged = (old_index[:n] == index[:n]) & np.all(old_values[:n] == values[:n], axis=1)
+        changed = np.flatnonzero(~unchanged)
+        start = int(changed[0]) if changed.size else n
+    
+    if start == 0:
+        sum_x = np.zeros((1, len(labels)))
+        sum_xy = np.zeros((1, len(labels), len(labels)))
+    else:
+        sum_x = state["sum_x"][:start + 1]
+        sum_xy = state["sum_xy"][:start + 1]
+    
+    new_rows = values[start:]
+    if len(new_rows):
+        # 행 단위 외적을 한 번에 계산 후 이전 누적값에 이어 붙임
+        sum_x = np.vstack([sum_x, sum_x[-1] + np.cumsum(new_rows, axis=0)])
+        sum_xy = np.concatenate([sum_xy, sum_xy[-1] + np.cumsum(new_rows[:, :, None] * new_rows[:, None, :], axis=0)])
+    
+    _etf_moments = {
+        "labels": labels,
+        "index": index,
+        "values": values,
+        "sum_x": sum_x,
+        "sum_xy": sum_xy
+    }
+    return _etf_moments
+
+
+def calculate_window_statistics(sum_x, sum_xy, window):
+    """누적합에서 최근 window 구간의 평균/공분산/상관계수 행렬 계산"""
+    s_x = sum_x[-1] - sum_x[-1 - window]
+    s_xy = sum_xy[-1] - sum_xy[-1 - window]
+    
+    covariance = (s_xy - np.outer(s_x, s_x) / window) / (window - 1)
+    std = np.sqrt(np.clip(np.diag(covariance), 0, None))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(std, std)
+    
+    return covariance, np.nan_to_num(correlation)
+
+
+@traced("analysis.etf")
+def get_korean_gold_etf_analysis(etf_codes=None, window=None):
+    """한국 금 ETF × 국내/국제 금 롤링 상관계수/베타/추적오차 (새 일봉이 있을 때만 재계산)"""
+    from etf_data import get_etf_price_frame, GOLD_BENCHMARKS
+    
+    etf_codes = etf_codes or GOLD_ETF_CODES
+    window = ETF_ANALYSIS_WINDOW if window is None else window
+    if window < 2:
+        # 표본 공분산은 window - 1 로 나누므로 최소 2
+        raise ValueError(f"window는 2 이상이어야 합니다: {window}")
+    
+    frame = get_etf_price_frame(etf_codes)
+    benchmarks = [key for key in GOLD_BENCHMARKS if key in frame.columns]
+    codes = [code for code in etf_codes if code in frame.columns]
+    
+    if not benchmarks or not codes or len(frame) <= window:
+        return {"error": "ETF 분석에 필요한 시세 이력이 부족합니다", "window": window, "etfs": []}
+    
+    # 과거 일봉이 수정돼도(같은 마지막 행) 재계산하도록 전체 입력 해시를 키에 포함
+    frame_hash = int(pd.util.hash_pandas_object(frame, index=True).sum())
+    cache_key = (tuple(frame.columns), len(frame), frame_hash, window)
+    with _etf_lock:
+        if _etf_analysis_cache["key"] == cache_key:
+            metrics.cache_hit("etf_analysis")
+            return {**_etf_analysis_cache["result"], "cached": True}
+        metrics.cache_miss("etf_analysis")
+        
+        returns = np.log(frame).diff().dropna()
+        moments = _update_rolling_moments(returns)
+        covariance, correlation = calculate_window_statistics(moments["sum_x"], moments["sum_xy"], window)
+    
+    labels = moments["labels"]
+    etf_idx = np.array([labels.index(code) for code in codes])
+    gold_idx = np.array([labels.index(key) for key in benchmarks])
+    
+    # ETF(N) × 벤치마크(M) 행렬을 한 번에 계산
+    cov_eg = covariance[np.ix_(etf_idx, gold_idx)]
+    var_e = np.diag(covariance)[etf_idx][:, None]
+    var_g = np.diag(covariance)[gold_idx][None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = np.nan_to_num(cov_eg / var_g)
+    tracking_error = np.sqrt(np.clip(var_e + var_g - 2 * cov_eg, 0, None)) * np.sqrt(252) * 100
+    corr_eg = correlation[np.ix_(etf_idx, gold_idx)]
+    
+    primary = benchmarks.index("international_gold") if "international_gold" in benchmarks else 0
+    last_prices = frame.iloc[-1]
+    
+    etf_analysis = []
+    for row, code in enumerate(codes):
+        corr_with_gold = round(float(corr_eg[row, primary]), 3)
+        etf_analysis.append({
+            "code": code,
+            "name": get_etf_name(code),
+            "last_price": float(last_prices[code]),
+            "correlation_with_gold": corr_with_gold,
+            "correlation": {key: round(float(corr_eg[row, col]), 3) for col, key in enumerate(benchmarks)},
+            "beta": {key: round(float(beta[row, col]), 3) for col, key in enumerate(benchmarks)},
+            "tracking_error": {key: round(float(tracking_error[row, col]), 2) for col, key in enumerate(benchmarks)},
+            "recommendation": get_etf_recommendation(corr_with_gold)
+        })
+    
+    result = {
+        "as_of": frame.index[-1].strftime('%Y-%m-%d'),
+        "window": window,
+        "observations": len(returns),
+        "benchmarks": benchmarks,
+        "etfs": etf_analysis,
+        "correlation_matrix": {
+            "labels": labels,
+            "values": np.round(correlation, 3).tolist()
+        },
+        "cached": False
+    }
+    
+    with _etf_lock:
+        _etf_analysis_cache["key"] = cache_key
+        _etf_analysis_cache["result"] = result
+    
+    return result
+
+
 def analyze_korean_gold_etfs():
     """한국 금 관련 ETF 분석"""
     try:
-        # 주요 금 ETF 티커들
-        gold_etfs = [
-            "132030",  # KODEX 골드선물(H)
-            "114800",  # KODEX 인버스
-            "261220",  # KODEX 골드선물인버스2X
-        ]
-        
-        etf_analysis = []
-        
-        for etf_code in gold_etfs:
-            # 여기서는 실제 ETF 데이터를 조회해야 하지만
-            # 예시로 구조만 제공
-            etf_data = {
-                "code": etf_code,
-                "name": get_etf_name(etf_code),
-                "correlation_with_gold": "분석 필요",  # 실제로는 가격 데이터로 상관관계 계산
-                "recommendation": "분석 필요"
-            }
-            etf_analysis.append(etf_data)
-        
-        return etf_analysis
+        return get_korean_gold_etf_analysis().get("etfs", [])
         
     except Exception as e:
-        print(f"한국 금 ETF 분석 오류: {e}")
+        log.warning("한국 금 ETF 분석 오류: %s", e)
         return []
 
 
 def get_etf_name(code):
     """ETF 코드로 이름 반환"""
-    etf_names = {
-        "132030": "KODEX 골드선물(H)",
-        "114800": "KODEX 인버스",
-        "261220": "KODEX 골드선물인버스2X"
-    }
-    return etf_names.get(code, f"ETF {code}")
+    return KOREAN_GOLD_ETFS.get(code, f"ETF {code}")
+
+
+def get_etf_recommendation(correlation):
+    """금 상관계수 기반 ETF 활용 추천"""
+    if correlation >= 0.8:
+        return "금 가격 추종 - 금 투자 대체 수단으로 활용 가능"
+    elif correlation <= -0.8:
+        return "금 가격 역추종 - 금 하락 헤지 수단으로 활용 가능"
+    elif abs(correlation) >= 0.5:
+        return "금 연동성 보통 - 보조 수단으로만 고려"
+    else:
+        return "금 연동성 낮음 - 금 대체 수단으로 부적합"
 
 
 def calculate_volatility(prices, window=20):
@@ -112,10 +247,11 @@ def calculate_volatility(prices, window=20):
         return round(volatility * 100, 2)  # 퍼센트로 변환
         
     except Exception as e:
-        print(f"변동성 계산 오류: {e}")
+        log.warning("변동성 계산 오류: %s", e)
         return None
 
 
+@traced("analysis.comprehensive")
 def generate_comprehensive_analysis(premium_data):
     """현물 프리미엄 중심 종합 분석 (단순화)"""
     try:
@@ -144,7 +280,7 @@ def generate_comprehensive_analysis(premium_data):
         return analysis
         
     except Exception as e:
-        print(f"종합 분석 생성 오류: {e}")
+        log.warning("종합 분석 생성 오류: %s", e)
         return {"error": f"분석 생성 실패: {str(e)}"}
 
 
@@ -206,7 +342,7 @@ def generate_simple_trading_signals(premium):
         return signals
         
     except Exception as e:
-        print(f"매매 신호 생성 오류: {e}")
+        log.warning("매매 신호 생성 오류: %s", e)
         return []
 
 
@@ -235,7 +371,7 @@ def generate_premium_recommendations(premium):
         return recommendations
         
     except Exception as e:
-        print(f"추천사항 생성 오류: {e}")
+        log.warning("추천사항 생성 오류: %s", e)
         return ["전문가와 상담 후 투자하시기 바랍니다."]
 
 
@@ -296,7 +432,7 @@ def generate_trading_signals(london_data, domestic_data, premium_data, cot_data)
         return signals
         
     except Exception as e:
-        print(f"매매 신호 생성 오류: {e}")
+        log.warning("매매 신호 생성 오류: %s", e)
         return []
 
 
@@ -326,5 +462,5 @@ def generate_recommendations(premium_data, cot_data):
         return recommendations
         
     except Exception as e:
-        print(f"추천사항 생성 오류: {e}")
+        log.warning("추천사항 생성 오류: %s", e)
         return ["투자 전 전문가와 상담하시기 바랍니다."]
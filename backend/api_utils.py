@@ -2,33 +2,94 @@
 공통 API 유틸리티 함수들
 """
 
+import time
 import requests
+import cassette
+import circuit_breaker
+import deadline
+import hedging
+import metrics
+import tracing
+from structured_log import get_logger
 from config import (
     EXCHANGE_RATE_API_KEY, 
     KIS_APP_KEY, 
     KIS_APP_SECRET,
     KIS_TOKEN_URL,
+    KIS_APPROVAL_URL,
     NAVER_GOLD_URL,
     EXCHANGE_RATE_URL,
+    UPSTREAM_TIMEOUT_SECONDS,
     NAVER_GOLD_INTERNATIONAL_CHART_URL,
     NAVER_GOLD_INTERNATIONAL_MARKET_URL,
     NAVER_GOLD_DOMESTIC_CHART_URL,
-    NAVER_GOLD_DOMESTIC_MARKET_URL
+    NAVER_GOLD_DOMESTIC_MARKET_URL,
+    NAVER_METAL_CHART_URL,
+    NAVER_METAL_MARKET_URL
 )
 
+log = get_logger("api_utils")
+
 
 def api_call(url, headers=None, json_data=None):
-    """API 호출 공통 함수"""
+    """API 호출 공통 함수 (카세트 기록 모드면 응답을 기록, 재생 모드면 기록된 응답 반환)
+
+    요청 기한이 있으면 남은 시간만 타임아웃으로 쓰고, 이미 지났으면 호출하지 않고 None.
+    외부 API 차단기가 열려 있거나 같은 요청이 방금 실패했어도 호출하지 않고 None
+    """
+    method = "POST" if json_data else "GET"
+    if cassette.replaying():
+        return cassette.replay(method, url)
+    
+    upstream, endpoint = metrics.classify_upstream(url, headers)
+    timeout = deadline.timeout_for(UPSTREAM_TIMEOUT_SECONDS)
+    if timeout <= 0:
+        metrics.DEADLINE_SKIPS.inc(upstream, endpoint)
+        log.debug("요청 기한 초과 - 호출 생략: %s %s", upstream, endpoint)
+        return None
+    
+    if circuit_breaker.recently_failed(method, url):
+        circuit_breaker.CIRCUIT_REJECTED.inc(upstream, "negative_cache")
+        return None
+    breaker = circuit_breaker.get_breaker(upstream)
+    if not breaker.allow():
+        circuit_breaker.CIRCUIT_REJECTED.inc(upstream, "open")
+        return None
+    
+    started = time.perf_counter()
+    payload, error, status = None, None, None
     try:
         if json_data:
-            response = requests.post(url, headers=headers, json=json_data)
+            response = requests.post(url, headers=headers, json=json_data, timeout=timeout)
         else:
-            response = requests.get(url, headers=headers)
+            response = requests.get(url, headers=headers, timeout=timeout)
+        status = response.status_code
         response.raise_for_status()
-        return response.json()
+        payload = response.json()
     except requests.exceptions.RequestException as e:
-        print(f"API 호출 실패: {e}")
-        return None
+        # 예외 메시지에는 인증키가 포함된 URL이 들어 있으므로 예외 종류/상태 코드만 남김
+        error = f"{type(e).__name__} (HTTP {status})" if status else type(e).__name__
+    
+    elapsed = time.perf_counter() - started
+    
+    # 4xx는 요청 문제이므로 외부 API 장애로 보지 않음, 요청 기한으로 끊긴 호출은 판단 보류
+    if error is None or (status and 400 <= status < 500):
+        breaker.record(True)
+    elif deadline.expired():
+        breaker.record(None)
+    else:
+        breaker.record(False)
+        circuit_breaker.remember_failure(method, url)
+    
+    metrics.observe_upstream(upstream, endpoint, elapsed, error is None)
+    tracing.record_span(f"{upstream}.{endpoint}", started, elapsed)
+    if error:
+        log.warning("API 호출 실패: %s %s - %s", upstream, endpoint, error, extra={
+            "url": cassette.normalize_url(url), "status": status, "elapsed_ms": round(elapsed * 1000, 1)
+        })
+    if cassette.recording():
+        cassette.record(method, url, payload, error, elapsed)
+    return payload
 
 
 def get_kis_token():
@@ -42,91 +103,159 @@ def get_kis_token():
     
     response = api_call(KIS_TOKEN_URL, headers, data)
     if response and response.get('access_token'):
+        metrics.TOKEN_REFRESHES.inc("access_token", "ok")
         return response['access_token']
+    metrics.TOKEN_REFRESHES.inc("access_token", "error")
+    return None
+
+
+def get_kis_approval_key():
+    """KIS 실시간(WebSocket) 접속키 발급"""
+    headers = {"content-type": "application/json"}
+    data = {
+        "grant_type": "client_credentials",
+        "appkey": KIS_APP_KEY,
+        "secretkey": KIS_APP_SECRET
+    }
+    
+    response = api_call(KIS_APPROVAL_URL, headers, data)
+    if response and response.get('approval_key'):
+        metrics.TOKEN_REFRESHES.inc("approval_key", "ok")
+        return response['approval_key']
+    metrics.TOKEN_REFRESHES.inc("approval_key", "error")
+    return None
+
+
+def get_naver_latest_price(chart_url, market_url):
+    """네이버 시세 조회 - 차트 API 최신값, 실패하거나 평소(p95)보다 늦으면 marketIndex 종가 중 먼저 온 값"""
+    return hedging.hedged_call(
+        "naver.chart", lambda: _naver_chart_latest(chart_url),
+        "naver.market_index", lambda: _naver_market_close(market_url)
+    )
+
+
+def _naver_chart_latest(chart_url):
+    data = api_call(chart_url)
+    
+    if data and data.get('result') and data['result'].get('priceInfos'):
+        # result 안의 priceInfos에서 최신 데이터 가져오기
+        latest = data['result']['priceInfos'][-1]
+        current_price = latest.get('currentPrice')
+        if current_price:
+            # 쉼표 제거 후 float 변환
+            return float(str(current_price).replace(',', ''))
     return None
 
 
+def _naver_market_close(market_url):
+    backup_data = api_call(market_url)
+    if backup_data and backup_data.get('result'):
+        close_price = backup_data['result'].get('closePrice')
+        if close_price:
+            return float(str(close_price).replace(',', ''))
+    return None
+
+
+def get_naver_metal_price(code, chart_type):
+    """네이버 귀금속 시세 조회 (레지스트리의 로이터 코드/차트 유형)"""
+    try:
+        return get_naver_latest_price(
+            NAVER_METAL_CHART_URL.format(code=code, chart_type=chart_type),
+            NAVER_METAL_MARKET_URL.format(code=code)
+        )
+    except Exception as e:
+        log.warning("네이버 시세 조회 실패 (%s): %s", code, e)
+        return None
+
+
 def get_naver_gold_price():
     """네이버 국제 금 시세 조회 (런던 현물)"""
     try:
         # 네이버 모바일 API - 국제 금시세 (GCcv1)
-        data = api_call(NAVER_GOLD_INTERNATIONAL_CHART_URL)
-        
-        if data and data.get('result') and data['result'].get('priceInfos'):
-            price_infos = data['result']['priceInfos']
-            if price_infos:
-                latest = price_infos[-1]
-                current_price = latest.get('currentPrice')
-                if current_price:
-                    return float(str(current_price).replace(',', ''))
-        
-        # 백업: marketIndex API 시도
-        backup_data = api_call(NAVER_GOLD_INTERNATIONAL_MARKET_URL)
-        if backup_data and backup_data.get('result'):
-            close_price = backup_data['result'].get('closePrice')
-            if close_price:
-                return float(str(close_price).replace(',', ''))
-        
-        return None
+        return get_naver_latest_price(NAVER_GOLD_INTERNATIONAL_CHART_URL, NAVER_GOLD_INTERNATIONAL_MARKET_URL)
         
     except Exception as e:
-        print(f"네이버 국제 금 시세 조회 실패: {e}")
+        log.warning("네이버 국제 금 시세 조회 실패: %s", e)
         return None
 
 
 def get_domestic_gold_price():
     """국내 금 현물 시세 조회 (KRW/g)"""
     try:
-        # 국내 금시세 (chart API)
-        domestic_data = api_call(NAVER_GOLD_DOMESTIC_CHART_URL)
-        domestic_price = None
+        return get_naver_latest_price(NAVER_GOLD_DOMESTIC_CHART_URL, NAVER_GOLD_DOMESTIC_MARKET_URL)
         
-        if domestic_data and domestic_data.get('result') and domestic_data['result'].get('priceInfos'):
-            # result 안의 priceInfos에서 최신 데이터 가져오기
-            price_infos = domestic_data['result']['priceInfos']
-            if price_infos:
-                latest = price_infos[-1]
-                current_price = latest.get('currentPrice')
-                if current_price:
-                    # 쉼표 제거 후 float 변환
-                    domestic_price = float(str(current_price).replace(',', ''))
+    except Exception as e:
+        log.warning("국내 금 시세 조회 실패: %s", e)
+        return None
+
+
+def with_date_range(url, start_date, end_date):
+    """네이버 차트 URL에 조회 기간(YYYYMMDD) 추가"""
+    return f"{url}&startDateTime={start_date}0000&endDateTime={end_date}2359"
+
+
+def get_naver_price_history(url):
+    """네이버 차트 API 일별 종가 이력 조회 - [(YYYYMMDD, 종가), ...] 오래된 순, 조회 실패 시 None (기간에 시세가 없으면 [])"""
+    try:
+        data = api_call(url)
+        if data is None:
+            return None
+        if not data.get('result'):
+            return []
         
-        # 백업: marketIndex API 사용
-        if not domestic_price:
-            domestic_backup = api_call(NAVER_GOLD_DOMESTIC_MARKET_URL)
-            if domestic_backup and domestic_backup.get('result'):
-                close_price = domestic_backup['result'].get('closePrice')
-                if close_price:
-                    domestic_price = float(str(close_price).replace(',', ''))
+        history = []
+        for info in data['result'].get('priceInfos') or []:
+            date = info.get('localDate')
+            price = info.get('closePrice') or info.get('currentPrice')
+            if date and price:
+                history.append((str(date), float(str(price).replace(',', ''))))
         
-        return domestic_price
+        return history
         
     except Exception as e:
-        print(f"국내 금 시세 조회 실패: {e}")
+        log.warning("네이버 시세 이력 조회 실패: %s", e)
         return None
 
 
+def get_exchange_rate_for_date(date, raise_on_error=False):
+    """특정 일자(YYYYMMDD) 한국수출입은행 USD/KRW 매매기준율 - 고시가 없으면 None
+
+    raise_on_error: 조회 실패를 고시 없음(None)과 구분해야 할 때 (백필) RuntimeError
+    """
+    exchange_data = api_call(f"{EXCHANGE_RATE_URL}?authkey={EXCHANGE_RATE_API_KEY}&searchdate={date}&data=AP01")
+    if raise_on_error and not isinstance(exchange_data, list):
+        raise RuntimeError(f"{date} 환율 조회 실패")
+    
+    if exchange_data and isinstance(exchange_data, list):
+        for item in exchange_data:
+            if item.get('cur_unit') == 'USD':
+                return float(item['deal_bas_r'].replace(',', ''))
+    return None
+
+
 def get_exchange_rate():
-    """환율 조회 (USD/KRW) - 여러 날짜 시도"""
+    """환율 조회 (USD/KRW) - 여러 날짜 시도 (요청 기한이 지나거나 수출입은행 차단 중이면 None)"""
     from datetime import datetime, timedelta
     
+    if not circuit_breaker.available("exim"):
+        # 장애 중 기본값으로 계산한 프리미엄 대신 마지막 정상 값을 쓰도록 실패로 알림
+        return None
+    
     try:
         # 환율 조회 (여러 날짜 시도)
         usd_krw_rate = None
         for i in range(5):
+            if deadline.expired():
+                # 기본값으로 계산한 프리미엄보다 마지막 정상 값이 정확하므로 호출자에게 실패로 알림
+                log.warning("환율 조회 중 요청 기한 초과 (%d일 시도)", i)
+                return None
             date = (datetime.now().date() - timedelta(days=i)).strftime('%Y%m%d')
-            exchange_data = api_call(f"https://oapi.koreaexim.go.kr/site/program/financial/exchangeJSON?authkey={EXCHANGE_RATE_API_KEY}&searchdate={date}&data=AP01")
-            
-            if exchange_data and isinstance(exchange_data, list):
-                for item in exchange_data:
-                    if item.get('cur_unit') == 'USD':
-                        usd_krw_rate = float(item['deal_bas_r'].replace(',', ''))
-                        break
-                if usd_krw_rate:
-                    break
+            usd_krw_rate = get_exchange_rate_for_date(date)
+            if usd_krw_rate:
+                break
         
         return usd_krw_rate if usd_krw_rate else 1380.0  # 기본값
         
     except Exception as e:
-        print(f"환율 조회 실패: {e}")
+        log.warning("환율 조회 실패: %s", e)
         return 1380.0  # 기본값
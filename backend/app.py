@@ -2,8 +2,11 @@
 간소화된 Flask 애플리케이션
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
+import atexit
+import hmac
+import functools
 import threading
 import time
 import datetime
@@ -11,7 +14,15 @@ from datetime import timezone, timedelta
 
 # 모듈화된 함수들 import  
 from api_utils import get_kis_token
-from database import get_cached_token, save_token, cleanup_old_data, get_active_contract, save_active_contract
+from database import get_cached_token, save_token, save_active_contract
+from kis_stream import start_stream, stop_stream, ensure_stream_subscription, get_stream_status
+from metrics import track_task, render_metrics, STALE_RESPONSES
+from structured_log import get_logger, new_request_id, set_request_id
+from tracing import start_trace, end_trace, server_timing_header
+from deadline import deadline_scope
+from config import KIS_STREAMING_ENABLED, ADMIN_TOKEN, PROFILE_SAMPLE_INTERVAL_MS, TRACEMALLOC_FRAMES, REQUEST_DEADLINE_SECONDS
+
+log = get_logger("app")
 
 # Flask 앱 초기화
 app = Flask(__name__)
@@ -26,66 +37,114 @@ def get_or_create_kis_token():
     # 1단계: 캐시된 토큰 확인 (23시간 미만)
     cached_token = get_cached_token()
     if cached_token:
-        print("🔄 캐시된 KIS 토큰 사용")
+        log.debug("캐시된 KIS 토큰 사용")
         return cached_token
     
     # 2단계: 새 토큰 발급 (캐시에 없을 때만)
-    print("🔑 새 KIS 토큰 발급 중...")
+    log.info("새 KIS 토큰 발급 중")
     new_token = get_kis_token()
     if new_token:
         save_token(new_token)
-        print("✅ 새 KIS 토큰 발급 완료")
+        log.info("새 KIS 토큰 발급 완료")
         return new_token
     
-    print("❌ KIS 토큰 발급 실패")
+    log.error("KIS 토큰 발급 실패")
     return None
 
 
 
+def resolve_active_symbol():
+    """주계약 종목코드 - 롤오버 엔진/DB 우선, 없을 때만 엔진으로 조회"""
+    from roll_engine import get_active_symbol, update_active_contract
+    
+    symbol = get_active_symbol()
+    if symbol:
+        return symbol
+    
+    active_contract = update_active_contract(force=True)
+    return active_contract['symbol'] if active_contract else None
+
+
 def background_update_worker():
     """백그라운드 데이터 업데이트"""
     global background_update_running
     
     while background_update_running:
+        # 주기마다 작업 ID를 붙여 한 주기의 로그를 묶어 볼 수 있게 함
+        set_request_id(new_request_id("bg-"))
+        start_trace("background_cycle")
         try:
-            print(f"[{datetime.datetime.now()}] 백그라운드 업데이트 시작")
-            
-            # 단순한 금 프리미엄 데이터 업데이트
-            from gold_data import get_gold_premium_data
-            premium_data = get_gold_premium_data()
-            
-            if premium_data:
-                print(f"✅ 금 프리미엄 업데이트 완료: {premium_data.get('premium_percentage', 'N/A')}%")
-            else:
-                print("⚠️ 금 프리미엄 업데이트 실패")
-            
-            # 활성 계약 자동 업데이트 (1시간마다)
-            current_active = get_active_contract()
-            if not current_active or (datetime.datetime.now(timezone.utc) - datetime.fromisoformat(current_active['updated_at'].replace('Z', '+00:00'))) > timedelta(hours=1):
-                try:
-                    from futures_api import find_active_gold_contract
-                    print("🔍 활성 계약 업데이트 확인 중...")
-                    new_active = find_active_gold_contract()
-                    if new_active:
-                        save_active_contract(new_active)
-                        print(f"✅ 활성 계약 업데이트: {new_active.get('symbol')} (거래량: {new_active.get('volume', 0):,})")
-                    else:
-                        print("⚠️ 활성 계약 데이터 없음")
-                except Exception as e:
-                    print(f"⚠️ 활성 계약 업데이트 실패: {e}")
-            else:
-                print(f"ℹ️ 활성 계약 업데이트 건너뜀 (마지막 업데이트: {current_active.get('updated_at', 'N/A')})")
-            
-            # 오래된 데이터 정리
-            cleanup_old_data()
-            
-        except Exception as e:
-            print(f"백그라운드 업데이트 오류: {e}")
+            with track_task("cycle"):
+                run_background_cycle()
+        except Exception:
+            log.exception("백그라운드 업데이트 오류")
+        finally:
+            end_trace()
         
         # 5분마다 업데이트
         time.sleep(300)
 
 
+def run_background_cycle():
+    """백그라운드 업데이트 1회 - 단계별 소요 시간은 /metrics 에 기록"""
+    log.info("백그라운드 업데이트 시작")
+    
+    # 단순한 금 프리미엄 데이터 업데이트
+    from gold_data import get_gold_premium_data
+    with track_task("premium"):
+        premium_data = get_gold_premium_data()
+    
+    if premium_data:
+        log.info("금 프리미엄 업데이트 완료: %s%%", premium_data.get('premium_percentage', 'N/A'))
+    else:
+        log.warning("금 프리미엄 업데이트 실패")
+    
+    # 활성 계약 롤오버 엔진 (평시 근월/차월만 조회, 롤 구간에서만 전체 조회)
+    try:
+        from roll_engine import update_active_contract
+        with track_task("active_contract"):
+            new_active = update_active_contract()
+            if new_active:
+                save_active_contract(new_active)
+        if new_active:
+            ensure_stream_subscription(new_active.get('symbol'))
+            log.info("활성 계약 업데이트: %s", new_active.get('symbol'),
+                     extra={"symbol": new_active.get('symbol'), "volume": new_active.get('volume', 0)})
+        else:
+            log.debug("활성 계약 조회 주기 아님 - 건너뜀")
+    except Exception:
+        log.exception("활성 계약 업데이트 실패")
+    
+    # 호가 스냅샷 디스크 기록 / 마감 봉 일괄 저장
+    from orderbook_store import flush_orderbook_store
+    from bars import flush_closed_bars
+    from history_buffer import dump_history
+    with track_task("flush"):
+        flush_orderbook_store()
+        flush_closed_bars()
+        dump_history()
+    
+    # 보존 정책 (하루 한 번: 집계 롤업 후 원본 배치 삭제)
+    from retention import run_daily_retention
+    with track_task("retention"):
+        run_daily_retention()
+
+
+@atexit.register
+def flush_stores_on_exit():
+    """종료 시 메모리 저장소 디스크 기록"""
+    try:
+        stop_stream()
+        from orderbook_store import flush_orderbook_store
+        from bars import flush_closed_bars
+        from history_buffer import dump_history
+        flush_orderbook_store()
+        flush_closed_bars()
+        dump_history()
+    except Exception:
+        log.exception("종료 시 저장소 기록 오류")
+
+
 def start_background_updates():
     """백그라운드 업데이트 시작"""
     global background_update_running
@@ -94,18 +153,63 @@ def start_background_updates():
         background_update_running = True
         thread = threading.Thread(target=background_update_worker, daemon=True)
         thread.start()
-        print("백그라운드 업데이트 시작됨")
+        log.info("백그라운드 업데이트 시작됨")
+        
+        # 실시간 시세 수신 (옵션) - 주계약을 알 수 있으면 바로 구독
+        if KIS_STREAMING_ENABLED:
+            try:
+                from roll_engine import get_active_symbol
+                symbol = get_active_symbol()
+                start_stream([symbol] if symbol else [])
+                log.info("실시간 시세 수신 시작됨")
+            except Exception:
+                log.exception("실시간 시세 수신 시작 오류")
+
+
+def with_deadline(view):
+    """외부 시세를 조회하는 엔드포인트의 전체 기한 - X-Request-Deadline-Ms 헤더로 기본값보다 줄일 수 있음"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        seconds = REQUEST_DEADLINE_SECONDS
+        requested = request.headers.get("X-Request-Deadline-Ms", type=float)
+        if requested is not None and requested >= 0:
+            seconds = min(seconds, requested / 1000)
+        with deadline_scope(seconds):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def premium_or_stale(endpoint):
+    """최신 금 프리미엄 - 조회 실패(기한 초과 포함) 시 마지막 정상 값을 stale 표시해 반환, 둘 다 없으면 None
+
+    네이버/수출입은행 차단기가 열려 있으면 조회하지 않고 바로 마지막 정상 값 반환
+    """
+    from gold_data import get_gold_premium_data, get_last_good_premium
+    from circuit_breaker import available
+    
+    stale = None
+    if not (available("naver") and available("exim")):
+        stale = get_last_good_premium()
+    
+    premium_data = None if stale else get_gold_premium_data()
+    if premium_data:
+        return premium_data
+    
+    stale = stale or get_last_good_premium()
+    if stale:
+        STALE_RESPONSES.inc(endpoint)
+        log.warning("금 프리미엄 조회 실패 - 마지막 정상 값으로 응답 (%.0f초 전)", stale["stale_age_seconds"])
+    return stale
 
 
 # API 엔드포인트들
 @app.route('/api/gold-premium', methods=['GET'])
+@with_deadline
 def get_gold_premium():
-    """금 프리미엄 분석 (현물 vs 현물)"""
+    """금 프리미엄 분석 (현물 vs 현물) - 조회 실패 시 마지막 정상 값 (stale: true)"""
     try:
-        # 금 프리미엄 데이터 수집
-        from gold_data import get_gold_premium_data
-        
-        premium_data = get_gold_premium_data()
+        # 금 프리미엄 데이터 수집 (실패 시 마지막 정상 값)
+        premium_data = premium_or_stale("gold-premium")
         
         if not premium_data:
             return jsonify({"error": "금 프리미엄 데이터 조회 실패"}), 500
@@ -119,7 +223,9 @@ def get_gold_premium():
             "premium_grade": premium_data.get('premium_grade'),
             "exchange_rate": premium_data.get('usd_krw_rate'),
             "active_contract": "현물금",  # 현물 거래이므로
-            "cached": False,  # 실시간 데이터
+            "cached": bool(premium_data.get('stale')),  # 조회 실패로 마지막 정상 값을 쓴 경우만 True
+            "stale": bool(premium_data.get('stale')),
+            "stale_age_seconds": premium_data.get('stale_age_seconds'),
             "timestamp": premium_data.get('timestamp')
         }
         
@@ -129,14 +235,43 @@ def get_gold_premium():
         return jsonify({"error": f"서버 오류: {str(e)}"}), 500
 
 
+@app.route('/api/premium', methods=['GET'])
+@with_deadline
+def get_metal_premium():
+    """귀금속 프리미엄 일괄 조회 (metals: gold,silver,... 기본: 전체) - 실패/불완전한 종목은 마지막 정상 값 (stale: true)"""
+    try:
+        from metal_data import get_metal_premium_data, with_stale_fallback
+        
+        metals = request.args.get('metals')
+        metal_list = [metal.strip() for metal in metals.split(',') if metal.strip()] if metals else None
+        
+        try:
+            result = get_metal_premium_data(metal_list)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # 조회 실패/국내 시세 누락 종목만 마지막 정상 값으로 대체
+        result, replaced = with_stale_fallback(result)
+        if replaced:
+            STALE_RESPONSES.inc("premium")
+        if not any(result['metals'].values()):
+            return jsonify({"error": "프리미엄 데이터 조회 실패"}), 500
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({"error": f"서버 오류: {str(e)}"}), 500
+
+
 @app.route('/api/investment-strategy', methods=['GET'])
+@with_deadline
 def get_investment_strategy():
     """프리미엄 기반 투자 전략"""
     try:
-        from gold_data import get_gold_premium_data, analyze_premium_signals
+        from gold_data import analyze_premium_signals
         
-        # 프리미엄 데이터 조회
-        premium_data = get_gold_premium_data()
+        # 프리미엄 데이터 조회 (실패 시 마지막 정상 값)
+        premium_data = premium_or_stale("investment-strategy")
         if not premium_data:
             return jsonify({"error": "분석할 데이터가 없습니다"}), 404
         
@@ -147,7 +282,8 @@ def get_investment_strategy():
             "premium_grade": premium_data.get('premium_grade'),
             "premium_percentage": premium_data.get('premium_percentage'),
             "signals": signals,
-            "recommendation": "프리미엄 기준 현물 금 투자 전략을 참고하세요"
+            "recommendation": "프리미엄 기준 현물 금 투자 전략을 참고하세요",
+            "stale": bool(premium_data.get('stale'))
         })
         
     except Exception as e:
@@ -171,6 +307,7 @@ def get_futures_candidates():
 
 
 @app.route('/api/active-contract', methods=['GET'])
+@with_deadline
 def get_active_contract():
     """현재 활성 계약 정보"""
     try:
@@ -207,9 +344,12 @@ def update_active_contract():
         if not best_contract:
             return jsonify({"error": "적절한 활성 계약을 찾을 수 없습니다"}), 404
         
-        # 데이터베이스에 저장
+        # 데이터베이스에 저장 및 롤오버 엔진 동기화
         save_active_contract(best_contract)
         
+        from roll_engine import set_active_symbol
+        set_active_symbol(best_contract['symbol'])
+        
         return jsonify({
             "message": "활성 계약이 업데이트되었습니다",
             "contract": best_contract
@@ -219,20 +359,55 @@ def update_active_contract():
         return jsonify({"error": f"업데이트 오류: {str(e)}"}), 500
 
 
+@app.route('/api/term-structure', methods=['GET'])
+@with_deadline
+def get_term_structure_endpoint():
+    """월물별 기간구조 (현물 대비 베이시스, 내재 캐리, 캘린더 스프레드)"""
+    try:
+        from api_utils import get_domestic_gold_price
+        from futures_api import get_term_structure
+        
+        spot_price = get_domestic_gold_price()
+        if not spot_price:
+            return jsonify({"error": "현물 금 시세 조회 실패"}), 500
+        
+        term_structure = get_term_structure(spot_price)
+        if not term_structure:
+            return jsonify({"error": "기간구조를 계산할 월물 데이터가 없습니다"}), 404
+        
+        return jsonify(term_structure)
+        
+    except Exception as e:
+        return jsonify({"error": f"기간구조 조회 오류: {str(e)}"}), 500
+
+
+@app.route('/api/roll-status', methods=['GET'])
+def get_roll_status_endpoint():
+    """월물 롤오버 엔진 상태 (만기 캘린더, 근월/차월 거래량)"""
+    try:
+        from roll_engine import get_roll_status
+        return jsonify(get_roll_status())
+        
+    except Exception as e:
+        return jsonify({"error": f"롤오버 상태 조회 오류: {str(e)}"}), 500
+
+
 @app.route('/api/gold-analysis', methods=['GET'])
+@with_deadline
 def get_gold_analysis():
     """종합 금 시장 분석"""
     try:
-        from gold_data import get_gold_premium_data
         from analysis import generate_comprehensive_analysis
         
-        # 기본 프리미엄 데이터
-        premium_data = get_gold_premium_data()
+        # 기본 프리미엄 데이터 (실패 시 마지막 정상 값)
+        premium_data = premium_or_stale("gold-analysis")
         if not premium_data:
             return jsonify({"error": "분석할 데이터가 없습니다"}), 404
         
         # 종합 분석 생성
         analysis = generate_comprehensive_analysis(premium_data)
+        if premium_data.get('stale') and "error" not in analysis:
+            analysis.update({"stale": True, "stale_age_seconds": premium_data['stale_age_seconds']})
         
         return jsonify(analysis)
         
@@ -240,6 +415,29 @@ def get_gold_analysis():
         return jsonify({"error": f"종합 분석 오류: {str(e)}"}), 500
 
 
+@app.route('/api/korean-etfs', methods=['GET'])
+def get_korean_etfs():
+    """한국 금 ETF 상관계수/베타/추적오차 분석"""
+    try:
+        from analysis import get_korean_gold_etf_analysis
+        
+        # 파라미터로 종목코드/윈도우 지정 가능 (기본값: config 설정)
+        codes = request.args.get('codes')
+        etf_codes = [code.strip() for code in codes.split(',') if code.strip()] if codes else None
+        window = request.args.get('window', type=int)
+        if 'window' in request.args and (window is None or window < 2):
+            return jsonify({"error": "window는 2 이상의 정수여야 합니다"}), 400
+        
+        result = get_korean_gold_etf_analysis(etf_codes, window)
+        if result.get('error'):
+            return jsonify(result), 404
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({"error": f"ETF 분석 오류: {str(e)}"}), 500
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """헬스 체크"""
@@ -250,6 +448,141 @@ def health_check():
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """운영 지표 (Prometheus 텍스트 형식)"""
+    return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def admin_required(view):
+    """관리자 전용 - ADMIN_TOKEN 미설정 시 없는 경로처럼 404, 토큰 불일치 시 401"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "관리자 기능이 비활성화되어 있습니다"}), 404
+        header = request.headers.get("Authorization", "")
+        token = header[7:] if header.startswith("Bearer ") else ""
+        if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({"error": "인증이 필요합니다"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/admin/profile/cpu', methods=['GET'])
+@admin_required
+def profile_cpu():
+    """CPU 샘플링 (seconds: 수집 시간, interval_ms: 간격, idle: 대기 스레드 포함, format: collapsed|json)"""
+    from profiling import sample_stacks, render_collapsed, summarize_stacks
+    
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in ('collapsed', 'json'):
+        return jsonify({"error": f"지원하지 않는 형식입니다: {fmt}", "formats": ["collapsed", "json"]}), 400
+    
+    try:
+        stacks, summary = sample_stacks(
+            request.args.get('seconds', 10, type=float),
+            request.args.get('interval_ms', PROFILE_SAMPLE_INTERVAL_MS, type=float),
+            request.args.get('idle', 'false').lower() == 'true'
+        )
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    
+    if fmt == 'json':
+        return jsonify({**summary, "functions": summarize_stacks(stacks), "collapsed": render_collapsed(stacks)})
+    return Response(render_collapsed(stacks), mimetype="text/plain", headers={
+        "X-Profile-Samples": str(summary["samples"]),
+        "X-Profile-Seconds": str(summary["seconds"])
+    })
+
+
+@app.route('/admin/profile/memory', methods=['GET'])
+@admin_required
+def profile_memory_status():
+    """메모리 추적 상태와 보관 중인 스냅샷 목록"""
+    from profiling import memory_status
+    
+    return jsonify(memory_status())
+
+
+@app.route('/admin/profile/memory/start', methods=['POST'])
+@admin_required
+def profile_memory_start():
+    """메모리 할당 추적 시작 (frames: 보관할 스택 깊이)"""
+    from profiling import start_memory_tracing
+    
+    return jsonify(start_memory_tracing(request.args.get('frames', TRACEMALLOC_FRAMES, type=int)))
+
+
+@app.route('/admin/profile/memory/stop', methods=['POST'])
+@admin_required
+def profile_memory_stop():
+    """메모리 할당 추적 중지 및 스냅샷 삭제"""
+    from profiling import stop_memory_tracing
+    
+    return jsonify(stop_memory_tracing())
+
+
+@app.route('/admin/profile/memory/snapshot', methods=['POST'])
+@admin_required
+def profile_memory_snapshot():
+    """메모리 스냅샷 저장 (group_by: lineno|filename|traceback, limit: 상위 개수)"""
+    from profiling import take_memory_snapshot
+    
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"error": f"지원하지 않는 group_by 입니다: {group_by}"}), 400
+    
+    try:
+        return jsonify(take_memory_snapshot(group_by, request.args.get('limit', 30, type=int)))
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@app.route('/admin/profile/memory/diff', methods=['GET'])
+@admin_required
+def profile_memory_diff():
+    """두 스냅샷 사이 할당 증가분 (base: 기준 스냅샷 ID, target: 비교 스냅샷 ID - 생략 시 지금 스냅샷)"""
+    from profiling import diff_memory_snapshots
+    
+    base = request.args.get('base', type=int)
+    if base is None:
+        return jsonify({"error": "base 스냅샷 ID가 필요합니다"}), 400
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"error": f"지원하지 않는 group_by 입니다: {group_by}"}), 400
+    
+    try:
+        return jsonify(diff_memory_snapshots(
+            base, request.args.get('target', type=int), group_by, request.args.get('limit', 30, type=int)
+        ))
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@app.route('/api/db-status', methods=['GET'])
+def db_status():
+    """Supabase 클라이언트 연결/재사용 통계"""
+    from database import get_supabase_stats
+    
+    return jsonify(get_supabase_stats())
+
+
+@app.route('/api/circuit-status', methods=['GET'])
+def circuit_status():
+    """외부 API별 차단기 상태"""
+    from circuit_breaker import get_circuit_status
+    
+    return jsonify(get_circuit_status())
+
+
+@app.route('/api/stream-status', methods=['GET'])
+def get_stream_status_endpoint():
+    """실시간 시세 수신 상태"""
+    return jsonify({"enabled": KIS_STREAMING_ENABLED, **get_stream_status()})
+
+
 @app.route('/api/token-status', methods=['GET'])
 def get_token_status():
     """토큰 상태 확인"""
@@ -275,23 +608,25 @@ def get_token_status():
 
 
 @app.route('/api/orderbook-analysis', methods=['GET'])
+@with_deadline
 def get_orderbook_analysis():
     """호가 데이터 기반 매수/매도 압력 분석"""
     try:
-        from futures_api import find_active_gold_contract, get_domestic_futures_orderbook
+        from futures_api import get_domestic_futures_orderbook
         
         # 파라미터로 종목코드 받기 (기본값: 주계약)
-        symbol = request.args.get('symbol')
+        symbol = request.args.get('symbol') or resolve_active_symbol()
         
         if not symbol:
-            # 주계약 자동 선택
-            active_contract = find_active_gold_contract()
-            if not active_contract:
-                return jsonify({"error": "활성 계약을 찾을 수 없습니다"}), 404
-            symbol = active_contract['symbol']
+            return jsonify({"error": "활성 계약을 찾을 수 없습니다"}), 404
         
-        # 호가 분석 수행
+        # 호가 분석 수행 (실패 시 마지막 정상 호가)
         orderbook_data = get_domestic_futures_orderbook(symbol)
+        if not orderbook_data:
+            from futures_api import get_last_good_orderbook
+            orderbook_data = get_last_good_orderbook(symbol)
+            if orderbook_data:
+                STALE_RESPONSES.inc("orderbook-analysis")
         
         if not orderbook_data:
             return jsonify({"error": f"{symbol} 종목의 호가 데이터를 찾을 수 없습니다"}), 404
@@ -317,7 +652,9 @@ def get_orderbook_analysis():
                 "change_rate": orderbook_data.get("change_rate", "0")
             },
             "last_update_time": orderbook_data.get("last_update_time", ""),
-            "analysis_time": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            "analysis_time": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "stale": bool(orderbook_data.get("stale")),
+            "stale_age_seconds": orderbook_data.get("stale_age_seconds")
         }
         
         return jsonify(analysis_result)
@@ -327,32 +664,49 @@ def get_orderbook_analysis():
 
 
 @app.route('/api/pressure-signal', methods=['GET'])
+@with_deadline
 def get_pressure_signal():
-    """간단한 매수/매도 압력 신호만 반환"""
+    """평활화된 매수/매도 압력 신호 반환 (최근 상태가 없을 때만 호가 조회)"""
     try:
-        from futures_api import find_active_gold_contract, get_domestic_futures_orderbook
+        from futures_api import get_domestic_futures_orderbook
+        from microstructure import get_microstructure
+        from config import MICROSTRUCTURE_MAX_AGE_SECONDS
         
-        symbol = request.args.get('symbol')
+        symbol = request.args.get('symbol') or resolve_active_symbol()
         
         if not symbol:
-            active_contract = find_active_gold_contract()
-            if not active_contract:
-                return jsonify({"error": "활성 계약을 찾을 수 없습니다"}), 404
-            symbol = active_contract['symbol']
+            return jsonify({"error": "활성 계약을 찾을 수 없습니다"}), 404
         
-        orderbook_data = get_domestic_futures_orderbook(symbol)
+        state = get_microstructure(symbol, MICROSTRUCTURE_MAX_AGE_SECONDS)
+        if not state:
+            # 상태가 없거나 오래됐으면 호가 1회 조회로 갱신
+            get_domestic_futures_orderbook(symbol)
+            state = get_microstructure(symbol)
         
-        if not orderbook_data:
+        if not state:
             return jsonify({"error": "호가 데이터 없음"}), 404
         
-        # 간단한 신호만 반환
+        # 호가 갱신에 실패해 오래된 상태로 응답하는 경우 표시
+        age = time.time() - state["updated_at"]
+        stale = age > MICROSTRUCTURE_MAX_AGE_SECONDS
+        if stale:
+            STALE_RESPONSES.inc("pressure-signal")
+        
         signal_result = {
             "symbol": symbol,
-            "pressure_signal": orderbook_data.get("pressure_signal", "균형"),
-            "buy_pressure": orderbook_data.get("buy_pressure_pct", 50.0),
-            "sell_pressure": orderbook_data.get("sell_pressure_pct", 50.0),
-            "recommendation": get_trading_recommendation(orderbook_data.get("pressure_signal", "균형")),
-            "timestamp": datetime.datetime.now().strftime('%H:%M:%S')
+            "pressure_signal": state["pressure_signal"],
+            "buy_pressure": state["buy_pressure_pct"],
+            "sell_pressure": state["sell_pressure_pct"],
+            "recommendation": get_trading_recommendation(state["pressure_signal"]),
+            "microstructure": {
+                "samples": state["samples"],
+                "smoothed": state["smoothed"],
+                "latest": state["latest"],
+                "cumulative_ofi": state["cumulative_ofi"]
+            },
+            "timestamp": datetime.datetime.fromtimestamp(state["updated_at"]).strftime('%H:%M:%S'),
+            "stale": stale,
+            "stale_age_seconds": round(age, 1) if stale else None
         }
         
         return jsonify(signal_result)
@@ -361,6 +715,255 @@ def get_pressure_signal():
         return jsonify({"error": f"압력 신호 조회 오류: {str(e)}"}), 500
 
 
+@app.route('/api/history', methods=['GET'])
+def get_history_endpoint():
+    """기간 이력 조회 (from/to: ISO 시각, resolution: 초 단위 해상도 - 가장 거친 집계 단계 자동 선택)"""
+    try:
+        from retention import query_gold_history
+        
+        now = datetime.datetime.now(timezone.utc)
+        start = datetime.datetime.fromisoformat(request.args['from']) if request.args.get('from') else now - timedelta(days=1)
+        end = datetime.datetime.fromisoformat(request.args['to']) if request.args.get('to') else now
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        resolution = request.args.get('resolution', 0, type=int)
+        
+        result = query_gold_history(start, end, resolution)
+        
+        return jsonify({
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "tier": result["tier"],
+            "resolution_seconds": result["resolution_seconds"],
+            "count": len(result["points"]),
+            "points": result["points"]
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": f"잘못된 시각 형식: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"이력 조회 오류: {str(e)}"}), 500
+
+
+@app.route('/api/export/gold-prices', methods=['GET'])
+def export_gold_prices():
+    """gold_prices 스트리밍 내보내기 (format: ndjson|csv, from/to: ISO 시각, cursor: 마지막으로 받은 id부터 이어받기)"""
+    try:
+        from export import stream_gold_prices, EXPORT_FORMATS
+        
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({"error": f"지원하지 않는 형식입니다: {fmt}", "formats": list(EXPORT_FORMATS)}), 400
+        
+        now = datetime.datetime.now(timezone.utc)
+        start = datetime.datetime.fromisoformat(request.args['from']) if request.args.get('from') else datetime.datetime(2000, 1, 1)
+        end = datetime.datetime.fromisoformat(request.args['to']) if request.args.get('to') else now
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        cursor = request.args.get('cursor', type=int)
+        
+        filename = f"gold_prices_{start.date()}_{end.date()}.{fmt}"
+        return Response(
+            stream_with_context(stream_gold_prices(fmt, start.isoformat(), end.isoformat(), cursor)),
+            mimetype=EXPORT_FORMATS[fmt],
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+        
+    except ValueError as e:
+        return jsonify({"error": f"잘못된 시각 형식: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"내보내기 오류: {str(e)}"}), 500
+
+
+@app.route('/api/export/columnar', methods=['GET'])
+def export_columnar_endpoint():
+    """열 지향 내보내기 (dataset: gold_prices|active_contracts|orderbook, format: parquet|arrow, from/to: ISO 시각, symbol: 호가 종목)"""
+    try:
+        from columnar_export import export_columnar, COLUMNAR_FORMATS
+        
+        dataset = request.args.get('dataset', 'gold_prices')
+        fmt = request.args.get('format', 'parquet')
+        now = datetime.datetime.now(timezone.utc)
+        start = datetime.datetime.fromisoformat(request.args['from']) if request.args.get('from') else now - timedelta(days=7)
+        end = datetime.datetime.fromisoformat(request.args['to']) if request.args.get('to') else now
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        symbol = request.args.get('symbol')
+        if dataset == 'orderbook' and not symbol:
+            symbol = resolve_active_symbol()
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        
+        data, row_count = export_columnar(dataset, start, end, fmt, symbol, refresh)
+        
+        filename = f"{dataset}_{start.date()}_{end.date()}.{fmt}"
+        return Response(data, mimetype=COLUMNAR_FORMATS[fmt], headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Row-Count": str(row_count)
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"내보내기 오류: {str(e)}"}), 500
+
+
+@app.route('/api/history/recent', methods=['GET'])
+def get_recent_history_endpoint():
+    """최근 스냅샷 이력 (kind: premium, fx, contract / n: 최근 N건, minutes: 최근 T분)"""
+    try:
+        from history_buffer import get_recent_history, HISTORY_FIELDS
+        
+        kind = request.args.get('kind', 'premium')
+        n = request.args.get('n', type=int)
+        minutes = request.args.get('minutes', type=float)
+        
+        if kind not in HISTORY_FIELDS:
+            return jsonify({"error": f"지원하지 않는 이력 종류입니다: {kind}", "kinds": list(HISTORY_FIELDS)}), 400
+        
+        # 둘 다 없으면 최근 100건
+        if n is None and minutes is None:
+            n = 100
+        
+        rows = get_recent_history(kind, n, minutes)
+        for row in rows:
+            row["timestamp"] = datetime.datetime.fromtimestamp(row.pop("ts"), timezone.utc).isoformat()
+        
+        return jsonify({
+            "kind": kind,
+            "count": len(rows),
+            "points": rows
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"최근 이력 조회 오류: {str(e)}"}), 500
+
+
+@app.route('/api/alerts', methods=['GET'])
+def alerts_endpoint():
+    """임계값 알림 목록 조회"""
+    from alerts import list_alerts, get_alert_stats
+    
+    return jsonify({"alerts": list_alerts(), "stats": get_alert_stats()})
+
+
+@app.route('/api/alerts', methods=['POST'])
+@admin_required
+def register_alert_endpoint():
+    """임계값 알림 등록 (metric, condition, threshold, subject, cooldown_seconds, label) - 관리자 전용"""
+    try:
+        from alerts import register_alert
+        
+        body = request.get_json(silent=True) or {}
+        if body.get('metric') is None or body.get('condition') is None or body.get('threshold') is None:
+            return jsonify({"error": "metric, condition, threshold 는 필수입니다"}), 400
+        
+        try:
+            alert = register_alert(
+                body['metric'],
+                body['condition'],
+                body['threshold'],
+                subject=body.get('subject'),
+                cooldown_seconds=body.get('cooldown_seconds'),
+                label=body.get('label')
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return jsonify({"message": "알림이 등록되었습니다", "alert": alert}), 201
+        
+    except Exception as e:
+        return jsonify({"error": f"알림 처리 오류: {str(e)}"}), 500
+
+
+@app.route('/api/alerts/<int:alert_id>', methods=['DELETE'])
+@admin_required
+def delete_alert_endpoint(alert_id):
+    """임계값 알림 삭제 - 관리자 전용"""
+    from alerts import remove_alert
+    
+    if not remove_alert(alert_id):
+        return jsonify({"error": "알림을 찾을 수 없습니다"}), 404
+    return jsonify({"message": "알림이 삭제되었습니다"})
+
+
+@app.route('/api/alerts/events', methods=['GET'])
+def alert_events_endpoint():
+    """최근 발송된 알림 이벤트 (n: 최근 N건)"""
+    from alerts import get_alert_events
+    
+    return jsonify({"events": get_alert_events(request.args.get('n', type=int))})
+
+
+@app.route('/api/bars', methods=['GET'])
+def get_bars_endpoint():
+    """메모리 OHLCV 봉 조회 (series: premium, domestic_gold, international_gold, usd_krw, futures:<종목코드>)"""
+    try:
+        from bars import get_bars, get_bar_series_names
+        from config import BAR_INTERVALS
+        
+        series = request.args.get('series', 'premium')
+        interval = request.args.get('interval', '1m')
+        limit = request.args.get('limit', 200, type=int)
+        
+        if interval not in BAR_INTERVALS:
+            return jsonify({"error": f"지원하지 않는 주기입니다: {interval}", "intervals": list(BAR_INTERVALS)}), 400
+        
+        bars = get_bars(series, interval, limit)
+        if not bars:
+            return jsonify({"error": f"{series} 봉 데이터가 없습니다", "series_available": get_bar_series_names()}), 404
+        
+        return jsonify({
+            "series": series,
+            "interval": interval,
+            "count": len(bars),
+            "bars": bars
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"봉 조회 오류: {str(e)}"}), 500
+
+
+@app.route('/api/orderbook-history', methods=['GET'])
+def get_orderbook_history():
+    """저장된 호가 스냅샷 기간 조회 (from/to: ISO 시각, 기본값 최근 1시간)"""
+    try:
+        from orderbook_store import query_orderbook, orderbook_rows_to_dicts, KST
+        
+        symbol = request.args.get('symbol') or resolve_active_symbol()
+        if not symbol:
+            return jsonify({"error": "활성 계약을 찾을 수 없습니다"}), 404
+        
+        now = datetime.datetime.now(KST)
+        start = datetime.datetime.fromisoformat(request.args['from']) if request.args.get('from') else now - timedelta(hours=1)
+        end = datetime.datetime.fromisoformat(request.args['to']) if request.args.get('to') else now
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=KST)
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=KST)
+        limit = request.args.get('limit', 1000, type=int)
+        
+        rows = query_orderbook(symbol, int(start.timestamp() * 1000), int(end.timestamp() * 1000))
+        
+        return jsonify({
+            "symbol": symbol,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "count": len(rows),
+            "snapshots": orderbook_rows_to_dicts(rows[-limit:])
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": f"잘못된 시각 형식: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"호가 이력 조회 오류: {str(e)}"}), 500
+
+
 def get_trading_recommendation(pressure_signal):
     """압력 신호 기반 매매 추천"""
     recommendations = {
@@ -389,6 +992,25 @@ _background_started = False
 _background_start_lock = threading.Lock()
 
 
+@app.before_request
+def assign_request_id():
+    """요청 ID 지정 (X-Request-ID 헤더가 있으면 그대로 사용) - 요청 중 로그에 자동 포함"""
+    set_request_id(request.headers.get("X-Request-ID") or new_request_id())
+    start_trace(f"{request.method} {request.path}")
+
+
+@app.after_request
+def add_request_id_header(response):
+    from structured_log import get_request_id
+    response.headers["X-Request-ID"] = get_request_id() or ""
+    
+    # 외부 API/DB/계산 구간별 소요 시간 (브라우저 개발자 도구 Timing 탭에 표시)
+    trace = end_trace()
+    if trace is not None:
+        response.headers["Server-Timing"] = server_timing_header(trace)
+    return response
+
+
 @app.before_request
 def ensure_background_updates_started():
     global _background_started
@@ -399,6 +1021,6 @@ def ensure_background_updates_started():
                 try:
                     start_background_updates()
                     _background_started = True
-                    print("백그라운드 업데이트가 before_request로 시작되었습니다")
-                except Exception as e:
-                    print(f"백그라운드 업데이트 시작 오류: {e}")
+                    log.info("백그라운드 업데이트가 before_request로 시작되었습니다")
+                except Exception:
+                    log.exception("백그라운드 업데이트 시작 오류")
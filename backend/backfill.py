@@ -0,0 +1,361 @@
+"""
+과거 데이터 백필 - 금 현물/환율/선물 일별 이력을 기간 단위로 병렬 수집해 일괄 저장
+
+    python backfill.py --from 2024-01-01 --to 2024-12-31 --sources gold,fx,futures
+
+월 단위로 작업을 나눠 동시에 조회하고 (호스트별 초당 요청 수 제한), 저장이 끝난 작업은
+(소스, 월 안의 실제 기간, 선물 종목) 단위로 체크포인트에 기록해 중단 후 다시 실행하면 남은 작업만 이어서 처리합니다.
+저장은 고정 키(일자) 기준 upsert라 같은 기간을 여러 번 실행해도 중복되지 않습니다.
+"""
+
+import os
+import json
+import time
+import argparse
+import datetime
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import (
+    GOLD_DATA_TABLE,
+    NAVER_GOLD_INTERNATIONAL_CHART_URL,
+    NAVER_GOLD_DOMESTIC_CHART_URL,
+    EXCHANGE_RATE_URL,
+    KIS_FUTURES_DAILY_URL,
+    BACKFILL_RATE_LIMITS,
+    BACKFILL_CHECKPOINT_PATH,
+    BACKFILL_BATCH_SIZE
+)
+
+SOURCES = ("gold", "fx", "futures")
+GRAMS_PER_OUNCE = 31.1035
+LOOKBACK_DAYS = 7   # 월초 휴장일 대비 이전 시세 조회 여유
+
+
+class HostRateLimiter:
+    """호스트별 최소 요청 간격 보장 (스레드 간 공유)"""
+
+    def __init__(self, limits):
+        self.intervals = {host: 1.0 / rate for host, rate in limits.items() if rate}
+        self.next_at = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).hostname
+        interval = self.intervals.get(host)
+        if not interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_at.get(host, now))
+            self.next_at[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_limiter = HostRateLimiter(BACKFILL_RATE_LIMITS)
+_fx_cache = {}   # YYYYMMDD -> 환율 (고시가 없으면 None, 조회 실패는 저장 안 함) - gold/fx 작업이 공유
+_fx_lock = threading.Lock()
+
+
+def month_ranges(start, end):
+    """[start, end] 기간을 월 단위 (월키, 시작일, 종료일)로 분할"""
+    ranges = []
+    cursor = start.replace(day=1)
+    while cursor <= end:
+        next_month = (cursor + datetime.timedelta(days=32)).replace(day=1)
+        ranges.append((cursor.strftime("%Y-%m"), max(cursor, start), min(next_month - datetime.timedelta(days=1), end)))
+        cursor = next_month
+    return ranges
+
+
+def _ymd(day):
+    return day.strftime("%Y%m%d")
+
+
+def fetch_naver_history(url, start, end):
+    """네이버 일별 종가 {YYYYMMDD: 종가} - 조회 실패 시 RuntimeError (빈 기간과 구분해 작업을 완료 처리하지 않음)"""
+    from api_utils import with_date_range, get_naver_price_history
+
+    ranged_url = with_date_range(url, _ymd(start), _ymd(end))
+    _limiter.wait(ranged_url)
+    history = get_naver_price_history(ranged_url)
+    if history is None:
+        raise RuntimeError(f"네이버 일별 시세 조회 실패 ({_ymd(start)}~{_ymd(end)})")
+    return dict(history)
+
+
+def fetch_exchange_rates(start, end):
+    """영업일별 USD/KRW 매매기준율 {YYYYMMDD: 환율} (주말 제외, 실행 중 캐시 공유)
+
+    조회 실패 시 RuntimeError - 캐시에는 실제 고시 없음(None)만 남기고 실패는 남기지 않음
+    """
+    from api_utils import get_exchange_rate_for_date
+
+    rates = {}
+    day = start
+    while day <= end:
+        date = _ymd(day)
+        if day.weekday() < 5:
+            with _fx_lock:
+                cached = date in _fx_cache
+                rate = _fx_cache.get(date)
+            if not cached:
+                _limiter.wait(EXCHANGE_RATE_URL)
+                rate = get_exchange_rate_for_date(date, raise_on_error=True)
+                with _fx_lock:
+                    _fx_cache[date] = rate
+            if rate:
+                rates[date] = rate
+        day += datetime.timedelta(days=1)
+    return rates
+
+
+def _latest_on_or_before(series, date):
+    """date 이전 가장 최근 값 (휴장일 보정)"""
+    candidates = [d for d in series if d <= date]
+    return series[max(candidates)] if candidates else None
+
+
+def build_gold_rows(start, end):
+    """국내 금 거래일별 gold_prices 행 - 국제 금/환율은 직전 값으로 보정"""
+    from gold_data import calculate_gold_premium
+
+    lookback = start - datetime.timedelta(days=LOOKBACK_DAYS)
+    domestic = fetch_naver_history(NAVER_GOLD_DOMESTIC_CHART_URL, start, end)
+    international = fetch_naver_history(NAVER_GOLD_INTERNATIONAL_CHART_URL, lookback, end)
+    rates = fetch_exchange_rates(lookback, end)
+
+    rows = []
+    for date in sorted(d for d in domestic if _ymd(start) <= d <= _ymd(end)):
+        usd_price = _latest_on_or_before(international, date)
+        rate = _latest_on_or_before(rates, date)
+        if not usd_price or not rate:
+            continue
+
+        krw_per_gram = usd_price * rate / GRAMS_PER_OUNCE
+        premium = calculate_gold_premium(krw_per_gram, domestic[date]) or {}
+        rows.append({
+            "london_gold_usd": usd_price,
+            "london_gold_krw": round(krw_per_gram, 2),
+            "exchange_rate": rate,
+            "domestic_gold_price": domestic[date],
+            "premium_percentage": premium.get('premium_percentage'),
+            "absolute_difference": premium.get('absolute_difference'),
+            # 일자별 고정 시각 (국내 장 마감) - 재실행 시 같은 행을 덮어씀
+            "created_at": f"{date[:4]}-{date[4:6]}-{date[6:]}T15:30:00+09:00"
+        })
+    return rows
+
+
+def _daily_bar(series, date, open_, high, low, close, volume=0):
+    return {
+        "series": series,
+        "interval": "1d",
+        "start": f"{date[:4]}-{date[4:6]}-{date[6:]}T00:00:00+09:00",
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+        "count": 1
+    }
+
+
+def build_fx_bars(start, end):
+    """환율 일봉 (price_bars, 고시 환율 1건이므로 시가=고가=저가=종가)"""
+    rates = fetch_exchange_rates(start, end)
+    return [_daily_bar("usd_krw", date, rate, rate, rate, rate) for date, rate in sorted(rates.items())]
+
+
+def build_futures_bars(symbols, start, end):
+    """선물 일봉 (price_bars, 시계열명은 실시간 봉과 같은 futures:<종목>)"""
+    from futures_api import get_futures_daily_history
+
+    bars = []
+    for symbol in symbols:
+        _limiter.wait(KIS_FUTURES_DAILY_URL)
+        history = get_futures_daily_history(symbol, _ymd(start), _ymd(end))
+        if history is None:
+            raise RuntimeError(f"{symbol} 일봉 조회 실패")
+        bars.extend(
+            _daily_bar(f"futures:{symbol}", row['date'], row['open'], row['high'], row['low'], row['close'], row['volume'])
+            for row in history
+        )
+    return bars
+
+
+def job_key(source, start, end, symbol=None):
+    """체크포인트 키 - 월 일부만 처리한 기간이나 다른 선물 종목은 별개 작업"""
+    key = f"{source}:{start.isoformat()}..{end.isoformat()}"
+    return f"{key}:{symbol}" if symbol else key
+
+
+def load_checkpoint(path):
+    """완료된 작업 키 목록"""
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f).get("completed", []))
+
+
+def save_checkpoint(path, completed):
+    """체크포인트 저장 (임시 파일 기록 후 교체)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"completed": sorted(completed)}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+class BatchWriter:
+    """테이블별 행 버퍼 - batch_size마다 일괄 upsert, 저장이 끝난 작업만 완료 처리"""
+
+    def __init__(self, batch_size, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.gold_rows = []
+        self.bar_rows = []
+        self.pending_jobs = []
+        self.written = 0
+
+    def add(self, job, kind, rows):
+        (self.gold_rows if kind == "gold" else self.bar_rows).extend(rows)
+        self.pending_jobs.append(job)
+
+    def full(self):
+        return len(self.gold_rows) + len(self.bar_rows) >= self.batch_size
+
+    def _write(self, rows, saver):
+        for i in range(0, len(rows), self.batch_size):
+            if not saver(rows[i:i + self.batch_size]):
+                return False
+        return True
+
+    def flush(self):
+        """버퍼 저장 - 성공하면 완료된 작업 목록 반환, 실패하면 예외"""
+        from database import upsert_rows, save_price_bars
+        from retention import rollup_backfilled_days
+
+        if not self.dry_run:
+            if self.gold_rows and not self._write(self.gold_rows, lambda rows: upsert_rows(GOLD_DATA_TABLE, rows, on_conflict="created_at")):
+                raise RuntimeError("gold_prices 일괄 저장 실패")
+            if self.gold_rows:
+                # 이미 집계가 끝난 날짜에 들어간 원본은 보존 정책이 집계 없이 삭제하므로 여기서 집계
+                days = {datetime.datetime.fromisoformat(row["created_at"]).astimezone(datetime.timezone.utc).date() for row in self.gold_rows}
+                rollup_backfilled_days(days)
+            if self.bar_rows and not self._write(self.bar_rows, save_price_bars):
+                raise RuntimeError("price_bars 일괄 저장 실패")
+
+        self.written += len(self.gold_rows) + len(self.bar_rows)
+        done, self.pending_jobs = self.pending_jobs, []
+        self.gold_rows, self.bar_rows = [], []
+        return done
+
+
+def run_backfill(start, end, sources=SOURCES, futures_symbols=(), workers=8,
+                 checkpoint_path=BACKFILL_CHECKPOINT_PATH, batch_size=BACKFILL_BATCH_SIZE, dry_run=False):
+    """기간 백필 실행 - 결과 요약 dict 반환"""
+    started = time.time()
+    completed = load_checkpoint(checkpoint_path) if checkpoint_path else set()
+
+    jobs = []
+    skipped = 0
+    for _, month_start, month_end in month_ranges(start, end):
+        for source in sources:
+            for symbol in (futures_symbols if source == "futures" else (None,)):
+                job = job_key(source, month_start, month_end, symbol)
+                if job in completed:
+                    skipped += 1
+                else:
+                    jobs.append((job, source, month_start, month_end, symbol))
+
+    print(f"🚚 백필 시작: {start} ~ {end}, 작업 {len(jobs)}건 (완료 {skipped}건 건너뜀), 동시 {workers}")
+
+    def run_job(source, month_start, month_end, symbol):
+        if source == "gold":
+            return "gold", build_gold_rows(month_start, month_end)
+        if source == "fx":
+            return "bars", build_fx_bars(month_start, month_end)
+        return "bars", build_futures_bars([symbol], month_start, month_end)
+
+    writer = BatchWriter(batch_size, dry_run)
+    failed = []
+
+    def mark_done(done_jobs):
+        completed.update(done_jobs)
+        if checkpoint_path and done_jobs and not dry_run:
+            save_checkpoint(checkpoint_path, completed)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, source, s, e, symbol): job for job, source, s, e, symbol in jobs}
+        for i, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            try:
+                kind, rows = future.result()
+            except Exception as e:
+                failed.append(job)
+                print(f"  [{i}/{len(jobs)}] {job} 실패: {e}")
+                continue
+
+            writer.add(job, kind, rows)
+            print(f"  [{i}/{len(jobs)}] {job}: {len(rows)}건")
+            if writer.full():
+                try:
+                    mark_done(writer.flush())
+                except Exception as e:
+                    print(f"⚠️ 일괄 저장 실패 - 다음 배치에서 재시도: {e}")
+
+    try:
+        mark_done(writer.flush())
+    except Exception as e:
+        failed.extend(writer.pending_jobs)
+        print(f"⚠️ 마지막 일괄 저장 실패: {e}")
+
+    elapsed = time.time() - started
+    print(f"✅ 백필 완료: {writer.written}건 저장{' (dry-run)' if dry_run else ''}, 실패 {len(failed)}건, {elapsed:.1f}초")
+    return {"written": writer.written, "failed": sorted(failed), "elapsed_seconds": round(elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="금/환율/선물 과거 데이터 백필")
+    parser.add_argument("--from", dest="start", required=True, help="시작일 (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", default=datetime.date.today().isoformat(), help="종료일 (YYYY-MM-DD)")
+    parser.add_argument("--sources", default=",".join(SOURCES), help="gold,fx,futures 중 선택")
+    parser.add_argument("--futures-symbols", default="", help="선물 종목코드 (쉼표 구분, 기본: 현재 주계약)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT_PATH, help="체크포인트 파일 ('' 이면 사용 안 함)")
+    parser.add_argument("--dry-run", action="store_true", help="조회만 하고 저장하지 않음")
+    args = parser.parse_args()
+
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    unknown = set(sources) - set(SOURCES)
+    if unknown:
+        parser.error(f"알 수 없는 소스: {', '.join(sorted(unknown))}")
+
+    futures_symbols = [s.strip() for s in args.futures_symbols.split(",") if s.strip()]
+    if "futures" in sources and not futures_symbols:
+        from roll_engine import get_active_symbol
+        active = get_active_symbol()
+        if not active:
+            parser.error("선물 종목을 찾을 수 없습니다. --futures-symbols 를 지정하세요.")
+        futures_symbols = [active]
+
+    result = run_backfill(
+        datetime.date.fromisoformat(args.start),
+        datetime.date.fromisoformat(args.end),
+        sources,
+        futures_symbols,
+        args.workers,
+        args.checkpoint or None,
+        args.batch_size,
+        args.dry_run
+    )
+    raise SystemExit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
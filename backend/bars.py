@@ -0,0 +1,174 @@
+"""
+OHLCV 봉 집계 - 조회/스트림 스냅샷을 1분/5분/1시간 봉으로 증분 집계 (고정 크기 링버퍼)
+"""
+
+import time
+import datetime
+import threading
+import numpy as np
+
+from config import BAR_INTERVALS, BAR_RING_CAPACITY, BAR_FLUSH_BATCH
+
+BAR_DTYPE = np.dtype([
+    ("start", "<i8"),      # 봉 시작 epoch 초
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<i8"),     # 누적 거래량 증분 (거래량 없는 시계열은 0)
+    ("count", "<i4"),      # 봉에 반영된 스냅샷 수
+])
+
+
+class BarSeries:
+    """시계열 1개 × 주기 1개의 봉 링버퍼 + 진행 중인 봉"""
+
+    def __init__(self, interval_seconds, capacity=BAR_RING_CAPACITY):
+        self.interval = interval_seconds
+        self.capacity = capacity
+        self.bars = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.closed = 0        # 누적 마감 봉 수
+        self.current = None    # 진행 중인 봉 (np.void)
+
+    def update(self, ts, price, volume_delta):
+        """스냅샷 반영 - 새 구간이면 진행 중인 봉을 마감해 반환"""
+        start = int(ts // self.interval * self.interval)
+        closed_bar = None
+
+        if self.current is not None and start > self.current["start"]:
+            closed_bar = self.current.copy()
+            self.bars[self.closed % self.capacity] = closed_bar
+            self.closed += 1
+            self.current = None
+
+        if self.current is None:
+            self.current = np.array((start, price, price, price, price, volume_delta, 1), dtype=BAR_DTYPE)[()]
+        elif start == self.current["start"]:
+            self.current["high"] = max(self.current["high"], price)
+            self.current["low"] = min(self.current["low"], price)
+            self.current["close"] = price
+            self.current["volume"] += volume_delta
+            self.current["count"] += 1
+        # start < 현재 봉 시작: 순서가 어긋난 늦은 스냅샷은 무시
+
+        return closed_bar
+
+    def recent(self, limit=None, include_open=True):
+        """최근 봉 (오래된 순)"""
+        available = min(self.closed, self.capacity)
+        n = available if limit is None else min(limit, available)
+        idx = np.arange(self.closed - n, self.closed) % self.capacity
+        rows = self.bars[idx]
+
+        if include_open and self.current is not None:
+            rows = np.concatenate([rows, np.array([self.current], dtype=BAR_DTYPE)])
+            if limit is not None:
+                rows = rows[-limit:]
+        return rows
+
+
+# (시계열, 주기명) -> BarSeries
+_series = {}
+_last_cumulative_volume = {}
+_pending = []   # 저장 대기 중인 마감 봉 (dict)
+_lock = threading.Lock()
+
+
+def record_price(name, price, cumulative_volume=None, ts=None):
+    """시계열 스냅샷 1건을 모든 주기 봉에 반영 (cumulative_volume: 누적 거래량)"""
+    if price is None:
+        return
+
+    ts = ts or time.time()
+    closed_rows = []
+
+    with _lock:
+        volume_delta = 0
+        if cumulative_volume is not None:
+            previous = _last_cumulative_volume.get(name)
+            # 장 시작 등으로 누적값이 줄면 새 누적으로 간주
+            if previous is not None and cumulative_volume >= previous:
+                volume_delta = cumulative_volume - previous
+            _last_cumulative_volume[name] = cumulative_volume
+
+        for interval_name, seconds in BAR_INTERVALS.items():
+            series = _series.get((name, interval_name))
+            if series is None:
+                series = _series[(name, interval_name)] = BarSeries(seconds)
+
+            closed_bar = series.update(ts, float(price), volume_delta)
+            if closed_bar is not None:
+                closed_rows.append(bar_to_dict(closed_bar, name, interval_name))
+
+        _pending.extend(closed_rows)
+        should_flush = len(_pending) >= BAR_FLUSH_BATCH
+
+    if should_flush:
+        flush_closed_bars()
+
+
+def record_premium_snapshot(premium_data):
+    """금 프리미엄 조회 결과 → 현물/환율/프리미엄 봉"""
+    record_price("domestic_gold", premium_data.get('domestic_price_krw_g'))
+    record_price("international_gold", premium_data.get('international_price_usd_oz'))
+    record_price("usd_krw", premium_data.get('usd_krw_rate'))
+    record_price("premium", premium_data.get('premium_percentage'))
+
+
+def record_futures_quote(quote):
+    """선물 시세 (get_domestic_futures_data 형식) → 선물 봉"""
+    record_price(f"futures:{quote['symbol']}", quote.get('current_price'), quote.get('volume'))
+
+
+def bar_to_dict(row, name=None, interval_name=None):
+    """봉 레코드 → dict"""
+    bar = {
+        "start": datetime.datetime.fromtimestamp(int(row["start"]), datetime.timezone.utc).isoformat(),
+        "open": float(row["open"]),
+        "high": float(row["high"]),
+        "low": float(row["low"]),
+        "close": float(row["close"]),
+        "volume": int(row["volume"]),
+        "count": int(row["count"])
+    }
+    if name is not None:
+        bar["series"] = name
+        bar["interval"] = interval_name
+    return bar
+
+
+def get_bars(name, interval_name, limit=None, include_open=True):
+    """메모리 봉 조회 (DB 조회 없음)"""
+    with _lock:
+        series = _series.get((name, interval_name))
+        if series is None:
+            return []
+        rows = series.recent(limit, include_open)
+    return [bar_to_dict(row) for row in rows]
+
+
+def get_bar_series_names():
+    """집계 중인 시계열 이름 목록"""
+    with _lock:
+        return sorted({name for name, _ in _series})
+
+
+def flush_closed_bars():
+    """마감 봉을 한 번에 일괄 저장 - 실패하면 다음 기회에 재시도"""
+    from database import save_price_bars
+
+    with _lock:
+        rows = list(_pending)
+        _pending.clear()
+
+    if not rows:
+        return 0
+
+    if save_price_bars(rows):
+        return len(rows)
+
+    with _lock:
+        # 저장 실패 시 되돌리되, 링버퍼 한 바퀴 분량을 넘으면 오래된 것부터 버림
+        _pending[:0] = rows
+        del _pending[:max(0, len(_pending) - BAR_RING_CAPACITY * len(BAR_INTERVALS))]
+    return 0
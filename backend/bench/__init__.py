@@ -0,0 +1,3 @@
+"""
+성능 측정 도구 모음 - 부하 테스트 및 마이크로 벤치마크 (외부 API 없이 로컬 대역 서버 사용)
+"""
@@ -0,0 +1,247 @@
+"""
+오프라인 부하 테스트 - 외부 API 대역 서버 + 앱 서버를 띄우고 모든 엔드포인트를 목표 RPS로 호출
+
+    python -m bench.loadtest --rps 50 --duration 30 --latency-ms 40 --error-rate 0.01 --output bench_result.json
+
+결과: 엔드포인트별 처리량, p50/p95/p99 지연, 오류율, 요청당 외부 API 호출 수
+지연은 예정 호출 시각 기준으로 측정 (서버가 밀려 호출이 늦어진 대기 시간 포함)
+"""
+
+import os
+import json
+import tempfile
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# (메서드, 경로, 가중치) - 앱에 새 GET 엔드포인트가 생기면 가중치 1로 자동 포함
+DEFAULT_ROUTES = [
+    ("GET", "/api/gold-premium", 5),
+    ("GET", "/api/premium?metals=gold,silver,platinum", 2),
+    ("GET", "/api/investment-strategy", 1),
+    ("GET", "/api/futures-candidates", 1),
+    ("GET", "/api/active-contract", 2),
+    ("POST", "/api/update-active-contract", 0.2),
+    ("GET", "/api/term-structure", 1),
+    ("GET", "/api/roll-status", 1),
+    ("GET", "/api/gold-analysis", 1),
+    ("GET", "/api/korean-etfs", 1),
+    ("GET", "/health", 1),
+    ("GET", "/api/token-status", 1),
+    ("GET", "/api/orderbook-analysis", 3),
+    ("GET", "/api/pressure-signal", 3),
+    ("GET", "/api/history?resolution=3600", 1),
+    ("GET", "/api/history/recent?kind=premium&n=100", 1),
+    ("GET", "/api/export/gold-prices?format=ndjson", 0.5),
+    ("GET", "/api/export/columnar?dataset=gold_prices&format=parquet", 0.2),
+    ("GET", "/api/bars?series=premium&interval=1m", 1),
+    ("GET", "/api/orderbook-history?limit=100", 0.5),
+    ("GET", "/api/alerts", 0.5),
+    ("GET", "/api/alerts/events", 0.5),
+]
+
+
+def discover_routes(app, routes):
+    """앱 URL 규칙 중 목록에 없는 인자 없는 GET 엔드포인트 추가"""
+    known = {path.split("?")[0] for _, path, _ in routes}
+    extra = []
+    for rule in app.url_map.iter_rules():
+        if rule.arguments or "GET" not in rule.methods or rule.endpoint == "static":
+            continue
+        if rule.rule not in known:
+            extra.append(("GET", rule.rule, 1))
+    return routes + extra
+
+
+def start_app_server(with_background=False):
+    """앱을 로컬 스레드 서버로 실행 - (서버, 기본 URL). 환경 변수 설정 후 호출해야 함"""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    import app as app_module
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    if not with_background:
+        # 측정 중 백그라운드 갱신이 외부 API 호출 수를 흐리지 않도록 비활성화
+        app_module._background_started = True
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", app_module.app
+
+
+_local = threading.local()
+
+
+def _session():
+    import requests
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def send(base_url, method, path, timeout=30):
+    """요청 1건 → (상태 코드, 응답 지연 초)"""
+    started = time.perf_counter()
+    try:
+        response = _session().request(method, base_url + path, timeout=timeout)
+        response.content  # 스트리밍 응답도 끝까지 수신
+        status = response.status_code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def calibrate(base_url, routes, stub):
+    """엔드포인트별 외부 API 호출 수 - 첫 호출(캐시 없음)과 두 번째 호출(캐시 적중)"""
+    result = {}
+    for method, path, _ in routes:
+        calls = []
+        for _ in range(2):
+            stub.reset_counts()
+            send(base_url, method, path)
+            calls.append(stub.snapshot_counts())
+        result[f"{method} {path}"] = {
+            "cold": sum(calls[0].values()),
+            "warm": sum(calls[1].values()),
+            "by_upstream": calls[0]
+        }
+    return result
+
+
+def run_load(base_url, routes, rps, duration, concurrency, seed=0):
+    """개방형 부하 - 예정 시각마다 요청 발사 (응답을 기다리지 않음)"""
+    rng = random.Random(seed)
+    weights = [weight for _, _, weight in routes]
+    total = int(rps * duration)
+    samples = []
+    lock = threading.Lock()
+
+    def fire(route, scheduled_at):
+        method, path, _ = route
+        status, service_time = send(base_url, method, path)
+        with lock:
+            samples.append((f"{method} {path}", status, time.perf_counter() - scheduled_at, service_time))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i in range(total):
+            scheduled_at = started + i / rps
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(fire, rng.choices(routes, weights)[0], scheduled_at)
+    elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+def summarize(samples, elapsed):
+    """엔드포인트별/전체 통계"""
+    def stats(rows):
+        latencies = np.array([row[2] for row in rows]) * 1000
+        service = np.array([row[3] for row in rows]) * 1000
+        errors = sum(1 for row in rows if row[1] == 0 or row[1] >= 500)
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            "error_rate": round(errors / len(rows), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "max_ms": round(float(latencies.max()), 2),
+            "service_p50_ms": round(float(np.percentile(service, 50)), 2),
+        }
+
+    by_route = {}
+    for row in samples:
+        by_route.setdefault(row[0], []).append(row)
+
+    return {
+        "total": stats(samples) if samples else {},
+        "routes": {route: stats(rows) for route, rows in sorted(by_route.items())}
+    }
+
+
+def print_report(report):
+    total = report["summary"]["total"]
+    print(f"\n총 {total['requests']}건, {total['throughput_rps']} req/s, 오류율 {total['error_rate'] * 100:.2f}%, "
+          f"p50 {total['p50_ms']}ms / p95 {total['p95_ms']}ms / p99 {total['p99_ms']}ms, "
+          f"요청당 외부 호출 {report['upstream_calls_per_request']}")
+    print(f"\n{'엔드포인트':<62}{'건수':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'오류%':>8}{'외부호출(첫/재)':>16}")
+    for route, stats in report["summary"]["routes"].items():
+        calls = report["calibration"].get(route, {})
+        print(f"{route[:61]:<62}{stats['requests']:>7}{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+              f"{stats['error_rate'] * 100:>8.2f}{calls.get('cold', '-'):>10}/{calls.get('warm', '-')}")
+
+
+def run_loadtest(rps=20, duration=30, concurrency=32, latency_ms=30, jitter_ms=10, error_rate=0.0,
+                 seed=0, with_background=False, routes=None):
+    """대역 서버 + 앱 서버 기동 → 외부 호출 수 측정 → 부하 → 결과 dict"""
+    from stubs.http_upstreams import start_stub_upstreams
+
+    stub = start_stub_upstreams(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate, seed=seed)
+    os.environ.update(stub.env())
+
+    # 호가/이력/내보내기 캐시는 임시 디렉터리에 기록 (운영 데이터 디렉터리 보호)
+    data_dir = tempfile.mkdtemp(prefix="loadtest_")
+    os.environ.update({
+        "ORDERBOOK_DATA_DIR": os.path.join(data_dir, "orderbook"),
+        "HISTORY_DUMP_PATH": os.path.join(data_dir, "history_dump.json"),
+        "COLUMNAR_CACHE_DIR": os.path.join(data_dir, "columnar"),
+    })
+    os.environ.setdefault("LOG_LEVEL", "ERROR")   # 주입한 외부 API 오류 경고가 결과 출력을 덮지 않도록
+    server, base_url, app = start_app_server(with_background)
+
+    try:
+        routes = discover_routes(app, list(routes or DEFAULT_ROUTES))
+        print(f"대역 서버 {stub.url}, 앱 서버 {base_url}, 엔드포인트 {len(routes)}개")
+
+        calibration = calibrate(base_url, routes, stub)
+
+        stub.reset_counts()
+        samples, elapsed = run_load(base_url, routes, rps, duration, concurrency, seed)
+        upstream_total = sum(stub.snapshot_counts().values())
+
+        return {
+            "config": {"rps": rps, "duration": duration, "concurrency": concurrency, "latency_ms": latency_ms,
+                       "jitter_ms": jitter_ms, "error_rate": error_rate, "seed": seed, "with_background": with_background},
+            "summary": summarize(samples, elapsed),
+            "upstream_calls": stub.snapshot_counts(),
+            "upstream_calls_per_request": round(upstream_total / len(samples), 3) if samples else None,
+            "calibration": calibration
+        }
+    finally:
+        server.shutdown()
+        stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 부하 테스트")
+    parser.add_argument("--rps", type=float, default=20, help="목표 초당 요청 수")
+    parser.add_argument("--duration", type=float, default=30, help="부하 시간 (초)")
+    parser.add_argument("--concurrency", type=int, default=32, help="동시 요청 최대 수")
+    parser.add_argument("--latency-ms", type=float, default=30, help="외부 API 대역 응답 지연 (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="외부 API 500 응답 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-background", action="store_true", help="백그라운드 갱신 작업도 함께 실행")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    report = run_loadtest(args.rps, args.duration, args.concurrency, args.latency_ms, args.jitter_ms,
+                          args.error_rate, args.seed, args.with_background)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"\n결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
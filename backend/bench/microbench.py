@@ -0,0 +1,339 @@
+"""
+파싱/분석 핫패스 마이크로 벤치마크 - 기록된 응답(bench/fixtures)으로 네트워크 없이 측정
+
+    python -m bench.microbench                         # 실행 후 기준 결과와 비교
+    python -m bench.microbench --save-baseline         # 기준 결과 저장 (bench/baseline.json)
+    python -m bench.microbench --filter volatility     # 이름에 포함된 것만
+    python -m bench.microbench --fail-on-regression    # 기준 대비 느려지면 종료 코드 1
+
+각 항목은 단건(scalar)과 묶음(batch), 작은/큰 이력 크기로 나눠 호출당 최소/중앙값(µs)을 측정
+"""
+
+import os
+import sys
+import json
+import copy
+import time
+import timeit
+import tempfile
+import argparse
+import platform
+import contextlib
+import statistics
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# 앱 모듈 임포트 전에 호가/이력 기록 경로를 임시 디렉터리로 (운영 데이터 디렉터리 보호)
+_data_dir = tempfile.mkdtemp(prefix="microbench_")
+os.environ.setdefault("ORDERBOOK_DATA_DIR", os.path.join(_data_dir, "orderbook"))
+os.environ.setdefault("HISTORY_DUMP_PATH", os.path.join(_data_dir, "history_dump.json"))
+os.environ.setdefault("COLUMNAR_CACHE_DIR", os.path.join(_data_dir, "columnar"))
+os.environ.setdefault("LOG_LEVEL", "ERROR")   # 경고 로그 출력이 측정값에 섞이지 않도록
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fixture_router(fixtures):
+    """URL → 기록된 응답 (api_call 대체)"""
+    def fake_api_call(url, headers=None, json_data=None):
+        if "marketIndex" in url:
+            return fixtures["naver_market_gold_international"]
+        if "pricesByPeriod" in url:
+            domestic = "chartInfoType=gold" in url
+            return fixtures["naver_chart_gold_domestic" if domestic else "naver_chart_gold_international"]
+        if "exchangeJSON" in url or "searchdate" in url:
+            return fixtures["exim_exchange"]
+        return fixtures["kis_futures_quote"]
+    return fake_api_call
+
+
+@contextlib.contextmanager
+def patched(module, **attrs):
+    """모듈 속성 임시 교체"""
+    original = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in original.items():
+            setattr(module, name, value)
+
+
+def _tile_chart(chart, size):
+    """차트 응답의 priceInfos를 size개로 늘린 사본 (큰 이력 크기용)"""
+    infos = chart["result"]["priceInfos"]
+    tiled = copy.deepcopy(chart)
+    tiled["result"]["priceInfos"] = [infos[i % len(infos)] for i in range(size)]
+    return tiled
+
+
+def _price_series(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return list(2300 * np.exp(np.cumsum(rng.normal(0, 0.01, size))))
+
+
+def _varied_orderbooks(output2, count, seed=0):
+    """잔량/접수시간을 바꾼 호가 응답 목록 (링버퍼 중복 제거에 걸리지 않도록)"""
+    rng = np.random.default_rng(seed)
+    books = []
+    for i in range(count):
+        book = dict(output2)
+        for side in ("askp_rsqn", "bidp_rsqn"):
+            for level in range(1, 6):
+                book[f"{side}{level}"] = str(int(rng.integers(1, 200)))
+        book["total_askp_rsqn"] = str(sum(int(book[f"askp_rsqn{level}"]) for level in range(1, 6)))
+        book["total_bidp_rsqn"] = str(sum(int(book[f"bidp_rsqn{level}"]) for level in range(1, 6)))
+        seconds = 9 * 3600 + i
+        book["aspr_acpt_hour"] = f"{seconds // 3600:02d}{seconds % 3600 // 60:02d}{seconds % 60:02d}"
+        books.append(book)
+    return books
+
+
+def _process_orderbook(symbol, output1, output2):
+    """get_domestic_futures_orderbook의 응답 처리 구간 (스냅샷 저장 → 미시구조 갱신 → 파싱)"""
+    from futures_api import handle_orderbook_response
+    return handle_orderbook_response(symbol, {"rt_cd": "0", "output1": output1, "output2": output2})
+
+
+# ---- 벤치마크 정의: 이름 → (준비 함수, 호출당 처리 건수) ----
+# 준비 함수는 컨텍스트 관리자로 측정 대상 함수를 넘겨주고, 끝나면 교체한 속성을 되돌림
+
+@contextlib.contextmanager
+def bench_premium_scalar(fixtures):
+    import api_utils
+    from gold_data import get_gold_premium_data
+    with patched(api_utils, api_call=_fixture_router(fixtures)):
+        yield get_gold_premium_data
+
+
+@contextlib.contextmanager
+def bench_premium_batch(fixtures):
+    import api_utils
+    from metal_data import get_metal_premium_data
+    with patched(api_utils, api_call=_fixture_router(fixtures)):
+        yield lambda: get_metal_premium_data(["gold", "silver", "platinum", "palladium"])
+
+
+def _premium_snapshots(count):
+    from metal_data import build_premium_result
+    rng = np.random.default_rng(0)
+    snapshots = []
+    for _ in range(count):
+        snapshot = build_premium_result(float(rng.uniform(2200, 2600)), float(rng.uniform(1300, 1450)),
+                                        float(rng.uniform(100000, 125000)))
+        snapshot["timestamp"] = "2025-10-20T10:15:30"
+        snapshots.append(snapshot)
+    return snapshots
+
+
+@contextlib.contextmanager
+def bench_analysis_scalar(fixtures):
+    from analysis import generate_comprehensive_analysis
+    snapshot = _premium_snapshots(1)[0]
+    yield lambda: generate_comprehensive_analysis(snapshot)
+
+
+@contextlib.contextmanager
+def bench_analysis_batch(fixtures):
+    from analysis import generate_comprehensive_analysis
+    snapshots = _premium_snapshots(1000)
+    yield lambda: [generate_comprehensive_analysis(snapshot) for snapshot in snapshots]
+
+
+def _volatility_bench(size, count=1):
+    @contextlib.contextmanager
+    def bench(fixtures):
+        from analysis import calculate_volatility
+        series = [_price_series(size, seed) for seed in range(count)]
+        if count == 1:
+            yield lambda: calculate_volatility(series[0])
+        else:
+            yield lambda: [calculate_volatility(prices) for prices in series]
+    return bench
+
+
+def _orderbook_bench(count):
+    @contextlib.contextmanager
+    def bench(fixtures):
+        response = fixtures["kis_futures_orderbook"]
+        output1 = response["output1"]
+        books = _varied_orderbooks(response["output2"], max(count, 2))
+        state = {"i": 0}
+
+        def run():
+            # 같은 호가를 연속으로 넣으면 중복으로 건너뛰므로 목록을 순환
+            for _ in range(count):
+                i = state["i"] = (state["i"] + 1) % len(books)
+                _process_orderbook("101X12", output1, books[i])
+        yield run
+    return bench
+
+
+def _active_contract_bench(candidate_count):
+    @contextlib.contextmanager
+    def bench(fixtures):
+        import futures_api
+        quote = fixtures["kis_futures_quote"]["output1"]
+        response = fixtures["kis_futures_orderbook"]
+
+        candidates = []
+        for i in range(candidate_count):
+            year, month = 2025 + (i * 2 + 10) // 12, (i * 2 + 10) % 12 + 1
+            symbol = f"101{chr(ord('W') + year - 2025)}{month:02d}"
+            candidates.append({"symbol": symbol, "year": year, "month": month,
+                               "expiry_date": None, "description": f"{year}년 {month}월물"})
+
+        # 시세/호가 응답 파싱까지 포함하되 네트워크/토큰 경로는 건너뜀
+        volumes = {c["symbol"]: str(1000 + i * 37 % 500) for i, c in enumerate(candidates)}
+        def quote_for(symbol):
+            return futures_api.parse_futures_quote(symbol, {**quote, "acml_vol": volumes[symbol]})
+        def orderbook_for(symbol):
+            return futures_api.parse_orderbook_response(symbol, response["output1"], response["output2"])
+
+        with patched(futures_api, generate_gold_futures_candidates=lambda: candidates,
+                     get_domestic_futures_data=quote_for, get_domestic_futures_orderbook=orderbook_for):
+            yield futures_api.find_active_gold_contract
+    return bench
+
+
+def _history_bench(size):
+    @contextlib.contextmanager
+    def bench(fixtures):
+        import api_utils
+        from config import NAVER_GOLD_INTERNATIONAL_CHART_URL
+        chart = _tile_chart(fixtures["naver_chart_gold_international"], size)
+        with patched(api_utils, api_call=lambda url, headers=None, json_data=None: chart):
+            yield lambda: api_utils.get_naver_price_history(NAVER_GOLD_INTERNATIONAL_CHART_URL)
+    return bench
+
+
+BENCHMARKS = {
+    "premium.gold.scalar": (bench_premium_scalar, 1),
+    "premium.metals.batch4": (bench_premium_batch, 4),
+    "analysis.comprehensive.scalar": (bench_analysis_scalar, 1),
+    "analysis.comprehensive.batch1000": (bench_analysis_batch, 1000),
+    "volatility.small60": (_volatility_bench(60), 1),
+    "volatility.large10000": (_volatility_bench(10000), 1),
+    "volatility.batch100x250": (_volatility_bench(250, 100), 100),
+    "orderbook.parse.scalar": (_orderbook_bench(1), 1),
+    "orderbook.parse.batch1000": (_orderbook_bench(1000), 1000),
+    "active_contract.merge.small4": (_active_contract_bench(4), 4),
+    "active_contract.merge.large100": (_active_contract_bench(100), 100),
+    "history.parse.small250": (_history_bench(250), 250),
+    "history.parse.large5000": (_history_bench(5000), 5000),
+}
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """호출당 시간 (µs) - autorange로 반복 횟수를 정한 뒤 repeat회 측정"""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number * 1e6 for t in timer.repeat(repeat, number)]
+    return {"min_us": round(min(runs), 3), "median_us": round(statistics.median(runs), 3), "number": number}
+
+
+def run_benchmarks(names=None, repeat=5):
+    fixtures = {name[:-5]: load_fixture(name[:-5]) for name in os.listdir(FIXTURE_DIR) if name.endswith(".json")}
+    results = {}
+
+    for name, (setup, items) in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        # 측정 대상의 로그 출력은 버림 (출력 비용이 측정값을 흐리지 않도록)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            with setup(fixtures) as fn:
+                fn()  # 워밍업 (지연 임포트/스레드 풀 생성)
+                result = measure(fn, repeat)
+        result["items"] = items
+        result["per_item_us"] = round(result["median_us"] / items, 3)
+        results[name] = result
+        print(f"{name:<36}{result['min_us']:>14.1f}{result['median_us']:>14.1f}{result['per_item_us']:>14.2f}")
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """기준 결과 대비 중앙값 비율 - (이름, 기준 µs, 현재 µs, 비율, 판정) 목록"""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            rows.append((name, None, result["median_us"], None, "신규"))
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else None
+        if ratio is None:
+            verdict = "-"
+        elif ratio > 1 + threshold:
+            verdict = "느려짐"
+        elif ratio < 1 - threshold:
+            verdict = "빨라짐"
+        else:
+            verdict = "동일"
+        rows.append((name, base["median_us"], result["median_us"], ratio, verdict))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="파싱/분석 핫패스 마이크로 벤치마크")
+    parser.add_argument("--filter", action="append", help="이름에 이 문자열이 포함된 항목만 (여러 번 지정 가능)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="기준 결과 파일")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준 결과로 저장")
+    parser.add_argument("--threshold", type=float, default=0.1, help="느려짐 판정 비율 (기본 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="느려진 항목이 있으면 종료 코드 1")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    print(f"{'항목':<36}{'min µs':>14}{'median µs':>14}{'µs/건':>14}")
+    results = run_benchmarks(args.filter, args.repeat)
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                 "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+
+    if args.save_baseline:
+        # 일부 항목만 돌린 경우 기존 기준 결과의 나머지 항목은 유지
+        if args.filter and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                report["results"] = {**json.load(f).get("results", {}), **results}
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"\n기준 결과 저장: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\n기준 결과가 없습니다. --save-baseline으로 먼저 저장하세요.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    print(f"\n기준 결과 비교 ({baseline.get('meta', {}).get('created_at', '-')}, 허용 ±{args.threshold * 100:.0f}%)")
+    regressions = 0
+    for name, base_us, current_us, ratio, verdict in compare(results, baseline, args.threshold):
+        base_text = f"{base_us:.1f}" if base_us is not None else "-"
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else "-"
+        print(f"{name:<36}{base_text:>14}{current_us:>14.1f}{ratio_text:>10}  {verdict}")
+        regressions += verdict == "느려짐"
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+외부 API 응답 카세트 - api_call 응답을 시각과 함께 gzip NDJSON으로 기록하고, 같은 순서로 재생
+
+    CASSETTE_MODE=record python app.py                                  # 운영 중 응답 기록 (data/cassettes/YYYYMMDD.ndjson.gz)
+    CASSETTE_MODE=replay CASSETTE_DIR=... python app.py                  # 외부 API 대신 기록된 응답 사용
+    python -m cassette replay data/cassettes/20251020.ndjson.gz --speed 0   # 하루치 응답으로 분석 파이프라인 구동
+    python -m cassette info data/cassettes/20251020.ndjson.gz
+
+재생은 요청 키(메서드 + 호스트/비밀값/조회일을 뺀 URL)별로 기록된 순서대로 응답을 돌려줌 - 스레드 동시 조회에서도 결정적
+"""
+
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import atexit
+import argparse
+import datetime
+import threading
+import contextlib
+from collections import deque, Counter
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from structured_log import get_logger
+from config import (
+    CASSETTE_MODE,
+    CASSETTE_DIR,
+    CASSETTE_FLUSH_EVERY,
+    CASSETTE_FLUSH_SECONDS,
+    CASSETTE_IGNORE_PARAMS,
+    CASSETTE_REDACT_FIELDS,
+    KIS_FUTURES_URL,
+    KIS_ORDERBOOK_URL,
+    NAVER_GOLD_INTERNATIONAL_CHART_URL
+)
+
+log = get_logger("cassette")
+
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+_mode = CASSETTE_MODE if CASSETTE_MODE in ("record", "replay") else "off"
+_lock = threading.Lock()
+_pending = []                 # 기록 대기 항목
+_last_flush = time.time()
+_tapes = {}                   # 요청 키 -> 남은 응답 deque (재생)
+_stats = Counter()
+
+
+def normalize_url(url):
+    """비밀값/조회일 쿼리를 빼고 나머지를 정렬한 URL (기록 파일에 남는 형태)"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in CASSETTE_IGNORE_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def request_key(method, url):
+    """재생 키 - 호스트는 빼서 기본 URL을 바꿔 실행해도(대역 서버 등) 같은 응답을 찾음"""
+    parts = urlsplit(normalize_url(url))
+    return f"{method} {parts.path}?{parts.query}"
+
+
+def _redact(payload):
+    if isinstance(payload, dict) and any(field in payload for field in CASSETTE_REDACT_FIELDS):
+        return {k: ("REDACTED" if k in CASSETTE_REDACT_FIELDS else v) for k, v in payload.items()}
+    return payload
+
+
+def recording():
+    return _mode == "record"
+
+
+def replaying():
+    return _mode == "replay"
+
+
+# ---- 기록 ----
+
+def start_recording():
+    global _mode
+    _mode = "record"
+
+
+def stop():
+    """기록 중이면 남은 항목을 내려쓰고 카세트 비활성화"""
+    global _mode
+    if _mode == "record":
+        flush()
+    _mode = "off"
+    with _lock:
+        _tapes.clear()
+
+
+def record(method, url, payload, error=None, elapsed=None):
+    """응답 1건 기록 (쌓인 개수/경과 시간 기준으로 파일에 추가)"""
+    entry = {
+        "t": time.time(),
+        "method": method,
+        "url": normalize_url(url),
+        "elapsed_ms": round(elapsed * 1000, 2) if elapsed is not None else None,
+        "payload": _redact(payload),
+        "error": error
+    }
+    with _lock:
+        _pending.append(entry)
+        _stats["recorded"] += 1
+        due = len(_pending) >= CASSETTE_FLUSH_EVERY or entry["t"] - _last_flush >= CASSETTE_FLUSH_SECONDS
+    if due:
+        flush()
+
+
+def cassette_path(ts, directory=CASSETTE_DIR):
+    day = datetime.datetime.fromtimestamp(ts, KST).strftime('%Y%m%d')
+    return os.path.join(directory, f"{day}.ndjson.gz")
+
+
+def flush(directory=CASSETTE_DIR):
+    """대기 항목을 일자별 파일에 gzip 멤버로 추가 (파일을 열어두지 않아 중간에 종료돼도 이전 멤버는 온전)"""
+    global _last_flush
+    with _lock:
+        entries = _pending[:]
+        _pending.clear()
+        _last_flush = time.time()
+    if not entries:
+        return 0
+
+    by_path = {}
+    for entry in entries:
+        by_path.setdefault(cassette_path(entry["t"], directory), []).append(entry)
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for path, rows in by_path.items():
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write("".join(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows))
+        return len(entries)
+    except Exception as e:
+        log.warning("카세트 기록 실패: %s", e)
+        return 0
+
+
+atexit.register(lambda: _mode == "record" and flush())
+
+
+# ---- 재생 ----
+
+def load_entries(paths):
+    """카세트 파일(들) → 시각 순 항목 목록"""
+    entries = []
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    entries.sort(key=lambda entry: entry["t"])
+    return entries
+
+
+def start_replay(entries=None, paths=None):
+    """재생 모드 시작 - 항목 또는 파일 목록 (없으면 CASSETTE_DIR의 모든 파일)"""
+    global _mode
+    if entries is None:
+        entries = load_entries(paths or sorted(glob.glob(os.path.join(CASSETTE_DIR, "*.ndjson.gz"))))
+
+    tapes = {}
+    for entry in entries:
+        tapes.setdefault(request_key(entry["method"], entry["url"]), deque()).append(entry)
+
+    with _lock:
+        _tapes.clear()
+        _tapes.update(tapes)
+    _mode = "replay"
+    log.info("카세트 재생 시작: %d건, 요청 종류 %d개", len(entries), len(tapes))
+    return len(entries)
+
+
+def replay(method, url):
+    """요청 키의 다음 기록 응답 (남은 기록이 없으면 None)"""
+    key = request_key(method, url)
+    with _lock:
+        tape = _tapes.get(key)
+        if not tape:
+            _stats["misses"] += 1
+            entry = None
+        else:
+            _stats["replayed"] += 1
+            entry = tape.popleft()
+    if entry is None:
+        log.warning("카세트에 없는 요청: %s", key)
+        return None
+    return entry["payload"]
+
+
+def get_cassette_stats():
+    with _lock:
+        return {"mode": _mode, "pending": len(_pending), "remaining": sum(len(tape) for tape in _tapes.values()), **_stats}
+
+
+# ---- 파이프라인 구동 ----
+
+def _symbol_of(url):
+    query = {k.lower(): v for k, v in parse_qsl(urlsplit(url).query)}
+    return query.get("fid_input_iscd")
+
+
+def replay_pipeline(paths, speed=0, quiet=True):
+    """기록된 하루치 응답으로 분석 파이프라인 구동 - speed: 0이면 대기 없이, 1이면 원래 속도, N이면 N배속
+
+    국제 금 차트 응답 시점마다 프리미엄 계산(국내 금/환율은 재생 응답 사용), 선물 시세/호가 응답은 바로 처리
+    """
+    from gold_data import get_gold_premium_data
+    from futures_api import handle_futures_quote, handle_orderbook_response
+
+    entries = load_entries(paths)
+    start_replay(entries)
+
+    premium_key = request_key("GET", NAVER_GOLD_INTERNATIONAL_CHART_URL)
+    quote_path = urlsplit(KIS_FUTURES_URL).path
+    orderbook_path = urlsplit(KIS_ORDERBOOK_URL).path
+    counts = Counter()
+
+    started = time.perf_counter()
+    first_t = entries[0]["t"] if entries else 0
+    output = open(os.devnull, "w") if quiet else None
+    try:
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            for entry in entries:
+                if speed > 0:
+                    delay = (entry["t"] - first_t) / speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                path = urlsplit(entry["url"]).path
+                if request_key(entry["method"], entry["url"]) == premium_key:
+                    # 프리미엄 계산이 재생 테이프에서 이 응답을 직접 꺼내 씀
+                    counts["premium"] += get_gold_premium_data() is not None
+                elif path == quote_path:
+                    _consume(entry)
+                    counts["quote"] += handle_futures_quote(_symbol_of(entry["url"]), entry["payload"]) is not None
+                elif path == orderbook_path:
+                    _consume(entry)
+                    counts["orderbook"] += handle_orderbook_response(_symbol_of(entry["url"]), entry["payload"]) is not None
+    finally:
+        if output:
+            output.close()
+        stop()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "entries": len(entries),
+        "recorded_span_seconds": round(entries[-1]["t"] - first_t, 1) if entries else 0,
+        "elapsed_seconds": round(elapsed, 3),
+        "entries_per_second": round(len(entries) / elapsed, 1) if elapsed else None,
+        **counts
+    }
+
+
+def _consume(entry):
+    """직접 처리한 항목을 재생 테이프에서 제거 (같은 키의 다른 조회가 이 응답을 다시 받지 않도록)"""
+    with _lock:
+        tape = _tapes.get(request_key(entry["method"], entry["url"]))
+        if tape and tape[0] is entry:
+            tape.popleft()
+
+
+def describe(paths):
+    """카세트 요약 - 요청 종류별 건수/오류 수, 기록 구간"""
+    entries = load_entries(paths)
+    kinds = Counter(f"{entry['method']} {urlsplit(entry['url']).netloc}{urlsplit(entry['url']).path}" for entry in entries)
+    errors = sum(1 for entry in entries if entry.get("error") or entry.get("payload") is None)
+    span = (entries[0]["t"], entries[-1]["t"]) if entries else (None, None)
+    return {"entries": len(entries), "errors": errors, "span": span, "requests": dict(kinds.most_common())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="외부 API 응답 카세트")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = sub.add_parser("replay", help="기록된 응답으로 분석 파이프라인 구동")
+    replay_parser.add_argument("paths", nargs="+")
+    replay_parser.add_argument("--speed", type=float, default=0, help="0: 대기 없이, 1: 원래 속도, N: N배속")
+    replay_parser.add_argument("--verbose", action="store_true", help="파이프라인 로그 출력")
+
+    info_parser = sub.add_parser("info", help="카세트 요약")
+    info_parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        result = describe(args.paths)
+        start, end = result.pop("span")
+        if start:
+            fmt = lambda ts: datetime.datetime.fromtimestamp(ts, KST).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"기록 구간: {fmt(start)} ~ {fmt(end)}")
+        print(json.dumps(result, ensure_ascii=False, indent=1))
+        return
+
+    result = replay_pipeline(args.paths, args.speed, quiet=not args.verbose)
+    print(json.dumps(result, ensure_ascii=False, indent=1))
+    if result["entries"] and not (result.get("premium") or result.get("quote") or result.get("orderbook")):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+외부 API 장애 차단 - 외부 API별 차단기(closed/open/half-open)와 실패 URL 단기 캐시
+
+장애 중에 요청마다 전체 조회 체인(환율 5일 재시도, 백업 URL 등)을 다시 돌며 타임아웃을 기다리지 않도록,
+연속 실패가 쌓이면 일정 시간 호출 없이 바로 실패로 처리하고 그동안 엔드포인트는 마지막 정상 스냅샷으로 응답
+"""
+
+import time
+import threading
+
+import metrics
+from structured_log import get_logger
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_SECONDS, NEGATIVE_CACHE_SECONDS, NEGATIVE_CACHE_MAX_ENTRIES
+
+log = get_logger("circuit_breaker")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_TRANSITIONS = metrics.Counter("circuit_transitions_total", "차단기 상태 전환 수", ("upstream", "state"))
+CIRCUIT_REJECTED = metrics.Counter("circuit_rejected_calls_total", "차단기/실패 캐시로 생략한 외부 호출 수", ("upstream", "reason"))
+
+
+class CircuitBreaker:
+    """연속 실패 failure_threshold회 → open (open_seconds 동안 호출 차단) → half-open (시험 호출 1건) → 성공 시 closed"""
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, open_seconds=CIRCUIT_OPEN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        if state != self.state:
+            self.state = state
+            CIRCUIT_TRANSITIONS.inc(self.name, state)
+            if state == OPEN:
+                log.warning("차단기 열림: %s (연속 실패 %d회, %.0f초 차단)", self.name, self.failures, self.open_seconds)
+            else:
+                log.info("차단기 %s: %s", "시험 호출" if state == HALF_OPEN else "닫힘", self.name)
+
+    def _cooled_down(self):
+        return time.monotonic() - self.opened_at >= self.open_seconds
+
+    def available(self):
+        """지금 호출이 허용될지 (상태를 바꾸지 않고 확인만)"""
+        with self._lock:
+            if self.state == OPEN:
+                return self._cooled_down()
+            return self.state == CLOSED or not self.probing
+
+    def allow(self):
+        """호출 허용 여부 - half-open에서는 동시에 1건만 시험 호출 (허용했으면 결과를 반드시 record로 알려야 함)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if not self._cooled_down():
+                    return False
+                self._transition(HALF_OPEN)
+                self.probing = False
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record(self, ok):
+        """호출 결과 - True: 성공, False: 실패, None: 판단 보류 (요청 기한으로 끊긴 경우 등, 시험 호출만 반납)"""
+        with self._lock:
+            self.probing = False
+            if ok is None:
+                return
+            if ok:
+                self.failures = 0
+                self._transition(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def status(self):
+        with self._lock:
+            status = {"state": self.state, "consecutive_failures": self.failures}
+            if self.state == OPEN:
+                status["retry_in_seconds"] = round(max(self.open_seconds - (time.monotonic() - self.opened_at), 0), 1)
+            return status
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream):
+    breaker = _breakers.get(upstream)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(upstream, CircuitBreaker(upstream))
+    return breaker
+
+
+def available(upstream):
+    """외부 API 호출이 지금 허용되는지 - 차단 중이면 False"""
+    return get_breaker(upstream).available()
+
+
+def get_circuit_status():
+    return {name: breaker.status() for name, breaker in list(_breakers.items())}
+
+
+metrics.Gauge("circuit_state", "차단기 상태 (0: closed, 1: half-open, 2: open)", ("upstream",),
+              lambda: {(name,): _STATE_VALUES[breaker.state] for name, breaker in list(_breakers.items())})
+
+
+# ---- 실패 URL 단기 캐시 ----
+
+_failed_until = {}      # (메서드, URL) → 다시 호출할 수 있는 시각
+_failed_lock = threading.Lock()
+
+
+def recently_failed(method, url):
+    """같은 요청이 NEGATIVE_CACHE_SECONDS 안에 실패했으면 True"""
+    until = _failed_until.get((method, url))
+    return until is not None and time.monotonic() < until
+
+
+def remember_failure(method, url):
+    now = time.monotonic()
+    with _failed_lock:
+        if len(_failed_until) >= NEGATIVE_CACHE_MAX_ENTRIES:
+            for key in [key for key, until in _failed_until.items() if until <= now]:
+                del _failed_until[key]
+            if len(_failed_until) >= NEGATIVE_CACHE_MAX_ENTRIES:
+                _failed_until.clear()
+        _failed_until[(method, url)] = now + NEGATIVE_CACHE_SECONDS
+
+
+def forget_failure(method, url):
+    _failed_until.pop((method, url), None)
@@ -0,0 +1,191 @@
+"""
+열 지향(Parquet/Arrow) 내보내기 - 일 단위 파티션, 마감된 날짜는 디스크 캐시 후 재사용
+"""
+
+import io
+import os
+import datetime
+import pandas as pd
+
+import metrics
+from config import (
+    GOLD_DATA_TABLE,
+    ACTIVE_CONTRACT_TABLE,
+    COLUMNAR_CACHE_DIR,
+    COLUMNAR_COMPRESSION,
+    COLUMNAR_ROW_GROUP_SIZE,
+    COLUMNAR_MAX_DAYS
+)
+from orderbook_store import LEVELS, PRICE_SCALE, KST
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    COLUMNAR_AVAILABLE = True
+except ImportError:
+    COLUMNAR_AVAILABLE = False
+    print("pyarrow 라이브러리가 없습니다. Parquet/Arrow 내보내기를 사용할 수 없습니다.")
+
+# 데이터셋명: (Supabase 테이블, 시간 컬럼) - orderbook은 로컬 호가 저장소에서 종목별로 읽음
+COLUMNAR_DATASETS = {
+    "gold_prices": (GOLD_DATA_TABLE, "created_at"),
+    "active_contracts": (ACTIVE_CONTRACT_TABLE, "updated_at"),
+    "orderbook": (None, "ts"),
+}
+
+COLUMNAR_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def _day_range(start, end):
+    """[start, end)와 겹치는 KST 날짜 목록"""
+    day = start.astimezone(KST).date()
+    last = (end - datetime.timedelta(microseconds=1)).astimezone(KST).date()
+    days = []
+    while day <= last:
+        days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def _day_bounds(day):
+    start = datetime.datetime.combine(day, datetime.time(), tzinfo=KST)
+    return start, start + datetime.timedelta(days=1)
+
+
+def _partition_path(dataset, day, symbol=None):
+    parts = [COLUMNAR_CACHE_DIR, dataset] + ([symbol] if symbol else []) + [f"date={day.isoformat()}.parquet"]
+    return os.path.join(*parts)
+
+
+def _frame_to_table(frame, time_column):
+    if time_column in frame.columns:
+        frame[time_column] = pd.to_datetime(frame[time_column], utc=True, format='ISO8601')
+        frame = frame.sort_values(time_column, kind='stable')
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def _fetch_supabase_day(table, time_column, day):
+    """Supabase 하루치 행 → Arrow 테이블 (시간 범위는 쿼리 조건으로 전달)"""
+    from export import iter_export_pages
+
+    start, end = _day_bounds(day)
+    rows = []
+    for page, _ in iter_export_pages(table, start.isoformat(), end.isoformat(), time_column=time_column):
+        rows.extend(page)
+    return _frame_to_table(pd.DataFrame(rows), time_column)
+
+
+def _fetch_orderbook_day(symbol, day):
+    """호가 저장소 하루치 → 단계별 평탄화 컬럼 Arrow 테이블"""
+    from orderbook_store import query_orderbook
+
+    start, end = _day_bounds(day)
+    rows = query_orderbook(symbol, int(start.timestamp() * 1000), int(end.timestamp() * 1000) - 1)
+
+    columns = {"ts": pa.array(rows["ts"], type=pa.timestamp("ms", tz="UTC"))}
+    for side in ("ask", "bid"):
+        for level in range(LEVELS):
+            columns[f"{side}_price_{level + 1}"] = pa.array(rows[f"{side}_price"][:, level] / PRICE_SCALE)
+        for level in range(LEVELS):
+            columns[f"{side}_qty_{level + 1}"] = pa.array(rows[f"{side}_qty"][:, level])
+        for level in range(LEVELS):
+            columns[f"{side}_count_{level + 1}"] = pa.array(rows[f"{side}_count"][:, level])
+    columns["total_ask_qty"] = pa.array(rows["total_ask_qty"])
+    columns["total_bid_qty"] = pa.array(rows["total_bid_qty"])
+    return pa.table(columns)
+
+
+def _build_partition(dataset, day, symbol=None):
+    table, time_column = COLUMNAR_DATASETS[dataset]
+    if dataset == "orderbook":
+        return _fetch_orderbook_day(symbol, day)
+    return _fetch_supabase_day(table, time_column, day)
+
+
+def load_partition(dataset, day, symbol=None, start=None, end=None, refresh=False):
+    """하루 파티션 조회 - 마감된 날짜는 캐시 파일에서 읽고, start/end는 행 그룹 통계로 먼저 거름"""
+    _, time_column = COLUMNAR_DATASETS[dataset]
+    closed = day < datetime.datetime.now(KST).date()
+    path = _partition_path(dataset, day, symbol)
+
+    if closed and not refresh and os.path.exists(path):
+        metrics.cache_hit("columnar_partition")
+        if time_column not in pq.read_schema(path).names:
+            return pq.read_table(path)  # 행이 없는 날짜
+        filters = []
+        if start is not None:
+            filters.append((time_column, ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append((time_column, "<", pd.Timestamp(end)))
+        return pq.read_table(path, filters=filters or None)
+
+    if closed:
+        metrics.cache_miss("columnar_partition")
+    table = _build_partition(dataset, day, symbol)
+
+    # 마감된 날짜는 더 바뀌지 않으므로 압축 파일로 저장 (임시 파일 기록 후 교체)
+    if closed:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path, compression=COLUMNAR_COMPRESSION, row_group_size=COLUMNAR_ROW_GROUP_SIZE)
+        os.replace(tmp_path, path)
+
+    return _filter_time(table, time_column, start, end)
+
+
+def _filter_time(table, time_column, start, end):
+    if time_column not in table.column_names or table.num_rows == 0:
+        return table
+    import pyarrow.compute as pc
+
+    mask = None
+    if start is not None:
+        mask = pc.greater_equal(table[time_column], pa.scalar(pd.Timestamp(start), type=table[time_column].type))
+    if end is not None:
+        upper = pc.less(table[time_column], pa.scalar(pd.Timestamp(end), type=table[time_column].type))
+        mask = upper if mask is None else pc.and_(mask, upper)
+    return table.filter(mask) if mask is not None else table
+
+
+def export_columnar(dataset, start, end, fmt="parquet", symbol=None, refresh=False):
+    """기간 데이터셋 → Parquet/Arrow 파일 바이트 (경계 날짜만 시간 필터, 중간 날짜는 파티션 전체)"""
+    if not COLUMNAR_AVAILABLE:
+        raise RuntimeError("pyarrow 라이브러리가 설치되어 있지 않습니다")
+    if dataset not in COLUMNAR_DATASETS:
+        raise ValueError(f"지원하지 않는 데이터셋입니다: {dataset}")
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+    if dataset == "orderbook" and not symbol:
+        raise ValueError("orderbook 데이터셋은 symbol이 필요합니다")
+
+    days = _day_range(start, end)
+    if len(days) > COLUMNAR_MAX_DAYS:
+        raise ValueError(f"요청 기간이 너무 깁니다 (최대 {COLUMNAR_MAX_DAYS}일)")
+
+    tables = []
+    for day in days:
+        day_start, day_end = _day_bounds(day)
+        table = load_partition(
+            dataset, day, symbol,
+            start=start if start > day_start else None,
+            end=end if end < day_end else None,
+            refresh=refresh
+        )
+        if table.num_rows:
+            tables.append(table)
+
+    if tables:
+        combined = pa.concat_tables(tables, promote_options="default")
+    else:
+        combined = pa.table({})
+
+    sink = io.BytesIO()
+    if fmt == "parquet":
+        pq.write_table(combined, sink, compression=COLUMNAR_COMPRESSION, row_group_size=COLUMNAR_ROW_GROUP_SIZE)
+    else:
+        with pa.ipc.new_file(sink, combined.schema, options=pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION)) as writer:
+            writer.write_table(combined)
+    return sink.getvalue(), combined.num_rows
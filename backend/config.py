@@ -18,24 +18,194 @@ EXCHANGE_RATE_API_KEY = os.getenv("EXCHANGE_RATE_API_KEY")
 # Supabase 설정
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))   # 쿼리당 최대 대기 시간
+SUPABASE_POOL_SIZE = 10                 # 재사용할 최대 연결 수 (keep-alive)
+SUPABASE_RETRY_SECONDS = 30             # 클라이언트 생성 실패 후 재시도 간격
+
+# 외부 API 기본 주소 - 부하 테스트 등에서 로컬 대역 서버로 바꿀 때 환경 변수로 지정
+KIS_API_BASE = os.getenv("KIS_API_BASE", "https://openapi.koreainvestment.com:9443")
+NAVER_API_BASE = os.getenv("NAVER_API_BASE", "https://m.stock.naver.com")
+EXIM_API_BASE = os.getenv("EXIM_API_BASE", "https://oapi.koreaexim.go.kr")
 
 # API 엔드포인트
-KIS_TOKEN_URL = "https://openapi.koreainvestment.com:9443/oauth2/tokenP"
-KIS_FUTURES_URL = "https://openapi.koreainvestment.com:9443/uapi/domestic-futureoption/v1/quotations/inquire-price"
+KIS_TOKEN_URL = f"{KIS_API_BASE}/oauth2/tokenP"
+KIS_FUTURES_URL = f"{KIS_API_BASE}/uapi/domestic-futureoption/v1/quotations/inquire-price"
+KIS_ORDERBOOK_URL = f"{KIS_API_BASE}/uapi/domestic-futureoption/v1/quotations/inquire-asking-price"
+KIS_APPROVAL_URL = f"{KIS_API_BASE}/oauth2/Approval"
 NAVER_GOLD_URL = "https://polling.finance.naver.com/api/realtime/domestic/GOLD"
-EXCHANGE_RATE_URL = "https://www.koreaexim.go.kr/site/program/financial/exchangeJSON"
+EXCHANGE_RATE_URL = f"{EXIM_API_BASE}/site/program/financial/exchangeJSON"
+KIS_FUTURES_DAILY_URL = f"{KIS_API_BASE}/uapi/domestic-futureoption/v1/quotations/inquire-daily-fuopchartprice"
+
+# KIS 실시간(WebSocket) 시세 설정 - KIS_STREAMING_ENABLED=true 일 때만 사용
+KIS_STREAMING_ENABLED = os.getenv("KIS_STREAMING_ENABLED", "false").lower() == "true"
+KIS_WS_URL = os.getenv("KIS_WS_URL", "ws://ops.koreainvestment.com:21000")
+KIS_WS_APPROVAL_KEY = os.getenv("KIS_WS_APPROVAL_KEY")  # 지정 시 접속키 발급 생략 (대역 서버 테스트용)
+KIS_WS_QUOTE_TR_ID = "H0IFCNT0"       # 지수선물 실시간 체결가
+KIS_WS_ORDERBOOK_TR_ID = "H0IFASP0"   # 지수선물 실시간 호가
+STREAM_MAX_AGE_SECONDS = 10           # 이 시간보다 오래된 스트림 데이터는 REST로 대체
+STREAM_RECONNECT_MAX_SECONDS = 60     # 재연결 대기 최대 시간 (지수 백오프)
+
+# 네이버 귀금속 시세 API URLs - {code}: 로이터 코드, {chart_type}: futures(국제) / gold(국내)
+NAVER_METAL_CHART_URL = NAVER_API_BASE + "/front-api/chart/pricesByPeriod?reutersCode={code}&category=metals&chartInfoType={chart_type}&scriptChartType=day"
+NAVER_METAL_MARKET_URL = NAVER_API_BASE + "/front-api/marketIndex/prices?category=metals&reutersCode={code}&page=1"
+
+# 귀금속 종목 레지스트리 - international: 국제 시세 (USD/oz), domestic: 국내 시세 (KRW/g, 없으면 프리미엄 계산 생략)
+METAL_INSTRUMENTS = {
+    "gold": {"name": "금", "international": ("GCcv1", "futures"), "domestic": ("M04020000", "gold")},
+    "silver": {"name": "은", "international": ("SIcv1", "futures"), "domestic": None},
+    "platinum": {"name": "백금", "international": ("PLcv1", "futures"), "domestic": None},
+    "palladium": {"name": "팔라듐", "international": ("PAcv1", "futures"), "domestic": None},
+}
+PREMIUM_FETCH_WORKERS = 8         # 종목별 시세/환율 동시 조회 스레드 수
 
 # 네이버 금시세 API URLs (실제 사용)
-NAVER_GOLD_INTERNATIONAL_CHART_URL = "https://m.stock.naver.com/front-api/chart/pricesByPeriod?reutersCode=GCcv1&category=metals&chartInfoType=futures&scriptChartType=day"
-NAVER_GOLD_INTERNATIONAL_MARKET_URL = "https://m.stock.naver.com/front-api/marketIndex/prices?category=metals&reutersCode=GCcv1&page=1"
-NAVER_GOLD_DOMESTIC_CHART_URL = "https://m.stock.naver.com/front-api/chart/pricesByPeriod?reutersCode=M04020000&category=metals&chartInfoType=gold&scriptChartType=day"
-NAVER_GOLD_DOMESTIC_MARKET_URL = "https://m.stock.naver.com/front-api/marketIndex/prices?category=metals&reutersCode=M04020000&page=1"
+NAVER_GOLD_INTERNATIONAL_CHART_URL = NAVER_METAL_CHART_URL.format(code="GCcv1", chart_type="futures")
+NAVER_GOLD_INTERNATIONAL_MARKET_URL = NAVER_METAL_MARKET_URL.format(code="GCcv1")
+NAVER_GOLD_DOMESTIC_CHART_URL = NAVER_METAL_CHART_URL.format(code="M04020000", chart_type="gold")
+NAVER_GOLD_DOMESTIC_MARKET_URL = NAVER_METAL_MARKET_URL.format(code="M04020000")
+
+# 네이버 종목(ETF) 일별 차트 API - {code}에 종목코드 대입
+NAVER_STOCK_CHART_URL = NAVER_API_BASE + "/front-api/chart/pricesByPeriod?reutersCode={code}&category=stock&chartInfoType=item&scriptChartType=day"
+
+# 한국 금 ETF 설정 (종목코드: 이름) - GOLD_ETF_CODES 환경 변수로 분석 대상 변경 가능
+KOREAN_GOLD_ETFS = {
+    "132030": "KODEX 골드선물(H)",
+    "114800": "KODEX 인버스",
+    "261220": "KODEX 골드선물인버스2X",
+}
+GOLD_ETF_CODES = [code.strip() for code in os.getenv("GOLD_ETF_CODES", ",".join(KOREAN_GOLD_ETFS)).split(",") if code.strip()]
+ETF_ANALYSIS_WINDOW = 20          # 롤링 통계 윈도우 (거래일)
+ETF_CACHE_MINUTES = 30            # ETF 시계열 갱신 주기
 
 # 캐시 설정
 CACHE_DURATION_MINUTES = 10
 ACTIVE_CONTRACT_UPDATE_HOURS = 24
 
+# 월물 롤오버 엔진 설정
+ROLL_WINDOW_DAYS = 10             # 만기 전 롤 구간 (일)
+ROLL_CONFIRM_OBSERVATIONS = 3     # 차월 거래량 역전이 연속 몇 번 확인되어야 롤할지
+ROLL_HISTORY_LENGTH = 500         # 월물별 거래량/미결제약정 보관 개수
+ROLL_POLL_MINUTES = 60            # 평시 조회 주기 (근월/차월 2개만 조회)
+ROLL_WINDOW_POLL_MINUTES = 15     # 롤 구간 조회 주기 (전체 후보 조회)
+
+# 호가 스냅샷 저장소 설정
+ORDERBOOK_DATA_DIR = os.getenv("ORDERBOOK_DATA_DIR", os.path.join(os.path.dirname(__file__), "data", "orderbook"))
+ORDERBOOK_RING_CAPACITY = 4096    # 종목별 메모리 링버퍼 크기 (스냅샷 수)
+ORDERBOOK_CHUNK_SIZE = 512        # 이 개수만큼 쌓이면 디스크 청크 파일로 기록
+
+# 호가 미시구조 분석 설정
+MICROSTRUCTURE_EWMA_ALPHA = 0.2           # 압력/OFI 지수평활 계수
+MICROSTRUCTURE_DEPTH_DECAY = 0.5          # 호가 단계별 가중치 감소율 (1단계=1, 2단계=0.5, ...)
+MICROSTRUCTURE_MAX_AGE_SECONDS = 60       # 이 시간 이내 상태는 KIS 재호출 없이 사용
+
+# OHLCV 봉 집계 설정
+BAR_INTERVALS = {"1m": 60, "5m": 300, "1h": 3600}
+BAR_RING_CAPACITY = 1440          # 시계열·주기별 메모리 보관 봉 수
+BAR_FLUSH_BATCH = 50              # 마감 봉이 이만큼 쌓이면 일괄 저장
+
+# 최근 이력 링버퍼 설정
+HISTORY_CAPACITY = 2880                       # 종류별 보관 스냅샷 수 (5분 주기 기준 10일)
+HISTORY_CONTRACT_MIN_INTERVAL_SECONDS = 5     # 선물 스냅샷 최소 기록 간격
+HISTORY_DUMP_PATH = os.getenv("HISTORY_DUMP_PATH", os.path.join(os.path.dirname(__file__), "data", "history_dump.json"))
+
+# 보존 정책 (원본 → 1분/1시간/1일 집계 후 원본 만료)
+RAW_RETENTION_DAYS = 7
+ROLLUP_TIERS = {
+    # 주기명: (테이블, 주기 초, 보존 일수 - None이면 영구 보존)
+    "1m": ("gold_prices_1m", 60, 90),
+    "1h": ("gold_prices_1h", 3600, 730),
+    "1d": ("gold_prices_1d", 86400, None),
+}
+ROLLUP_METRICS = ["london_gold_usd", "london_gold_krw", "exchange_rate", "domestic_gold_price", "premium_percentage"]
+RETENTION_PAGE_SIZE = 1000        # 원본 조회 페이지 크기
+RETENTION_DELETE_BATCH = 500      # 삭제 1회당 최대 행 수
+RETENTION_MAX_BATCHES = 40        # 하루 실행당 테이블별 최대 삭제 횟수
+
+# 과거 데이터 백필 설정 (호스트별 초당 요청 수)
+BACKFILL_RATE_LIMITS = {
+    "m.stock.naver.com": 5,
+    "oapi.koreaexim.go.kr": 3,
+    "openapi.koreainvestment.com": 10,
+}
+BACKFILL_CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "data", "backfill_checkpoint.json")
+BACKFILL_BATCH_SIZE = 500
+
+# 임계값 알림 설정
+ALERT_METRICS = ["premium_percentage", "usd_krw_rate", "fx_move_pct", "pressure_ratio"]
+ALERT_DEFAULT_COOLDOWN_SECONDS = 300      # 같은 알림 재발송 최소 간격
+ALERT_MAX_COUNT = int(os.getenv("ALERT_MAX_COUNT", "500"))   # 등록 가능한 알림 수 상한
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL")   # 알림 발송 주소 (운영자만 설정, 없으면 로컬 보관)
+ALERT_WEBHOOK_TIMEOUT = 5
+ALERT_QUEUE_SIZE = 1000                   # 발송 대기열 최대 길이 (가득 차면 버림)
+ALERT_RECENT_EVENTS = 200                 # /api/alerts/events 로 조회할 최근 발송 기록 수
+
+# 데이터 내보내기 설정
+EXPORT_PAGE_SIZE = 1000
+GOLD_EXPORT_COLUMNS = [
+    "id", "created_at", "london_gold_usd", "london_gold_krw", "exchange_rate",
+    "domestic_gold_price", "domestic_volume", "domestic_open_interest",
+    "premium_percentage", "absolute_difference", "active_contract"
+]
+COLUMNAR_CACHE_DIR = os.getenv("COLUMNAR_CACHE_DIR", os.path.join(os.path.dirname(__file__), "data", "columnar"))
+COLUMNAR_COMPRESSION = "zstd"
+COLUMNAR_ROW_GROUP_SIZE = 50000   # 행 그룹 단위 통계로 시간 범위 필터 적용
+COLUMNAR_MAX_DAYS = 366           # 요청당 최대 일수
+
+# 외부 API 응답 카세트 (off: 사용 안 함, record: 응답 기록, replay: 기록된 응답으로 대체)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", os.path.join(os.path.dirname(__file__), "data", "cassettes"))
+CASSETTE_FLUSH_EVERY = 50         # 이 개수만큼 쌓이면 gzip 멤버로 추가 기록
+CASSETTE_FLUSH_SECONDS = 5        # 또는 마지막 기록 후 이 시간이 지나면 기록
+CASSETTE_IGNORE_PARAMS = ("authkey", "searchdate")               # 요청 키에서 제외할 쿼리 (비밀값/조회일)
+CASSETTE_REDACT_FIELDS = ("access_token", "approval_key")        # 응답에서 가릴 필드
+
+# 운영 지표 (/metrics) 히스토그램 구간 (초)
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 로그 설정
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")                 # 모듈별 레벨: "futures_api=DEBUG,database=WARNING"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")             # json 또는 text
+LOG_QUEUE_SIZE = 10000                                   # 출력 대기열 최대 길이 (가득 차면 버림)
+LOG_DEBUG_SAMPLE_EVERY = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "100"))   # 핫루프 debug 로그는 N건에 1건만
+
+# 요청 구간 추적 (Server-Timing 헤더 + 추적 로그)
+TRACE_LOG_SAMPLE_RATE = float(os.getenv("TRACE_LOG_SAMPLE_RATE", "0.01"))   # 구간 목록을 로그로 남길 요청 비율
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "2000"))                   # 이보다 느린 요청은 항상 기록
+TRACE_MAX_SPANS = 200                                                       # 요청당 최대 구간 수
+
+# 요청 기한 - 요청 1건의 외부 호출 전체 예산, 각 호출에는 남은 시간만 타임아웃으로 부여
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "10"))   # 외부 API 호출 1회 최대 대기 (기한이 없을 때)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "5"))    # 시세 조회 엔드포인트 기한 (X-Request-Deadline-Ms 로 더 줄일 수 있음)
+PREMIUM_STALE_MAX_AGE_SECONDS = 3600      # 기한 초과 시 대신 반환할 마지막 정상 프리미엄의 최대 경과 시간
+
+# 헤지 요청 - 네이버 차트 API가 관측 p95 안에 응답하지 않으면 marketIndex 백업을 함께 호출해 먼저 온 값 사용
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_WORKERS = 16                        # 주/백업 동시 조회 스레드 수
+HEDGE_LATENCY_WINDOW = 200                # 출처별로 보관할 최근 응답 시간 수
+HEDGE_MIN_SAMPLES = 20                    # 이보다 표본이 적으면 기본 지연 사용
+HEDGE_QUANTILE = 0.95                     # 헤지 지연으로 쓸 응답 시간 분위수
+HEDGE_DEFAULT_DELAY_SECONDS = 0.5
+HEDGE_MIN_DELAY_SECONDS = 0.05
+HEDGE_MAX_DELAY_SECONDS = 2.0
+
+# 외부 API 차단기 - 연속 실패가 쌓이면 일정 시간 호출하지 않고 바로 실패 처리 (그동안 마지막 정상 스냅샷으로 응답)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))    # 차단기를 여는 연속 실패 수
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))           # 차단 유지 시간 (이후 시험 호출 1건)
+NEGATIVE_CACHE_SECONDS = 10               # 실패한 URL을 다시 호출하지 않는 시간 (시험 호출을 막지 않도록 차단 유지 시간보다 짧게)
+NEGATIVE_CACHE_MAX_ENTRIES = 1024
+ORDERBOOK_STALE_MAX_AGE_SECONDS = 600     # 호가 조회 실패 시 대신 반환할 마지막 정상 호가의 최대 경과 시간
+
+# 운영 중 프로파일링 (/admin/profile/*) - ADMIN_TOKEN 미설정 시 비활성
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_MAX_SECONDS = 60                  # CPU 샘플링 최대 시간
+PROFILE_SAMPLE_INTERVAL_MS = 5            # 기본 샘플링 간격
+TRACEMALLOC_FRAMES = 25                   # 할당 위치별로 보관할 호출 스택 깊이
+TRACEMALLOC_MAX_SNAPSHOTS = 5             # 비교용으로 보관할 메모리 스냅샷 수 (오래된 것부터 삭제)
+
 # 데이터베이스 테이블명
 GOLD_DATA_TABLE = "gold_prices"
 ACTIVE_CONTRACT_TABLE = "active_contracts"
 KIS_TOKENS_TABLE = "kis_token"
+PRICE_BARS_TABLE = "price_bars"
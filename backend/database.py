@@ -2,20 +2,165 @@
 데이터베이스 관련 함수들
 """
 
+import time
 import datetime
-from config import SUPABASE_URL, SUPABASE_KEY, GOLD_DATA_TABLE, ACTIVE_CONTRACT_TABLE, KIS_TOKENS_TABLE
-from supabase import create_client, Client
+import threading
+import httpx
+import deadline
+import metrics
+import tracing
+from structured_log import get_logger
+from config import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    SUPABASE_TIMEOUT_SECONDS,
+    SUPABASE_POOL_SIZE,
+    SUPABASE_RETRY_SECONDS,
+    GOLD_DATA_TABLE,
+    ACTIVE_CONTRACT_TABLE,
+    KIS_TOKENS_TABLE,
+    PRICE_BARS_TABLE
+)
+from supabase import create_client, ClientOptions
 
-# Supabase 클라이언트 초기화
 try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    print(f"Supabase 초기화 실패: {e}")
-    supabase = None
+    import h2  # noqa: F401 - HTTP/2 지원 여부 확인용
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+log = get_logger("database")
+
+# Supabase 클라이언트 - 첫 사용 시 생성, 연결 오류가 나면 다음 사용 때 재생성
+_client = None
+_http_client = None
+_client_lock = threading.Lock()
+_client_stats = {
+    "created": 0,
+    "reconnects": 0,
+    "requests": 0,
+    "connections_opened": 0,
+    "errors": 0,
+    "last_error": None,
+    "last_failed_at": None
+}
+
+
+def _trace(event_name, info):
+    """httpcore 추적 이벤트 - 새 TCP 연결 수 집계 (나머지 요청은 기존 연결 재사용)"""
+    if event_name == "connection.connect_tcp.complete":
+        _client_stats["connections_opened"] += 1
+
+
+def _on_request(request):
+    _client_stats["requests"] += 1
+    request.extensions["trace"] = _trace
+    request.extensions["started_at"] = time.perf_counter()
+    
+    # 요청 기한이 있으면 남은 시간만 대기
+    left = deadline.remaining()
+    if left is not None:
+        if left <= 0:
+            raise httpx.TimeoutException("요청 기한 초과", request=request)
+        timeout = request.extensions.get("timeout") or {}
+        request.extensions["timeout"] = {key: min(value, left) if value else left for key, value in timeout.items()} or {
+            "connect": left, "read": left, "write": left, "pool": left
+        }
+
+
+def _on_response(response):
+    """테이블별 응답 시간 (응답 헤더 수신 기준)"""
+    started_at = response.request.extensions.get("started_at")
+    if started_at is not None:
+        upstream, table = metrics.classify_upstream(str(response.request.url))
+        elapsed = time.perf_counter() - started_at
+        metrics.observe_upstream(upstream, table, elapsed, response.status_code < 400)
+        tracing.record_span(f"{upstream}.{table}", started_at, elapsed)
+
+
+def get_supabase():
+    """Supabase 클라이언트 (지연 생성, keep-alive 연결 풀 공유) - 생성 실패 시 None"""
+    global _client, _http_client
+
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        # 직전 생성 실패 후 재시도 간격 전에는 바로 None (요청마다 접속 시도 방지)
+        failed_at = _client_stats["last_failed_at"]
+        if failed_at and time.time() - failed_at < SUPABASE_RETRY_SECONDS:
+            return None
+
+        try:
+            _http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(SUPABASE_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=SUPABASE_POOL_SIZE, max_keepalive_connections=SUPABASE_POOL_SIZE),
+                event_hooks={"request": [_on_request], "response": [_on_response]}
+            )
+            _client = create_client(SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(
+                postgrest_client_timeout=SUPABASE_TIMEOUT_SECONDS,
+                httpx_client=_http_client
+            ))
+            _client_stats["created"] += 1
+            _client_stats["last_failed_at"] = None
+        except Exception as e:
+            log.error("Supabase 초기화 실패: %s", e)
+            _client_stats["last_error"] = str(e)
+            _client_stats["last_failed_at"] = time.time()
+            _close_http_client()
+            _client = None
+
+        return _client
+
+
+def _close_http_client():
+    global _http_client
+    if _http_client is not None:
+        try:
+            _http_client.close()
+        except Exception:
+            pass
+        _http_client = None
+
+
+def reset_supabase():
+    """클라이언트 폐기 - 다음 get_supabase() 호출 때 새로 연결"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client_stats["reconnects"] += 1
+        _client = None
+        _close_http_client()
+
+
+def _report_error(e):
+    """쿼리 오류 기록 - 연결 계층 오류면 클라이언트를 재생성 대상으로 표시"""
+    _client_stats["errors"] += 1
+    _client_stats["last_error"] = str(e)
+    if isinstance(e, httpx.TransportError) and not deadline.expired():
+        # 응답을 받지 못한 요청은 응답 훅에 잡히지 않으므로 여기서 실패로 집계 (요청 기한으로 끊은 경우는 연결 문제가 아님)
+        metrics.UPSTREAM_REQUESTS.inc("supabase", "transport", "error")
+        reset_supabase()
+
+
+def get_supabase_stats():
+    """클라이언트/연결 재사용 통계"""
+    stats = dict(_client_stats)
+    stats["connected"] = _client is not None
+    stats["http2"] = HTTP2_AVAILABLE
+    stats["timeout_seconds"] = SUPABASE_TIMEOUT_SECONDS
+    opened = stats["connections_opened"]
+    stats["requests_per_connection"] = round(stats["requests"] / opened, 2) if opened else None
+    return stats
 
 
 def get_cached_token():
     """캐시된 KIS 토큰 조회"""
+    supabase = get_supabase()
     if not supabase:
         return None
     
@@ -28,15 +173,20 @@ def get_cached_token():
             
             # 토큰이 23시간 미만이면 재사용
             if datetime.datetime.now(datetime.timezone.utc) - created_at < datetime.timedelta(hours=23):
+                metrics.cache_hit("kis_token")
                 return token_data['access_token']
+        
+        metrics.cache_miss("kis_token")
     except Exception as e:
-        print(f"토큰 조회 오류: {e}")
+        _report_error(e)
+        log.warning("토큰 조회 오류: %s", e)
     
     return None
 
 
 def save_token(access_token):
     """새 토큰 저장"""
+    supabase = get_supabase()
     if not supabase or not access_token:
         return False
     
@@ -47,12 +197,14 @@ def save_token(access_token):
         }).execute()
         return True
     except Exception as e:
-        print(f"토큰 저장 오류: {e}")
+        _report_error(e)
+        log.warning("토큰 저장 오류: %s", e)
         return False
 
 
 def get_cached_gold_data():
     """캐시된 금 데이터 조회"""
+    supabase = get_supabase()
     if not supabase:
         return None
     
@@ -64,13 +216,15 @@ def get_cached_gold_data():
         if result.data and len(result.data) > 0:
             return result.data[0]
     except Exception as e:
-        print(f"캐시된 데이터 조회 오류: {e}")
+        _report_error(e)
+        log.warning("캐시된 데이터 조회 오류: %s", e)
     
     return None
 
 
 def save_gold_data(london_data, domestic_data, premium_data):
     """금 데이터 저장"""
+    supabase = get_supabase()
     if not supabase:
         return False
     
@@ -91,12 +245,14 @@ def save_gold_data(london_data, domestic_data, premium_data):
         supabase.table(GOLD_DATA_TABLE).insert(data_to_save).execute()
         return True
     except Exception as e:
-        print(f"데이터 저장 오류: {e}")
+        _report_error(e)
+        log.warning("데이터 저장 오류: %s", e)
         return False
 
 
 def get_active_contract():
     """활성 계약 조회"""
+    supabase = get_supabase()
     if not supabase:
         return None
     
@@ -108,13 +264,15 @@ def get_active_contract():
         if result.data and len(result.data) > 0:
             return result.data[0]
     except Exception as e:
-        print(f"활성 계약 조회 오류: {e}")
+        _report_error(e)
+        log.warning("활성 계약 조회 오류: %s", e)
     
     return None
 
 
 def save_active_contract(contract_data):
     """활성 계약 저장"""
+    supabase = get_supabase()
     if not supabase or not contract_data:
         return False
     
@@ -133,26 +291,138 @@ def save_active_contract(contract_data):
         supabase.table(ACTIVE_CONTRACT_TABLE).insert(data_to_save).execute()
         return True
     except Exception as e:
-        print(f"활성 계약 저장 오류: {e}")
+        _report_error(e)
+        log.warning("활성 계약 저장 오류: %s", e)
+        return False
+
+
+def save_price_bars(bars):
+    """마감된 OHLCV 봉 일괄 저장 (같은 시계열/주기/시작시각은 덮어씀)"""
+    supabase = get_supabase()
+    if not supabase or not bars:
+        return False
+    
+    try:
+        rows = [
+            {
+                "series": bar['series'],
+                "interval": bar['interval'],
+                "bar_start": bar['start'],
+                "open": bar['open'],
+                "high": bar['high'],
+                "low": bar['low'],
+                "close": bar['close'],
+                "volume": bar['volume'],
+                "sample_count": bar['count']
+            }
+            for bar in bars
+        ]
+        
+        supabase.table(PRICE_BARS_TABLE).upsert(rows, on_conflict="series,interval,bar_start").execute()
+        return True
+    except Exception as e:
+        _report_error(e)
+        log.warning("봉 데이터 저장 오류: %s", e)
         return False
 
 
+def fetch_rows_page(table, time_column, start_iso, end_iso, after_key=None, limit=1000, key_column="id", columns="*"):
+    """키셋 페이지 조회 - 시간 범위 [start, end) 안에서 key_column 오름차순, after_key 이후"""
+    supabase = get_supabase()
+    if not supabase:
+        return None
+    
+    try:
+        query = supabase.table(table).select(columns).gte(time_column, start_iso).lt(time_column, end_iso)
+        if after_key is not None:
+            query = query.gt(key_column, after_key)
+        result = query.order(key_column).limit(limit).execute()
+        return result.data or []
+    except Exception as e:
+        _report_error(e)
+        log.warning("%s 페이지 조회 오류: %s", table, e)
+        return None
+
+
+def fetch_edge_row(table, column, latest=True, columns="*"):
+    """column 기준 가장 최신(latest=True) 또는 가장 오래된 행 1건"""
+    supabase = get_supabase()
+    if not supabase:
+        return None
+    
+    try:
+        result = supabase.table(table).select(columns).order(column, desc=latest).limit(1).execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        _report_error(e)
+        log.warning("%s 조회 오류: %s", table, e)
+        return None
+
+
+def iter_rows(table, time_column, start_iso, end_iso, page_size=1000, after_key=None, key_column="id"):
+    """키셋 페이지 단위 전체 조회 제너레이터 (페이지 하나씩만 메모리에 유지) - 조회 실패 시 RuntimeError
+
+    실패를 데이터 끝으로 처리하면 집계가 빈 날짜로 끝난 것처럼 보이므로 호출자가 구분할 수 있게 예외로 알림
+    """
+    while True:
+        page = fetch_rows_page(table, time_column, start_iso, end_iso, after_key, page_size, key_column)
+        if page is None:
+            raise RuntimeError(f"{table} 조회 실패")
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after_key = page[-1][key_column]
+
+
+def upsert_rows(table, rows, on_conflict):
+    """일괄 upsert"""
+    supabase = get_supabase()
+    if not supabase or not rows:
+        return False
+    
+    try:
+        supabase.table(table).upsert(rows, on_conflict=on_conflict).execute()
+        return True
+    except Exception as e:
+        _report_error(e)
+        log.warning("%s 일괄 저장 오류: %s", table, e)
+        return False
+
+
+def delete_rows_before(table, time_column, cutoff_iso, batch_size, key_column="id"):
+    """cutoff 이전 행을 최대 batch_size개만 삭제 - 삭제한 행 수 반환 (실패 시 -1)"""
+    supabase = get_supabase()
+    if not supabase:
+        return -1
+    
+    try:
+        result = supabase.table(table).select(key_column).lt(time_column, cutoff_iso).order(key_column).limit(batch_size).execute()
+        keys = [row[key_column] for row in result.data or []]
+        if not keys:
+            return 0
+        
+        supabase.table(table).delete().in_(key_column, keys).execute()
+        return len(keys)
+    except Exception as e:
+        _report_error(e)
+        log.warning("%s 배치 삭제 오류: %s", table, e)
+        return -1
+
+
 def cleanup_old_data():
-    """오래된 데이터 정리"""
+    """오래된 토큰 정리 (금 데이터는 retention 모듈이 집계 후 배치 삭제)"""
+    supabase = get_supabase()
     if not supabase:
         return
     
     try:
-        # 7일 이전 데이터 삭제
-        cutoff_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=7)
-        
-        # 금 데이터 정리
-        supabase.table(GOLD_DATA_TABLE).delete().lt("created_at", cutoff_time.isoformat()).execute()
-        
         # 토큰 데이터 정리 (1일 이전)
         token_cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
         supabase.table(KIS_TOKENS_TABLE).delete().lt("created_at", token_cutoff.isoformat()).execute()
         
-        print("오래된 데이터 정리 완료")
+        log.info("오래된 토큰 정리 완료")
     except Exception as e:
-        print(f"데이터 정리 오류: {e}")
+        _report_error(e)
+        log.warning("데이터 정리 오류: %s", e)
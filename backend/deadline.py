@@ -0,0 +1,41 @@
+"""
+요청 기한 전파 - 요청 1건의 외부 호출 전체에 시간 예산을 두고, 각 호출에는 남은 시간만 타임아웃으로 부여
+
+기한은 contextvar에 저장되므로 같은 요청에서 호출되는 api_utils/futures_api/database 함수와
+컨텍스트를 복사해 실행하는 풀 스레드(metal_data)까지 별도 인자 없이 전달됨
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+
+_deadline = contextvars.ContextVar("deadline", default=None)   # time.monotonic() 기준 마감 시각
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """이 블록 안의 외부 호출 전체 예산 - 바깥 기한이 더 이르면 그쪽을 유지"""
+    deadline = time.monotonic() + max(float(seconds), 0)
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """남은 시간(초) - 기한이 없으면 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def expired():
+    deadline = _deadline.get()
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def timeout_for(default):
+    """외부 호출 1회 타임아웃 - 기본값과 남은 시간 중 작은 값 (0이면 호출하지 말 것)"""
+    left = remaining()
+    return default if left is None else min(default, left)
@@ -0,0 +1,93 @@
+"""
+한국 금 ETF 시세 수집 및 로컬 시계열 캐시
+"""
+
+import datetime
+import threading
+import pandas as pd
+
+import metrics
+from api_utils import get_naver_price_history
+from config import (
+    NAVER_STOCK_CHART_URL,
+    NAVER_GOLD_DOMESTIC_CHART_URL,
+    NAVER_GOLD_INTERNATIONAL_CHART_URL,
+    ETF_CACHE_MINUTES
+)
+
+# 벤치마크 시계열 키 → 네이버 차트 URL
+GOLD_BENCHMARKS = {
+    "domestic_gold": NAVER_GOLD_DOMESTIC_CHART_URL,
+    "international_gold": NAVER_GOLD_INTERNATIONAL_CHART_URL,
+}
+
+# 시계열 캐시: key -> {"series": pd.Series(종가, DatetimeIndex), "fetched_at": datetime}
+_series_cache = {}
+_series_lock = threading.Lock()
+
+
+def _history_to_series(history):
+    """[(YYYYMMDD, 종가), ...] → 날짜 인덱스 Series"""
+    if not history:
+        return pd.Series(dtype=float)
+
+    dates, prices = zip(*history)
+    series = pd.Series(prices, index=pd.to_datetime(dates, format='%Y%m%d'), dtype=float)
+    return series[~series.index.duplicated(keep='last')].sort_index()
+
+
+def _merge_bars(cached, fresh):
+    """캐시된 시계열에 새 일봉 병합 (같은 날짜는 최신 값으로 덮어씀)"""
+    if cached is None or cached.empty:
+        return fresh
+    if fresh.empty:
+        return cached
+
+    merged = pd.concat([cached[cached.index < fresh.index[0]], fresh])
+    return merged[~merged.index.duplicated(keep='last')]
+
+
+def get_price_series(key, url, force=False):
+    """시계열 조회 - 캐시가 ETF_CACHE_MINUTES 이내면 캐시 사용, 아니면 새 일봉만 병합"""
+    now = datetime.datetime.now()
+
+    with _series_lock:
+        entry = _series_cache.get(key)
+        if entry and not force and now - entry["fetched_at"] < datetime.timedelta(minutes=ETF_CACHE_MINUTES):
+            metrics.cache_hit("etf_series")
+            return entry["series"]
+    metrics.cache_miss("etf_series")
+
+    fresh = _history_to_series(get_naver_price_history(url))
+
+    with _series_lock:
+        entry = _series_cache.get(key)
+        cached = entry["series"] if entry else None
+        if fresh.empty and cached is None:
+            return fresh
+
+        merged = _merge_bars(cached, fresh)
+        _series_cache[key] = {"series": merged, "fetched_at": now}
+        return merged
+
+
+def get_etf_price_frame(etf_codes):
+    """ETF + 국내/국제 금 종가를 날짜 기준으로 정렬한 DataFrame 반환"""
+    columns = {}
+
+    for code in etf_codes:
+        series = get_price_series(code, NAVER_STOCK_CHART_URL.format(code=code))
+        if not series.empty:
+            columns[code] = series
+
+    for key, url in GOLD_BENCHMARKS.items():
+        series = get_price_series(key, url)
+        if not series.empty:
+            columns[key] = series
+
+    if not columns:
+        return pd.DataFrame()
+
+    # 국내/해외 휴장일 차이는 직전 종가로 채움
+    frame = pd.DataFrame(columns).sort_index().ffill().dropna()
+    return frame
@@ -0,0 +1,62 @@
+"""
+이력 데이터 내보내기 - 키셋 페이지 단위로 읽어 바로 흘려보내는 NDJSON/CSV 스트림 (범위와 무관하게 메모리 일정)
+"""
+
+import io
+import csv
+import json
+
+from structured_log import get_logger
+from config import GOLD_DATA_TABLE, GOLD_EXPORT_COLUMNS, EXPORT_PAGE_SIZE
+
+log = get_logger("export")
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_export_pages(table, start_iso, end_iso, cursor=None, page_size=EXPORT_PAGE_SIZE, key_column="id", time_column="created_at"):
+    """(페이지, 마지막 키) 제너레이터 - 조회 실패 시 RuntimeError (그때까지의 키로 이어받기 가능)"""
+    from database import fetch_rows_page
+
+    while True:
+        page = fetch_rows_page(table, time_column, start_iso, end_iso, cursor, page_size, key_column)
+        if page is None:
+            raise RuntimeError(f"{table} 조회 실패")
+        if not page:
+            return
+        cursor = page[-1][key_column]
+        yield page, cursor
+        if len(page) < page_size:
+            return
+
+
+def stream_gold_prices(fmt, start_iso, end_iso, cursor=None, page_size=EXPORT_PAGE_SIZE):
+    """gold_prices 내보내기 청크 제너레이터 (id 오름차순, cursor: 마지막으로 받은 id)
+
+    중간에 조회가 실패하면 마지막 줄에 오류와 next_cursor를 남기고 종료
+    """
+    last_key = cursor
+    if fmt == "csv" and cursor is None:
+        yield ",".join(GOLD_EXPORT_COLUMNS) + "\r\n"
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    try:
+        for page, last_key in iter_export_pages(GOLD_DATA_TABLE, start_iso, end_iso, cursor, page_size):
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([row.get(column) for column in GOLD_EXPORT_COLUMNS] for row in page)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in page)
+    except Exception as e:
+        log.warning("내보내기 중단: %s", e)
+        if fmt == "csv":
+            yield f"# error: {e}, next_cursor={last_key if last_key is not None else ''}\r\n"
+        else:
+            yield json.dumps({"error": str(e), "next_cursor": last_key}, ensure_ascii=False) + "\n"
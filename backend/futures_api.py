@@ -2,9 +2,24 @@
 선물 관련 API 함수들
 """
 
+import time
 import datetime
+import threading
+import numpy as np
+import deadline
 from api_utils import get_kis_token, api_call
-from config import KIS_APP_KEY, KIS_APP_SECRET, KIS_FUTURES_URL
+from bars import record_futures_quote
+from history_buffer import record_contract
+from config import KIS_APP_KEY, KIS_APP_SECRET, KIS_FUTURES_URL, KIS_FUTURES_DAILY_URL, KIS_ORDERBOOK_URL, ORDERBOOK_STALE_MAX_AGE_SECONDS
+from structured_log import get_logger, debug_sampled
+from tracing import traced
+
+log = get_logger("futures_api")
+
+# 마지막 월물 스캔 결과 (기간구조 계산 등에서 KIS 재호출 없이 재사용)
+_last_scan = {"scanned_at": None, "contracts": []}
+_term_structure_cache = {"key": None, "result": None}
+_scan_lock = threading.Lock()
 
 
 def generate_gold_futures_candidates():
@@ -54,25 +69,35 @@ def get_domestic_futures_data(symbol):
     """Step 2: 국내 선물 데이터 수집 (KIS API) - 토큰 필수 확인"""
     # database 모듈에서 캐시된 토큰 먼저 확인
     from database import get_cached_token, save_token
+    from kis_stream import get_streamed_quote
+    
+    # 실시간 스트림에 최신 시세가 있으면 REST 호출 생략
+    streamed = get_streamed_quote(symbol)
+    if streamed:
+        return streamed
+    
+    # 요청 기한이 지났으면 토큰 조회/발급부터 생략
+    if deadline.expired():
+        return None
     
     access_token = get_cached_token()
     
     # 토큰이 없거나 만료된 경우에만 새로 발급
     if not access_token:
-        print("🔄 KIS 토큰 새로 발급 중...")
+        log.info("KIS 토큰 새로 발급 중")
         access_token = get_kis_token()
         if access_token:
             save_token(access_token)
-            print("✅ KIS 토큰 발급 및 저장 완료")
+            log.info("KIS 토큰 발급 및 저장 완료")
         else:
-            print("❌ KIS 토큰 발급 실패 - API 호출 중단")
+            log.error("KIS 토큰 발급 실패 - API 호출 중단")
             return None
     else:
-        print("✅ 캐시된 KIS 토큰 재사용 중")
+        log.debug("캐시된 KIS 토큰 재사용 중")
     
     # 토큰이 없으면 절대 API 호출하지 않음
     if not access_token:
-        print("🚫 토큰 없음 - KIS API 호출 차단 (SMS 방지)")
+        log.error("토큰 없음 - KIS API 호출 차단 (SMS 방지)")
         return None
     
     # 국내선물옵션 기본시세 조회 API (GitHub 공식 저장소 기준)
@@ -93,141 +118,248 @@ def get_domestic_futures_data(symbol):
     query_string = "&".join([f"{k}={v}" for k, v in params.items()])
     url = f"{KIS_FUTURES_URL}?{query_string}"
     
-    print(f"🔗 KIS API 호출: {symbol} (토큰 포함)")
+    log.debug("KIS 시세 API 호출: %s", symbol)
     data = api_call(url, headers=headers)
-    
+    return handle_futures_quote(symbol, data)
+
+
+def handle_futures_quote(symbol, data):
+    """KIS 시세 응답 → 선물 시세 기록 및 반환 (REST 조회와 카세트 재생 공용)"""
     if data and data.get('rt_cd') == '0' and data.get('output1'):
-        output1 = data.get('output1', {})
-        # 선물 데이터가 실제로 있는지 확인 (거래량 체크)
-        volume = int(output1.get('acml_vol', 0))
-        if volume > 0:  # 거래량이 있는 경우만 유효한 데이터로 간주
-            print(f"📊 {symbol} 선물 데이터 조회 성공 (거래량: {volume:,})")
-            return {
-                "symbol": symbol,
-                "current_price": float(output1.get('futs_prpr', 0)),         # 선물현재가
-                "volume": volume,                                            # 총거래량
-                "open_interest": int(output1.get('hts_otst_stpl_qty', 0)),   # 미결제약정
-                "change_rate": float(output1.get('futs_prdy_ctrt', 0)),      # 전일대비율
-                "high": float(output1.get('futs_hgpr', 0)),                  # 고가
-                "low": float(output1.get('futs_lwpr', 0))                    # 저가
-            }
+        quote = parse_futures_quote(symbol, data.get('output1', {}))
+        if quote:
+            log.debug("선물 시세 조회 성공: %s (거래량 %d)", symbol, quote['volume'])
+            record_futures_quote(quote)
+            record_contract(quote)
+            return quote
     
-    print(f"⚠️ {symbol} 선물 데이터 없음 또는 거래량 0")
+    log.warning("선물 데이터 없음 또는 거래량 0: %s", symbol, extra={"symbol": symbol})
     return None
 
 
+def parse_futures_quote(symbol, output1):
+    """KIS 시세 응답(output1) → 선물 시세 dict (거래량 0이면 None)"""
+    # 선물 데이터가 실제로 있는지 확인 (거래량 체크)
+    volume = int(output1.get('acml_vol', 0) or 0)
+    if volume <= 0:  # 거래량이 있는 경우만 유효한 데이터로 간주
+        return None
+    
+    return {
+        "symbol": symbol,
+        "current_price": float(output1.get('futs_prpr', 0) or 0),         # 선물현재가
+        "volume": volume,                                                 # 총거래량
+        "open_interest": int(output1.get('hts_otst_stpl_qty', 0) or 0),   # 미결제약정
+        "change_rate": float(output1.get('futs_prdy_ctrt', 0) or 0),      # 전일대비율
+        "high": float(output1.get('futs_hgpr', 0) or 0),                  # 고가
+        "low": float(output1.get('futs_lwpr', 0) or 0)                    # 저가
+    }
+
+
+def get_futures_daily_history(symbol, start_date, end_date):
+    """선물 일봉 이력 (KIS 기간별 시세) - [{date, open, high, low, close, volume}, ...] 오래된 순"""
+    from database import get_cached_token, save_token
+    
+    access_token = get_cached_token()
+    if not access_token:
+        access_token = get_kis_token()
+        if not access_token:
+            log.error("KIS 토큰 발급 실패 - 일봉 조회 중단")
+            return None
+        save_token(access_token)
+    
+    headers = {
+        "authorization": f"Bearer {access_token}",
+        "appkey": KIS_APP_KEY,
+        "appsecret": KIS_APP_SECRET,
+        "tr_id": "FHKIF03020100",  # 선물옵션 기간별 시세
+        "custtype": "P"
+    }
+    params = {
+        "FID_COND_MRKT_DIV_CODE": "F",
+        "FID_INPUT_ISCD": symbol,
+        "FID_INPUT_DATE_1": start_date,   # YYYYMMDD
+        "FID_INPUT_DATE_2": end_date,
+        "FID_PERIOD_DIV_CODE": "D"
+    }
+    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
+    
+    data = api_call(f"{KIS_FUTURES_DAILY_URL}?{query_string}", headers=headers)
+    if not data or data.get('rt_cd') != '0':
+        return None
+    
+    history = []
+    for row in data.get('output2') or []:
+        if not row.get('stck_bsop_date'):
+            continue
+        history.append({
+            "date": row['stck_bsop_date'],
+            "open": float(row.get('futs_oprc', 0) or 0),
+            "high": float(row.get('futs_hgpr', 0) or 0),
+            "low": float(row.get('futs_lwpr', 0) or 0),
+            "close": float(row.get('futs_prpr', 0) or 0),
+            "volume": int(row.get('acml_vol', 0) or 0)
+        })
+    
+    return sorted(history, key=lambda r: r['date'])
+
+
 def get_domestic_futures_orderbook(symbol):
-    """선물 호가 정보 조회 - 매수/매도 압력 분석용 (REST API 기반)"""
+    """선물 호가 정보 조회 - 매수/매도 압력 분석용 (실시간 스트림 우선, 없으면 REST API)"""
     from database import get_cached_token, save_token
-    import requests
+    from kis_stream import get_streamed_orderbook
+    
+    # 실시간 스트림에 최신 호가가 있으면 REST 호출 생략
+    streamed = get_streamed_orderbook(symbol)
+    if streamed:
+        return parse_orderbook_response(symbol, *streamed)
+    
+    if deadline.expired():
+        return None
     
     access_token = get_cached_token()
     
     if not access_token:
-        print("🔄 KIS 토큰 새로 발급 중...")
+        log.info("KIS 토큰 새로 발급 중")
         access_token = get_kis_token()
         if access_token:
             save_token(access_token)
-            print("✅ KIS 토큰 발급 및 저장 완료")
+            log.info("KIS 토큰 발급 및 저장 완료")
         else:
-            print("❌ KIS 토큰 발급 실패 - API 호출 중단")
+            log.error("KIS 토큰 발급 실패 - API 호출 중단")
             return None
     else:
-        print("✅ 캐시된 KIS 토큰 재사용 중 (호가 조회)")
+        log.debug("캐시된 KIS 토큰 재사용 중 (호가 조회)")
     
     if not access_token:
-        print("🚫 토큰 없음 - KIS 호가 API 호출 차단")
+        log.error("토큰 없음 - KIS 호가 API 호출 차단")
+        return None
+    
+    # Excel에서 확인한 정확한 REST API 사용
+    headers = {
+        'Content-Type': 'application/json; charset=utf-8',
+        'authorization': f'Bearer {access_token}',
+        'appkey': KIS_APP_KEY,
+        'appsecret': KIS_APP_SECRET,
+        'tr_id': 'FHMIF10010000'  # Excel에서 확인한 TR_ID
+    }
+    
+    params = {
+        'fid_cond_mrkt_div_code': 'F',  # F: 지수선물 (CF가 아님!)
+        'fid_input_iscd': symbol
+    }
+    
+    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
+    
+    log.debug("KIS 호가 API 호출: %s", symbol)
+    data = api_call(f"{KIS_ORDERBOOK_URL}?{query_string}", headers=headers)
+    return handle_orderbook_response(symbol, data)
+
+
+@traced("orderbook.process")
+def handle_orderbook_response(symbol, data):
+    """KIS 호가 응답 → 스냅샷 저장, 미시구조 갱신 후 압력 분석 결과 반환 (REST 조회와 카세트 재생 공용)"""
+    if not data:
+        log.warning("호가 조회 실패: %s", symbol, extra={"symbol": symbol})
+        return None
+    
+    if data.get('rt_cd') != '0':
+        log.warning("KIS 호가 API 오류: %s", data.get('msg1', 'Unknown error'), extra={"symbol": symbol, "rt_cd": data.get('rt_cd')})
         return None
     
     try:
-        # Excel에서 확인한 정확한 REST API 사용
-        url = "https://openapi.koreainvestment.com:9443/uapi/domestic-futureoption/v1/quotations/inquire-asking-price"
-        
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'authorization': f'Bearer {access_token}',
-            'appkey': KIS_APP_KEY,
-            'appsecret': KIS_APP_SECRET,
-            'tr_id': 'FHMIF10010000'  # Excel에서 확인한 TR_ID
-        }
-        
-        params = {
-            'fid_cond_mrkt_div_code': 'F',  # F: 지수선물 (CF가 아님!)
-            'fid_input_iscd': symbol
-        }
+        output1 = data.get('output1', {})
+        output2 = data.get('output2', {})
         
-        print(f"🔗 KIS 호가 API 호출: {symbol} (TR_ID: FHMIF10010000)")
-        response = requests.get(url, headers=headers, params=params)
+        # 호가 스냅샷 캡처 (정수 배열 저장소) 및 미시구조 상태 갱신
+        from orderbook_store import record_orderbook_snapshot
+        from microstructure import update_microstructure
+        record = record_orderbook_snapshot(symbol, output2)
+        if record is not None:
+            update_microstructure(symbol, record)
         
-        if response.status_code == 200:
-            data = response.json()
-            
-            if data.get('rt_cd') == '0':
-                output1 = data.get('output1', {})
-                output2 = data.get('output2', {})
-                
-                # Excel에서 확인한 핵심 필드들 사용
-                total_ask_quantity = int(output2.get('total_askp_rsqn', 0) or 0)  # 총 매도호가 잔량
-                total_bid_quantity = int(output2.get('total_bidp_rsqn', 0) or 0)  # 총 매수호가 잔량
-                
-                # 매수/매도 압력 분석
-                total_quantity = total_ask_quantity + total_bid_quantity
-                if total_quantity > 0:
-                    buy_pressure = (total_bid_quantity / total_quantity) * 100
-                    sell_pressure = (total_ask_quantity / total_quantity) * 100
-                else:
-                    buy_pressure = sell_pressure = 50.0
-                
-                # 압력 강도 분석
-                pressure_ratio = total_bid_quantity / total_ask_quantity if total_ask_quantity > 0 else 1.0
-                
-                if pressure_ratio > 1.2:
-                    pressure_signal = "강한 매수"
-                elif pressure_ratio > 1.05:
-                    pressure_signal = "약한 매수"
-                elif pressure_ratio < 0.8:
-                    pressure_signal = "강한 매도"
-                elif pressure_ratio < 0.95:
-                    pressure_signal = "약한 매도"
-                else:
-                    pressure_signal = "균형"
-                
-                print(f"📊 {symbol} 호가 분석 성공: 매수 {total_bid_quantity:,} vs 매도 {total_ask_quantity:,} → {pressure_signal}")
-                
-                return {
-                    "symbol": symbol,
-                    "contract_name": output1.get('hts_kor_isnm', ''),
-                    "current_price": output1.get('futs_prpr', '0'),
-                    "prev_day_price": output1.get('futs_prdy_clpr', '0'),
-                    "price_change": output1.get('futs_prdy_vrss', '0'),
-                    "change_rate": output1.get('futs_prdy_ctrt', '0'),
-                    "volume": output1.get('acml_vol', '0'),
-                    "total_ask_quantity": total_ask_quantity,
-                    "total_bid_quantity": total_bid_quantity,
-                    "buy_pressure_pct": round(buy_pressure, 2),
-                    "sell_pressure_pct": round(sell_pressure, 2),
-                    "pressure_ratio": round(pressure_ratio, 3),
-                    "pressure_signal": pressure_signal,
-                    "orderbook": {
-                        "ask_prices": [output2.get(f'futs_askp{i}', '') for i in range(1, 6)],
-                        "ask_quantities": [output2.get(f'askp_rsqn{i}', '') for i in range(1, 6)],
-                        "bid_prices": [output2.get(f'futs_bidp{i}', '') for i in range(1, 6)],
-                        "bid_quantities": [output2.get(f'bidp_rsqn{i}', '') for i in range(1, 6)],
-                        "ask_counts": [output2.get(f'askp_csnu{i}', '') for i in range(1, 6)],
-                        "bid_counts": [output2.get(f'bidp_csnu{i}', '') for i in range(1, 6)]
-                    },
-                    "last_update_time": output2.get('aspr_acpt_hour', '')
-                }
-            else:
-                print(f"⚠️ {symbol} API 오류: {data.get('msg1', 'Unknown error')}")
-                return None
-        else:
-            print(f"⚠️ {symbol} HTTP 오류: {response.status_code}")
-            return None
+        result = parse_orderbook_response(symbol, output1, output2)
+        _last_orderbooks[symbol] = (time.time(), result)
+        return result
             
     except Exception as e:
-        print(f"⚠️ {symbol} 호가 조회 실패: {str(e)}")
+        log.exception("호가 응답 처리 실패: %s", symbol)
+        return None
+
+
+_last_orderbooks = {}   # 종목 → (epoch 초, 마지막 정상 호가 분석 결과)
+
+
+def get_last_good_orderbook(symbol, max_age=ORDERBOOK_STALE_MAX_AGE_SECONDS):
+    """마지막 정상 호가 분석 결과 (stale 표시) - 없거나 max_age 초보다 오래됐으면 None"""
+    entry = _last_orderbooks.get(symbol)
+    if entry is None:
+        return None
+    ts, result = entry
+    age = time.time() - ts
+    if age > max_age:
         return None
+    return {**result, "stale": True, "stale_age_seconds": round(age, 1)}
+
+
+def parse_orderbook_response(symbol, output1, output2):
+    """KIS 호가 응답(output1/output2) → 매수/매도 압력 분석 결과"""
+    # Excel에서 확인한 핵심 필드들 사용
+    total_ask_quantity = int(output2.get('total_askp_rsqn', 0) or 0)  # 총 매도호가 잔량
+    total_bid_quantity = int(output2.get('total_bidp_rsqn', 0) or 0)  # 총 매수호가 잔량
+    
+    # 매수/매도 압력 분석
+    total_quantity = total_ask_quantity + total_bid_quantity
+    if total_quantity > 0:
+        buy_pressure = (total_bid_quantity / total_quantity) * 100
+        sell_pressure = (total_ask_quantity / total_quantity) * 100
+    else:
+        buy_pressure = sell_pressure = 50.0
+    
+    # 압력 강도 분석
+    pressure_ratio = total_bid_quantity / total_ask_quantity if total_ask_quantity > 0 else 1.0
+    pressure_signal = classify_pressure(pressure_ratio)
+    
+    debug_sampled(log, "orderbook_parse", "호가 분석: %s 매수 %d vs 매도 %d → %s",
+                  symbol, total_bid_quantity, total_ask_quantity, pressure_signal)
+    
+    return {
+        "symbol": symbol,
+        "contract_name": output1.get('hts_kor_isnm', ''),
+        "current_price": output1.get('futs_prpr', '0'),
+        "prev_day_price": output1.get('futs_prdy_clpr', '0'),
+        "price_change": output1.get('futs_prdy_vrss', '0'),
+        "change_rate": output1.get('futs_prdy_ctrt', '0'),
+        "volume": output1.get('acml_vol', '0'),
+        "total_ask_quantity": total_ask_quantity,
+        "total_bid_quantity": total_bid_quantity,
+        "buy_pressure_pct": round(buy_pressure, 2),
+        "sell_pressure_pct": round(sell_pressure, 2),
+        "pressure_ratio": round(pressure_ratio, 3),
+        "pressure_signal": pressure_signal,
+        "orderbook": {
+            "ask_prices": [output2.get(f'futs_askp{i}', '') for i in range(1, 6)],
+            "ask_quantities": [output2.get(f'askp_rsqn{i}', '') for i in range(1, 6)],
+            "bid_prices": [output2.get(f'futs_bidp{i}', '') for i in range(1, 6)],
+            "bid_quantities": [output2.get(f'bidp_rsqn{i}', '') for i in range(1, 6)],
+            "ask_counts": [output2.get(f'askp_csnu{i}', '') for i in range(1, 6)],
+            "bid_counts": [output2.get(f'bidp_csnu{i}', '') for i in range(1, 6)]
+        },
+        "last_update_time": output2.get('aspr_acpt_hour', '')
+    }
+
+
+def classify_pressure(pressure_ratio):
+    """매수/매도 잔량 비율 → 압력 신호"""
+    if pressure_ratio > 1.2:
+        return "강한 매수"
+    elif pressure_ratio > 1.05:
+        return "약한 매수"
+    elif pressure_ratio < 0.8:
+        return "강한 매도"
+    elif pressure_ratio < 0.95:
+        return "약한 매도"
+    else:
+        return "균형"
 
 
 def find_active_gold_contract():
@@ -240,6 +372,9 @@ def find_active_gold_contract():
     candidate_data = []
     for candidate in candidates:
         symbol = candidate['symbol']
+        if deadline.expired():
+            log.warning("요청 기한 초과 - 남은 월물 조회 생략 (%d/%d 조회)", len(candidate_data), len(candidates))
+            break
         
         # 기본 시세 데이터
         price_data = get_domestic_futures_data(symbol)
@@ -267,6 +402,10 @@ def find_active_gold_contract():
             
             candidate_data.append(combined_data)
     
+    # 스캔 결과 보관 (기간구조 엔드포인트에서 재사용) - 기한 초과로 빠진 월물이 있을 수 있으면 이전 전체 스캔 유지
+    if not deadline.expired():
+        record_contract_scan(candidate_data)
+    
     # 3. 주 계약 선택 (거래량 기준)
     if not candidate_data:
         return None
@@ -274,6 +413,112 @@ def find_active_gold_contract():
     # 거래량이 가장 높은 월물 선택
     active_contract = max(candidate_data, key=lambda x: x['volume'])
     
-    print(f"🎯 주계약 선택: {active_contract['symbol']} (거래량: {active_contract['volume']:,}, 매수압력: {active_contract.get('buy_pressure', 0)}%)")
+    log.info("주계약 선택: %s", active_contract['symbol'],
+             extra={"symbol": active_contract['symbol'], "volume": active_contract['volume'], "buy_pressure": active_contract.get('buy_pressure', 0)})
     
     return active_contract
+
+
+def record_contract_scan(contracts, merge=False):
+    """월물 스캔 결과 저장 (전체 스캔)
+
+    merge=True: 일부 월물만 조회한 결과(롤오버 엔진의 평시 근월/차월)를 기존 전체 스캔에 종목별로 반영 -
+    기간구조가 2개 월물로 줄지 않도록 전체 스캔이 아직 없으면 저장하지 않음
+    """
+    with _scan_lock:
+        if merge:
+            if _last_scan["scanned_at"] is None:
+                return
+            updated = {c['symbol']: c for c in contracts}
+            contracts = [updated.pop(c['symbol'], c) for c in _last_scan["contracts"]] + list(updated.values())
+        _last_scan["scanned_at"] = datetime.datetime.now()
+        _last_scan["contracts"] = list(contracts)
+
+
+def get_last_contract_scan():
+    """마지막 월물 스캔 결과 조회 (스캔 시각, 월물 데이터 목록)"""
+    with _scan_lock:
+        return _last_scan["scanned_at"], list(_last_scan["contracts"])
+
+
+@traced("futures.term_structure")
+def calculate_term_structure(contracts, spot_price, as_of=None):
+    """월물별 베이시스/내재 캐리/캘린더 스프레드 계산 (numpy 일괄 연산)"""
+    if not contracts or not spot_price:
+        return None
+    
+    as_of = as_of or datetime.date.today()
+    contracts = sorted(contracts, key=lambda c: (c['year'], c['month']))
+    
+    prices = np.array([c['current_price'] for c in contracts], dtype=float)
+    days = np.array([(c['expiry_date'] - as_of).days for c in contracts], dtype=float)
+    days = np.clip(days, 1, None)  # 만기 당일/경과 월물의 0 나눗셈 방지
+    
+    basis = prices - spot_price
+    basis_pct = basis / spot_price * 100
+    implied_carry = np.log(prices / spot_price) * 365 / days * 100  # 연율화 %
+    
+    # 인접 월물 간 캘린더 스프레드 및 구간 캐리
+    spreads = np.diff(prices)
+    spread_days = np.clip(np.diff(days), 1, None)
+    forward_carry = np.log(prices[1:] / prices[:-1]) * 365 / spread_days * 100
+    
+    if spreads.size and np.all(spreads > 0):
+        curve_shape = "콘탱고"
+    elif spreads.size and np.all(spreads < 0):
+        curve_shape = "백워데이션"
+    else:
+        curve_shape = "혼조"
+    
+    return {
+        "spot_price": spot_price,
+        "curve_shape": curve_shape,
+        "contracts": [
+            {
+                "symbol": c['symbol'],
+                "description": c.get('description'),
+                "expiry_date": c['expiry_date'].isoformat(),
+                "days_to_expiry": int(days[i]),
+                "futures_price": float(prices[i]),
+                "volume": c.get('volume', 0),
+                "open_interest": c.get('open_interest', 0),
+                "basis": round(float(basis[i]), 2),
+                "basis_pct": round(float(basis_pct[i]), 3),
+                "implied_carry_pct": round(float(implied_carry[i]), 3)
+            }
+            for i, c in enumerate(contracts)
+        ],
+        "calendar_spreads": [
+            {
+                "near": contracts[i]['symbol'],
+                "far": contracts[i + 1]['symbol'],
+                "spread": round(float(spreads[i]), 2),
+                "forward_carry_pct": round(float(forward_carry[i]), 3)
+            }
+            for i in range(len(spreads))
+        ]
+    }
+
+
+def get_term_structure(spot_price):
+    """마지막 스캔 기준 기간구조 조회 - 스캔/현물가가 같으면 캐시 반환"""
+    scanned_at, contracts = get_last_contract_scan()
+    
+    # 아직 스캔이 없으면 한 번만 스캔 수행
+    if scanned_at is None:
+        find_active_gold_contract()
+        scanned_at, contracts = get_last_contract_scan()
+    
+    cache_key = (scanned_at, spot_price)
+    with _scan_lock:
+        if _term_structure_cache["key"] == cache_key:
+            return _term_structure_cache["result"]
+    
+    result = calculate_term_structure(contracts, spot_price)
+    if result:
+        result["scanned_at"] = scanned_at.isoformat() if scanned_at else None
+        with _scan_lock:
+            _term_structure_cache["key"] = cache_key
+            _term_structure_cache["result"] = result
+    
+    return result
@@ -2,44 +2,73 @@
 금 현물 프리미엄 분석 함수들
 """
 
+import time
 import datetime
-from api_utils import get_naver_gold_price, get_domestic_gold_price, get_exchange_rate
+
+from bars import record_premium_snapshot
+from history_buffer import record_premium, get_latest_snapshot
+from alerts import evaluate_premium_snapshot
+from tracing import span
+from structured_log import get_logger
+from config import PREMIUM_STALE_MAX_AGE_SECONDS
+
+log = get_logger("gold_data")
+
+_last_good = None   # (epoch 초, 마지막 정상 프리미엄 결과)
 
 
 def get_gold_premium_data():
-    """금 프리미엄 분석을 위한 모든 데이터 수집"""
+    """금 프리미엄 분석을 위한 모든 데이터 수집 (국제 금/환율/국내 금 동시 조회)"""
+    from metal_data import get_metal_premium_data
+    
     try:
-        # 1. 국제 금시세 (USD/oz)
-        international_price_usd = get_naver_gold_price()
-        
-        # 2. 환율 (USD/KRW)
-        exchange_rate = get_exchange_rate()
-        
-        # 3. 국내 금시세 (KRW/g)
-        domestic_price_krw = get_domestic_gold_price()
-        
-        if not all([international_price_usd, exchange_rate, domestic_price_krw]):
+        gold = get_metal_premium_data(["gold"])["metals"]["gold"]
+        if not gold or not gold.get('domestic_price_krw_g'):
             return None
-            
-        # 국제 금시세를 KRW/g으로 변환 (1 oz = 31.1035 g)
-        international_price_krw_per_gram = (international_price_usd * exchange_rate) / 31.1035
         
-        # 프리미엄 계산
-        premium_data = calculate_gold_premium(international_price_krw_per_gram, domestic_price_krw)
+        result = {key: value for key, value in gold.items() if key not in ("metal", "name")}
+        if result['premium_percentage'] is None:
+            result['premium_percentage'] = 0
+            result['premium_grade'] = get_premium_grade(0)
         
-        return {
-            "international_price_usd_oz": international_price_usd,
-            "domestic_price_krw_g": domestic_price_krw, 
-            "usd_krw_rate": exchange_rate,
-            "converted_intl_price_krw_g": round(international_price_krw_per_gram, 2),
-            "premium_percentage": premium_data.get('premium_percentage') if premium_data else 0,
-            "premium_grade": get_premium_grade(premium_data.get('premium_percentage') if premium_data else 0),
-            "timestamp": datetime.datetime.now().isoformat()
-        }
+        # 현물/환율/프리미엄 봉 집계 및 최근 이력 기록
+        with span("premium.record"):
+            record_premium_snapshot(result)
+            record_premium(result)
+            evaluate_premium_snapshot(result)
+        
+        global _last_good
+        _last_good = (time.time(), result)
+        return result
         
     except Exception as e:
-        print(f"금 프리미엄 데이터 수집 오류: {e}")
+        log.warning("금 프리미엄 데이터 수집 오류: %s", e)
+        return None
+
+
+def get_last_good_premium(max_age=PREMIUM_STALE_MAX_AGE_SECONDS):
+    """마지막 정상 프리미엄 결과 (stale 표시) - 메모리에 없으면 최근 이력에서 복원, max_age 초보다 오래됐으면 None"""
+    if _last_good is not None:
+        ts, result = _last_good
+        result = dict(result)
+    else:
+        premium = get_latest_snapshot("premium")
+        fx = get_latest_snapshot("fx")
+        if not premium or not fx or premium.get("premium_percentage") is None:
+            return None
+        ts = premium["ts"]
+        result = {key: value for key, value in premium.items() if key != "ts"}
+        result.update({
+            "usd_krw_rate": fx.get("usd_krw_rate"),
+            "premium_grade": get_premium_grade(premium["premium_percentage"]),
+            "timestamp": datetime.datetime.fromtimestamp(ts).isoformat()
+        })
+    
+    age = time.time() - ts
+    if age > max_age:
         return None
+    result.update({"stale": True, "stale_age_seconds": round(age, 1)})
+    return result
 
 
 def calculate_gold_premium(international_price_krw, domestic_price_krw):
@@ -61,7 +90,7 @@ def calculate_gold_premium(international_price_krw, domestic_price_krw):
             "domestic_price_krw": round(domestic_price_krw, 2)
         }
     except Exception as e:
-        print(f"프리미엄 계산 오류: {e}")
+        log.warning("프리미엄 계산 오류: %s", e)
         return None
 
 
@@ -129,5 +158,5 @@ def analyze_premium_signals(premium_percentage):
         return signals
         
     except Exception as e:
-        print(f"프리미엄 신호 분석 오류: {e}")
+        log.warning("프리미엄 신호 분석 오류: %s", e)
         return []
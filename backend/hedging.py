@@ -0,0 +1,150 @@
+"""
+헤지 요청 - 주 출처가 평소 응답 시간(p95) 안에 답하지 않으면 백업 출처를 함께 호출해 먼저 온 유효한 값 사용
+
+꼬리 지연이 '주 출처 타임아웃 + 백업 지연'에서 '주 출처 p95 + 백업 지연' 수준으로 줄어듦.
+헤지 지연은 출처별 최근 응답 시간에서 자동으로 계산
+"""
+
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import deadline
+import metrics
+from config import (
+    HEDGE_ENABLED,
+    HEDGE_WORKERS,
+    HEDGE_LATENCY_WINDOW,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_QUANTILE,
+    HEDGE_DEFAULT_DELAY_SECONDS,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_MAX_DELAY_SECONDS
+)
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+
+HEDGED_CALLS = metrics.Counter("hedged_calls_total", "주/백업 출처 조회 결과", ("source", "outcome"))
+
+
+class LatencyTracker:
+    """출처별 최근 응답 시간 (고정 길이) - 분위수는 조회 시점에 정렬해 계산"""
+
+    def __init__(self, window=HEDGE_LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, source, seconds):
+        with self._lock:
+            samples = self._samples.get(source)
+            if samples is None:
+                samples = self._samples[source] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def quantile(self, source, q, min_samples=1):
+        with self._lock:
+            samples = sorted(self._samples.get(source, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def sources(self):
+        with self._lock:
+            return list(self._samples)
+
+
+_latency = LatencyTracker()
+
+
+def hedge_delay(source):
+    """주 출처를 기다릴 시간 - 관측 p95 (표본이 적으면 기본값), 최소/최대 범위로 제한"""
+    observed = _latency.quantile(source, HEDGE_QUANTILE, HEDGE_MIN_SAMPLES)
+    delay = HEDGE_DEFAULT_DELAY_SECONDS if observed is None else observed
+    return min(max(delay, HEDGE_MIN_DELAY_SECONDS), HEDGE_MAX_DELAY_SECONDS)
+
+
+metrics.Gauge("hedge_delay_seconds", "출처별 현재 헤지 지연 (관측 p95)", ("source",),
+              lambda: {(source,): round(hedge_delay(source), 4) for source in _latency.sources()})
+
+
+def _submit(func, source=None):
+    """풀에서 실행 - 요청 ID/추적/기한 컨텍스트를 이어받음
+
+    source를 주면 유효한 값을 돌려준 호출의 응답 시간만 기록. 차단기/실패 캐시/기한으로 호출 없이
+    끝난 경우(None)나 실패, 시작 전에 취소된 경우는 실제 응답 시간이 아니므로 헤지 지연 계산에서 제외
+    """
+    started = time.perf_counter()
+    future = _executor.submit(contextvars.copy_context().run, func)
+    if source is not None:
+        def record(done):
+            if not done.cancelled() and _value(done) is not None:
+                _latency.record(source, time.perf_counter() - started)
+        future.add_done_callback(record)
+    return future
+
+
+def _value(future):
+    """완료된 조회 결과 - 예외는 실패(None)로 처리"""
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+
+def hedged_call(primary_source, primary, backup_source, backup):
+    """primary() 우선, 헤지 지연 안에 답이 없으면 backup()도 호출해 먼저 온 유효한(None 아닌) 값 반환
+
+    primary가 먼저 실패하면 기존처럼 바로 backup으로 대체. 진 쪽이 아직 시작 전이면 취소하고,
+    이미 실행 중이면 결과만 버림 (주 출처가 늦게라도 유효한 값을 받으면 응답 시간은 헤지 지연 계산에 반영)
+    """
+    if not HEDGE_ENABLED:
+        result = primary()
+        if result is None and not deadline.expired():
+            result = backup()
+        return result
+
+    primary_future = _submit(primary, primary_source)
+    delay = hedge_delay(primary_source)
+    left = deadline.remaining()
+    done, _ = wait([primary_future], timeout=delay if left is None else min(delay, left))
+
+    if done:
+        result = _value(primary_future)
+        if result is not None:
+            HEDGED_CALLS.inc(primary_source, "primary")
+            return result
+        if deadline.expired():
+            HEDGED_CALLS.inc(primary_source, "failed")
+            return None
+        # 주 출처 실패 - 백업으로 대체
+        backup_future = _submit(backup)
+        done, _ = wait([backup_future], timeout=deadline.remaining())
+        result = _value(backup_future) if done else None
+        HEDGED_CALLS.inc(primary_source, "fallback" if result is not None else "failed")
+        return result
+
+    if deadline.expired():
+        HEDGED_CALLS.inc(primary_source, "failed")
+        return None
+
+    # 헤지 - 주 출처가 느림, 백업 동시 호출 후 먼저 온 유효한 값 사용
+    backup_future = _submit(backup)
+    owners = {primary_future: "hedge_primary", backup_future: "hedge_backup"}
+    pending = set(owners)
+    while pending:
+        done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            result = _value(future)
+            if result is not None:
+                for other in pending:
+                    other.cancel()
+                HEDGED_CALLS.inc(primary_source, owners[future])
+                return result
+
+    HEDGED_CALLS.inc(primary_source, "failed")
+    return None
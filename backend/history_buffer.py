@@ -0,0 +1,164 @@
+"""
+최근 이력 링버퍼 - 프리미엄/환율/선물 스냅샷을 고정 크기 병렬 배열로 보관 (재시작 시 디스크 덤프 복원)
+"""
+
+import os
+import json
+import time
+import threading
+from array import array
+
+from structured_log import get_logger
+from config import HISTORY_CAPACITY, HISTORY_DUMP_PATH, HISTORY_CONTRACT_MIN_INTERVAL_SECONDS
+
+log = get_logger("history_buffer")
+
+# 종류별 필드 - 숫자 필드는 array('d'), 문자열 필드는 고정 길이 list
+HISTORY_FIELDS = {
+    "premium": {"numeric": ["international_price_usd_oz", "domestic_price_krw_g", "converted_intl_price_krw_g", "premium_percentage"], "text": []},
+    "fx": {"numeric": ["usd_krw_rate"], "text": []},
+    "contract": {"numeric": ["current_price", "volume", "open_interest"], "text": ["symbol"]},
+}
+
+
+class HistoryRing:
+    """고정 용량 병렬 배열 링버퍼 - 생성 시점에 메모리 크기가 확정됨"""
+
+    __slots__ = ("capacity", "numeric", "text", "ts", "columns", "head", "size")
+
+    def __init__(self, numeric, text, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.numeric = list(numeric)
+        self.text = list(text)
+        self.ts = array('d', bytes(8 * capacity))
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in self.numeric}
+        self.columns.update({name: [None] * capacity for name in self.text})
+        self.head = 0   # 다음 기록 위치
+        self.size = 0
+
+    def append(self, ts, values):
+        i = self.head
+        self.ts[i] = ts
+        for name in self.numeric:
+            value = values.get(name)
+            self.columns[name][i] = float(value) if value is not None else float('nan')
+        for name in self.text:
+            self.columns[name][i] = values.get(name)
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _indices(self, n):
+        start = (self.head - n) % self.capacity
+        return [(start + k) % self.capacity for k in range(n)]
+
+    def rows(self, n=None, since=None):
+        """오래된 순 레코드 - 최근 n건 또는 since(epoch 초) 이후"""
+        count = self.size if n is None else min(n, self.size)
+        indices = self._indices(count)
+        if since is not None:
+            indices = [i for i in indices if self.ts[i] >= since]
+
+        result = []
+        for i in indices:
+            row = {"ts": self.ts[i]}
+            for name in self.numeric:
+                value = self.columns[name][i]
+                row[name] = None if value != value else value  # NaN → None
+            for name in self.text:
+                row[name] = self.columns[name][i]
+            result.append(row)
+        return result
+
+
+_rings = {kind: HistoryRing(fields["numeric"], fields["text"]) for kind, fields in HISTORY_FIELDS.items()}
+_lock = threading.Lock()
+_loaded = False
+_contract_recorded_at = {}   # 종목 → 마지막 contract 기록 시각
+
+
+def _ensure_loaded():
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        load_history_dump()
+
+
+def record_snapshot(kind, values, ts=None):
+    """스냅샷 1건 기록"""
+    ts = ts or time.time()
+    with _lock:
+        _ensure_loaded()
+        _rings[kind].append(ts, values)
+
+
+def record_premium(premium_data):
+    """금 프리미엄 조회 결과 → premium/fx 이력"""
+    record_snapshot("premium", premium_data)
+    record_snapshot("fx", premium_data)
+
+
+def record_contract(quote):
+    """선물 시세 → contract 이력 (스트림/REST 폭주 방지를 위해 종목별 최소 간격 적용)"""
+    now = time.time()
+    symbol = quote.get("symbol")
+    with _lock:
+        _ensure_loaded()
+        last = _contract_recorded_at.get(symbol)
+        if last is not None and now - last < HISTORY_CONTRACT_MIN_INTERVAL_SECONDS:
+            return
+        _contract_recorded_at[symbol] = now
+        _rings["contract"].append(now, quote)
+
+
+def get_recent_history(kind, n=None, minutes=None):
+    """최근 n건 또는 최근 minutes분 이력"""
+    since = time.time() - minutes * 60 if minutes else None
+    with _lock:
+        _ensure_loaded()
+        return _rings[kind].rows(n, since)
+
+
+def get_latest_snapshot(kind):
+    """가장 최근 스냅샷 1건 (없으면 None)"""
+    rows = get_recent_history(kind, n=1)
+    return rows[0] if rows else None
+
+
+def dump_history(path=HISTORY_DUMP_PATH):
+    """링버퍼 내용을 디스크에 덤프 (임시 파일 기록 후 교체)"""
+    with _lock:
+        if not _loaded:
+            return False
+        payload = {kind: ring.rows() for kind, ring in _rings.items()}
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        log.warning("이력 덤프 저장 오류: %s", e)
+        return False
+
+
+def load_history_dump(path=HISTORY_DUMP_PATH):
+    """덤프 파일에서 링버퍼 복원 (호출 측에서 _lock 보유)"""
+    if not os.path.exists(path):
+        return False
+
+    try:
+        with open(path) as f:
+            payload = json.load(f)
+        for kind, rows in payload.items():
+            ring = _rings.get(kind)
+            if ring is None:
+                continue
+            for row in rows[-ring.capacity:]:
+                ring.append(row["ts"], row)
+        log.info("최근 이력 복원 완료: %s", ', '.join(f'{k} {len(v)}건' for k, v in payload.items()))
+        return True
+    except Exception as e:
+        log.warning("이력 덤프 복원 오류: %s", e)
+        return False
@@ -0,0 +1,318 @@
+"""
+KIS 실시간(WebSocket) 선물 시세/호가 수신 - 스트림이 끊기면 REST 조회로 대체
+"""
+
+import json
+import time
+import threading
+
+import metrics
+from structured_log import get_logger
+from config import (
+    KIS_WS_URL,
+    KIS_WS_APPROVAL_KEY,
+    KIS_WS_QUOTE_TR_ID,
+    KIS_WS_ORDERBOOK_TR_ID,
+    STREAM_MAX_AGE_SECONDS,
+    STREAM_RECONNECT_MAX_SECONDS
+)
+
+try:
+    import websocket
+    STREAM_AVAILABLE = True
+except ImportError:
+    STREAM_AVAILABLE = False
+    print("websocket-client 라이브러리가 없습니다. 실시간 시세는 REST 조회로 대체합니다.")
+
+log = get_logger("kis_stream")
+
+# 지수선물 실시간 체결가 (H0IFCNT0) 앞부분 필드 - 이후 필드는 사용하지 않음
+QUOTE_FIELDS = [
+    "futs_shrn_iscd", "bsop_hour", "futs_prdy_vrss", "prdy_vrss_sign", "futs_prdy_ctrt",
+    "futs_prpr", "futs_oprc", "futs_hgpr", "futs_lwpr", "last_cnqn",
+    "acml_vol", "acml_tr_pbmn", "hts_thpr", "mrkt_basis", "dprt",
+    "nmsc_fctn_stpl_prc", "fmsc_fctn_stpl_prc", "spead_prc", "hts_otst_stpl_qty", "otst_stpl_qty_icdc"
+]
+
+# 지수선물 실시간 호가 (H0IFASP0)
+ORDERBOOK_FIELDS = (
+    ["futs_shrn_iscd", "bsop_hour"]
+    + [f"futs_askp{i}" for i in range(1, 6)]
+    + [f"futs_bidp{i}" for i in range(1, 6)]
+    + [f"askp_csnu{i}" for i in range(1, 6)]
+    + [f"bidp_csnu{i}" for i in range(1, 6)]
+    + [f"askp_rsqn{i}" for i in range(1, 6)]
+    + [f"bidp_rsqn{i}" for i in range(1, 6)]
+    + ["total_askp_csnu", "total_bidp_csnu", "total_askp_rsqn", "total_bidp_rsqn",
+       "total_askp_rsqn_icdc", "total_bidp_rsqn_icdc"]
+)
+
+# 스트림 스냅샷 저장소: symbol -> (수신시각, 데이터)
+_quotes = {}
+_orderbooks = {}
+_store_lock = threading.Lock()
+
+
+def parse_stream_message(message):
+    """실시간 데이터 메시지(0|TR_ID|건수|필드^필드...) → (tr_id, [dict, ...])"""
+    parts = message.split('|', 3)
+    if len(parts) != 4 or parts[0] != '0':
+        return None, []  # 암호화(1) 메시지는 선물 시세에 사용되지 않음
+
+    tr_id, count, payload = parts[1], int(parts[2]), parts[3]
+    columns = QUOTE_FIELDS if tr_id == KIS_WS_QUOTE_TR_ID else ORDERBOOK_FIELDS
+    fields = payload.split('^')
+
+    # 여러 건이 한 메시지에 이어 붙어 오므로 건수로 나눔
+    width = len(fields) // count if count > 0 else len(fields)
+    records = []
+    for i in range(count):
+        values = fields[i * width:(i + 1) * width]
+        records.append(dict(zip(columns, values)))
+    return tr_id, records
+
+
+def handle_quote(fields):
+    """체결가 메시지 → 스냅샷 저장소 + 선물 봉"""
+    from futures_api import parse_futures_quote
+    from bars import record_futures_quote
+    from history_buffer import record_contract
+
+    symbol = fields.get('futs_shrn_iscd')
+    quote = parse_futures_quote(symbol, fields) if symbol else None
+    if quote:
+        with _store_lock:
+            _quotes[symbol] = (time.time(), quote, fields)
+        record_futures_quote(quote)
+        record_contract(quote)
+
+
+def handle_orderbook(fields):
+    """호가 메시지 → 스냅샷 저장소 + 호가 저장소/미시구조 상태 갱신"""
+    from orderbook_store import record_orderbook_snapshot
+    from microstructure import update_microstructure
+
+    symbol = fields.get('futs_shrn_iscd')
+    if not symbol:
+        return
+
+    output2 = {**fields, "aspr_acpt_hour": fields.get('bsop_hour', '')}
+    with _store_lock:
+        _orderbooks[symbol] = (time.time(), output2)
+
+    record = record_orderbook_snapshot(symbol, output2)
+    if record is not None:
+        update_microstructure(symbol, record)
+
+
+class KisStreamClient:
+    """KIS WebSocket 클라이언트 - 자동 재연결(지수 백오프) 및 종목 구독 관리"""
+
+    def __init__(self, url=KIS_WS_URL, approval_key_provider=None):
+        from api_utils import get_kis_approval_key
+
+        self.url = url
+        self.approval_key_provider = approval_key_provider or get_kis_approval_key
+        self.approval_key = KIS_WS_APPROVAL_KEY
+        self.symbols = set()
+        self.connected = False
+        self.reconnects = 0
+        self.messages = 0
+        self.last_message_at = None
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._send_lock = threading.Lock()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def subscribe(self, symbol):
+        """종목 구독 추가 (연결 중이면 즉시 등록, 아니면 재연결 시 등록)"""
+        if symbol in self.symbols:
+            return
+        self.symbols.add(symbol)
+        if self.connected:
+            self._send_subscriptions([symbol])
+
+    def _subscription_message(self, tr_id, symbol):
+        return json.dumps({
+            "header": {
+                "approval_key": self.approval_key,
+                "custtype": "P",
+                "tr_type": "1",  # 1: 등록, 2: 해제
+                "content-type": "utf-8"
+            },
+            "body": {"input": {"tr_id": tr_id, "tr_key": symbol}}
+        })
+
+    def _send(self, message):
+        with self._send_lock:
+            self._ws.send(message)
+
+    def _send_subscriptions(self, symbols):
+        for symbol in symbols:
+            for tr_id in (KIS_WS_QUOTE_TR_ID, KIS_WS_ORDERBOOK_TR_ID):
+                self._send(self._subscription_message(tr_id, symbol))
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                if not self.approval_key:
+                    self.approval_key = self.approval_key_provider()
+                    if not self.approval_key:
+                        raise ConnectionError("KIS 실시간 접속키 발급 실패")
+
+                self._ws = websocket.create_connection(self.url, timeout=30)
+                self.connected = True
+                backoff = 1
+                log.info("KIS 실시간 연결: %s (%d종목)", self.url, len(self.symbols))
+                self._send_subscriptions(list(self.symbols))
+
+                while not self._stop.is_set():
+                    try:
+                        message = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        continue  # 장 마감 등 무체결 구간
+                    if not message:
+                        raise ConnectionError("연결 종료")
+                    self._handle(message)
+
+            except Exception as e:
+                if not self._stop.is_set():
+                    log.warning("KIS 실시간 연결 끊김: %s - %d초 후 재연결", e, backoff)
+            finally:
+                self.connected = False
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+
+            if self._stop.wait(backoff):
+                break
+            self.reconnects += 1
+            backoff = min(backoff * 2, STREAM_RECONNECT_MAX_SECONDS)
+
+    def _handle(self, message):
+        self.messages += 1
+        self.last_message_at = time.time()
+
+        if message[0] in '01':
+            tr_id, records = parse_stream_message(message)
+            handler = handle_quote if tr_id == KIS_WS_QUOTE_TR_ID else handle_orderbook
+            for fields in records:
+                handler(fields)
+            return
+
+        # JSON 제어 메시지: PINGPONG은 그대로 돌려보내고, 구독 응답은 오류만 확인
+        control = json.loads(message)
+        header = control.get('header', {})
+        if header.get('tr_id') == 'PINGPONG':
+            self._send(message)
+        elif control.get('body', {}).get('rt_cd') not in (None, '0'):
+            log.warning("KIS 실시간 구독 오류: %s", control['body'].get('msg1'))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def start_stream(symbols=(), url=KIS_WS_URL, approval_key_provider=None):
+    """실시간 수신 시작 (이미 실행 중이면 종목만 추가)"""
+    global _client
+
+    if not STREAM_AVAILABLE:
+        return None
+
+    with _client_lock:
+        if _client is None:
+            _client = KisStreamClient(url, approval_key_provider)
+        for symbol in symbols:
+            _client.subscribe(symbol)
+        _client.start()
+        return _client
+
+
+def stop_stream():
+    """실시간 수신 중지"""
+    global _client
+
+    with _client_lock:
+        client, _client = _client, None
+    if client:
+        client.stop()
+
+
+def ensure_stream_subscription(symbol):
+    """실시간 수신 중이면 종목 구독 추가 (주계약 롤오버 시)"""
+    with _client_lock:
+        client = _client
+    if client and symbol:
+        client.subscribe(symbol)
+
+
+def _fresh(entry, max_age_seconds):
+    return entry if entry and time.time() - entry[0] <= max_age_seconds else None
+
+
+def get_streamed_quote(symbol, max_age_seconds=STREAM_MAX_AGE_SECONDS):
+    """스트림 최신 시세 (get_domestic_futures_data 형식) - 없거나 오래됐으면 None"""
+    with _store_lock:
+        entry = _fresh(_quotes.get(symbol), max_age_seconds)
+    if not entry:
+        metrics.cache_miss("stream_quote")
+        return None
+    metrics.cache_hit("stream_quote")
+    return dict(entry[1])
+
+
+def get_streamed_orderbook(symbol, max_age_seconds=STREAM_MAX_AGE_SECONDS):
+    """스트림 최신 호가 (output1, output2) - 없거나 오래됐으면 None"""
+    with _store_lock:
+        book = _fresh(_orderbooks.get(symbol), max_age_seconds)
+        quote = _quotes.get(symbol)
+    if not book:
+        metrics.cache_miss("stream_orderbook")
+        return None
+    metrics.cache_hit("stream_orderbook")
+    output1 = dict(quote[2]) if quote else {}
+    return output1, dict(book[1])
+
+
+def get_stream_status():
+    """실시간 수신 상태 요약"""
+    with _client_lock:
+        client = _client
+
+    with _store_lock:
+        quote_ages = {symbol: round(time.time() - entry[0], 1) for symbol, entry in _quotes.items()}
+        orderbook_ages = {symbol: round(time.time() - entry[0], 1) for symbol, entry in _orderbooks.items()}
+
+    return {
+        "available": STREAM_AVAILABLE,
+        "running": client is not None,
+        "connected": bool(client and client.connected),
+        "symbols": sorted(client.symbols) if client else [],
+        "reconnects": client.reconnects if client else 0,
+        "messages": client.messages if client else 0,
+        "quote_age_seconds": quote_ages,
+        "orderbook_age_seconds": orderbook_ages
+    }
@@ -0,0 +1,157 @@
+"""
+귀금속 프리미엄 일괄 계산 - 레지스트리의 모든 종목 시세와 환율 1회를 동시에 조회
+"""
+
+import time
+import datetime
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import deadline
+from config import METAL_INSTRUMENTS, PREMIUM_FETCH_WORKERS, PREMIUM_STALE_MAX_AGE_SECONDS
+
+GRAMS_PER_OUNCE = 31.1035
+
+# 요청마다 스레드를 만들지 않도록 모듈 전역 풀 재사용
+_executor = ThreadPoolExecutor(max_workers=PREMIUM_FETCH_WORKERS, thread_name_prefix="premium")
+
+_last_good = {}     # 종목 → (epoch 초, 마지막 완전한 종목 결과) - 일부 종목만 조회해도 다른 종목 값은 유지
+
+
+def build_premium_result(international_price_usd, exchange_rate, domestic_price_krw):
+    """국제 시세(USD/oz) + 환율 + 국내 시세(KRW/g) → 프리미엄 결과 (국내 시세가 없으면 프리미엄 None)"""
+    from gold_data import calculate_gold_premium, get_premium_grade
+
+    if not international_price_usd or not exchange_rate:
+        return None
+
+    # 국제 시세를 KRW/g으로 변환 (1 oz = 31.1035 g)
+    international_price_krw_per_gram = (international_price_usd * exchange_rate) / GRAMS_PER_OUNCE
+    premium_data = calculate_gold_premium(international_price_krw_per_gram, domestic_price_krw)
+    premium = premium_data.get('premium_percentage') if premium_data else None
+
+    return {
+        "international_price_usd_oz": international_price_usd,
+        "domestic_price_krw_g": domestic_price_krw,
+        "usd_krw_rate": exchange_rate,
+        "converted_intl_price_krw_g": round(international_price_krw_per_gram, 2),
+        "premium_percentage": premium,
+        "premium_grade": get_premium_grade(premium) if domestic_price_krw else None,
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+
+
+def is_complete(metal, result):
+    """국제 시세와 (국내 시세가 있는 종목이면) 국내 시세까지 반영해 프리미엄이 계산된 결과인지"""
+    if not result:
+        return False
+    return not METAL_INSTRUMENTS[metal].get("domestic") or result.get("premium_percentage") is not None
+
+
+def _result_within_deadline(future):
+    try:
+        return future.result(timeout=deadline.remaining())
+    except TimeoutError:
+        future.cancel()
+        return None
+
+
+def get_metal_premium_data(metals=None):
+    """종목별 프리미엄 일괄 조회 - 환율 1회 + 종목별 국제/국내 시세를 모두 동시에 조회
+
+    metals: METAL_INSTRUMENTS 키 목록 (기본: 전체)
+    """
+    from api_utils import get_exchange_rate, get_naver_metal_price
+
+    metals = list(metals or METAL_INSTRUMENTS)
+    unknown = [metal for metal in metals if metal not in METAL_INSTRUMENTS]
+    if unknown:
+        raise ValueError(f"알 수 없는 종목: {', '.join(unknown)}")
+
+    # 모든 조회를 먼저 제출한 뒤 결과 수집 - 종목이 늘어도 지연은 가장 느린 조회 1회 수준
+    # 풀 스레드에서도 요청 ID/추적 구간/요청 기한이 이어지도록 호출 컨텍스트를 복사해 실행
+    fx_future = _executor.submit(contextvars.copy_context().run, get_exchange_rate)
+    price_futures = {}
+    for metal in metals:
+        instrument = METAL_INSTRUMENTS[metal]
+        for side in ("international", "domestic"):
+            if instrument.get(side):
+                price_futures[(metal, side)] = _executor.submit(contextvars.copy_context().run, get_naver_metal_price, *instrument[side])
+
+    # 요청 기한이 있으면 남은 시간까지만 기다리고, 늦은 조회는 없는 값으로 처리 (풀이 밀려 대기 중인 작업 포함)
+    exchange_rate = _result_within_deadline(fx_future)
+    prices = {key: _result_within_deadline(future) for key, future in price_futures.items()}
+
+    results = {}
+    for metal in metals:
+        result = build_premium_result(
+            prices.get((metal, "international")),
+            exchange_rate,
+            prices.get((metal, "domestic"))
+        )
+        if result:
+            result.update({"metal": metal, "name": METAL_INSTRUMENTS[metal]["name"]})
+        results[metal] = result
+
+    data = {
+        "usd_krw_rate": exchange_rate,
+        "metals": results,
+        "partial": deadline.expired() and not all(results.values()),   # 기한 초과로 빠진 종목이 있음
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+    now = time.time()
+    for metal, result in results.items():
+        if is_complete(metal, result):
+            _last_good[metal] = (now, result)
+    return data
+
+
+def get_last_good_metal_premium(metals=None, max_age=PREMIUM_STALE_MAX_AGE_SECONDS):
+    """종목별 마지막 정상 결과를 모아 반환 (stale 표시) - max_age 초 안의 값이 하나도 없으면 None
+
+    종목마다 조회 시각이 다르므로 종목별 stale_age_seconds를 붙이고, 전체 값은 가장 오래된 종목 기준
+    """
+    now = time.time()
+    metals = list(metals or METAL_INSTRUMENTS)
+    results = {}
+    ages = []
+    for metal in metals:
+        entry = _last_good.get(metal)
+        age = None if entry is None else now - entry[0]
+        if age is None or age > max_age:
+            results[metal] = None
+            continue
+        results[metal] = {**entry[1], "stale": True, "stale_age_seconds": round(age, 1)}
+        ages.append(age)
+
+    if not ages:
+        return None
+    # 환율은 가장 최근에 조회된 종목 결과 기준
+    freshest = min((result for result in results.values() if result), key=lambda result: result["stale_age_seconds"])
+    return {
+        "usd_krw_rate": freshest["usd_krw_rate"],
+        "metals": results,
+        "partial": not all(results.values()),
+        "timestamp": freshest["timestamp"],
+        "stale": True,
+        "stale_age_seconds": round(max(ages), 1)
+    }
+
+
+def with_stale_fallback(data, max_age=PREMIUM_STALE_MAX_AGE_SECONDS):
+    """불완전한 종목(조회 실패, 국내 시세 누락)만 마지막 정상 결과로 대체 - (응답 데이터, 대체한 종목 수)"""
+    incomplete = [metal for metal, result in data["metals"].items() if not is_complete(metal, result)]
+    stale = get_last_good_metal_premium(incomplete, max_age) if incomplete else None
+    if not stale:
+        return data, 0
+
+    replaced = {metal: result for metal, result in stale["metals"].items() if result}
+    metals = {**data["metals"], **replaced}
+    return {
+        **data,
+        "usd_krw_rate": data["usd_krw_rate"] or stale["usd_krw_rate"],
+        "metals": metals,
+        "partial": data["partial"] and not all(is_complete(metal, result) for metal, result in metals.items()),
+        "stale": True,
+        "stale_age_seconds": stale["stale_age_seconds"]
+    }, len(replaced)
@@ -0,0 +1,271 @@
+"""
+운영 지표 - 외부 API 지연 히스토그램, 캐시 적중률, 백그라운드 작업 시간, 토큰 발급 수, 스냅샷 경과 시간
+
+기록은 스레드별 dict에만 쓰고(락 없음) /metrics 수집 시점에 합산해 Prometheus 텍스트 형식으로 출력
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from config import METRICS_LATENCY_BUCKETS, METRICS_TASK_BUCKETS
+
+_registry = []
+_started_at = time.time()
+
+
+class _ShardedMetric:
+    """스레드별 누적 저장소 - 각 스레드는 자기 dict에만 쓰고, 수집 시 전체를 합산"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []           # (스레드, dict)
+        self._retired = {}          # 종료된 스레드 누적분
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:        # 스레드당 한 번만
+                self._shards.append((threading.current_thread(), shard))
+                if len(self._shards) > 64:
+                    self._retire_dead()
+        return shard
+
+    def _retire_dead(self):
+        """종료된 스레드의 누적분을 합쳐 보관 (요청마다 스레드를 만드는 서버에서 저장소가 늘지 않도록)"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for key, value in shard.items():
+                    self._merge(self._retired, key, value)
+        self._shards = alive
+
+    def collect(self):
+        """라벨 값 튜플 -> 합산 값"""
+        with self._lock:
+            self._retire_dead()
+            shards = [shard for _, shard in self._shards]
+            total = {}
+            for key, value in self._retired.items():
+                self._merge(total, key, value)
+        for shard in shards:
+            for key, value in list(shard.items()):
+                self._merge(total, key, value)
+        return total
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    @staticmethod
+    def _merge(target, key, value):
+        target[key] = target.get(key, 0) + value
+
+
+class Histogram(_ShardedMetric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            # [구간별 개수..., +Inf 구간, 합계, 건수]
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    @staticmethod
+    def _merge(target, key, value):
+        current = target.get(key)
+        target[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+
+
+class Gauge:
+    """수집 시점에 콜백으로 값을 계산하는 지표 - 콜백은 값 또는 {라벨 값 튜플: 값} 반환"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        _registry.append(self)
+
+    def collect(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            from structured_log import get_logger   # structured_log이 metrics를 불러오므로 순환 import 방지
+            get_logger("metrics").warning("지표 수집 오류 (%s): %s", self.name, e)
+            return {}
+        if values is None:
+            return {}
+        return values if isinstance(values, dict) else {(): values}
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    """등록된 전체 지표 → Prometheus 텍스트 노출 형식"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in sorted(metric.collect().items()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+                lines.append(f"{metric.name}_bucket{_format_labels(metric.labelnames, labels, ('le', le))} {cumulative}")
+            lines.append(f"{metric.name}_sum{_format_labels(metric.labelnames, labels)} {_format_value(value[-2])}")
+            lines.append(f"{metric.name}_count{_format_labels(metric.labelnames, labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# ---- 외부 API ----
+
+UPSTREAM_SECONDS = Histogram("upstream_request_duration_seconds", "외부 API 응답 시간", ("upstream", "endpoint"))
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "외부 API 호출 수", ("upstream", "endpoint", "result"))
+
+# 경로 접두어 → 외부 API 구분 (기본 URL을 대역 서버로 바꿔도 경로는 같음)
+_UPSTREAM_PREFIXES = (
+    ("/uapi/", "kis"),
+    ("/oauth2/", "kis"),
+    ("/front-api/", "naver"),
+    ("/site/program/financial/", "exim"),
+    ("/rest/v1/", "supabase"),
+)
+
+
+def classify_upstream(url, headers=None):
+    """URL → (외부 API, 엔드포인트) - KIS는 TR ID, Supabase는 테이블, 나머지는 경로 마지막 부분"""
+    path = urlsplit(url).path
+    upstream = next((name for prefix, name in _UPSTREAM_PREFIXES if path.startswith(prefix)), "other")
+    if upstream == "kis" and headers and headers.get("tr_id"):
+        return upstream, headers["tr_id"]
+    return upstream, path.rstrip("/").rsplit("/", 1)[-1] or "-"
+
+
+def observe_upstream(upstream, endpoint, seconds, ok):
+    UPSTREAM_SECONDS.observe(seconds, upstream, endpoint)
+    UPSTREAM_REQUESTS.inc(upstream, endpoint, "ok" if ok else "error")
+
+
+DEADLINE_SKIPS = Counter("deadline_skipped_calls_total", "요청 기한이 지나 생략한 외부 호출 수", ("upstream", "endpoint"))
+STALE_RESPONSES = Counter("stale_responses_total", "새 데이터 대신 마지막 정상 스냅샷으로 응답한 수", ("endpoint",))
+
+
+# ---- 캐시 ----
+
+CACHE_REQUESTS = Counter("cache_requests_total", "캐시 조회 수", ("cache", "result"))
+
+
+def cache_hit(cache):
+    CACHE_REQUESTS.inc(cache, "hit")
+
+
+def cache_miss(cache):
+    CACHE_REQUESTS.inc(cache, "miss")
+
+
+def _cache_hit_ratios():
+    totals = {}
+    for (cache, result), count in CACHE_REQUESTS.collect().items():
+        hits, total = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (count if result == "hit" else 0), total + count)
+    return {(cache,): round(hits / total, 4) for cache, (hits, total) in totals.items() if total}
+
+
+Gauge("cache_hit_ratio", "캐시 적중률 (시작 이후 누적)", ("cache",), _cache_hit_ratios)
+
+
+# ---- 백그라운드 작업 / 토큰 ----
+
+TASK_SECONDS = Histogram("background_task_duration_seconds", "백그라운드 작업 소요 시간", ("task",), METRICS_TASK_BUCKETS)
+TASK_FAILURES = Counter("background_task_failures_total", "백그라운드 작업 실패 수", ("task",))
+TOKEN_REFRESHES = Counter("kis_token_refresh_total", "KIS 토큰/접속키 발급 시도 수", ("kind", "result"))
+
+
+@contextmanager
+def track_task(task):
+    """작업 소요 시간 기록 - 예외는 실패로 집계 후 그대로 전달"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        TASK_FAILURES.inc(task)
+        raise
+    finally:
+        TASK_SECONDS.observe(time.perf_counter() - started, task)
+
+
+# ---- 스냅샷 경과 시간 ----
+
+def _snapshot_ages():
+    from history_buffer import get_latest_snapshot
+    from microstructure import get_microstructure_ages
+    from kis_stream import get_stream_status
+
+    now = time.time()
+    ages = {}
+    for kind in ("premium", "fx", "contract"):
+        latest = get_latest_snapshot(kind)
+        if latest:
+            ages[(kind, "")] = round(now - latest["ts"], 3)
+    for symbol, age in get_microstructure_ages().items():
+        ages[("orderbook", symbol)] = age
+
+    status = get_stream_status()
+    for symbol, age in status["quote_age_seconds"].items():
+        ages[("stream_quote", symbol)] = age
+    for symbol, age in status["orderbook_age_seconds"].items():
+        ages[("stream_orderbook", symbol)] = age
+    return ages
+
+
+Gauge("snapshot_age_seconds", "마지막 스냅샷 이후 경과 시간", ("kind", "symbol"), _snapshot_ages)
+Gauge("process_uptime_seconds", "프로세스 시작 이후 경과 시간", (), lambda: round(time.time() - _started_at, 3))
@@ -0,0 +1,165 @@
+"""
+호가 미시구조 분석 - 연속 호가 스냅샷 기반 증분 지표 (스냅샷당 O(호가단계))
+"""
+
+import time
+import threading
+import numpy as np
+
+from config import MICROSTRUCTURE_EWMA_ALPHA, MICROSTRUCTURE_DEPTH_DECAY
+from orderbook_store import LEVELS, PRICE_SCALE
+from alerts import evaluate_metric
+from structured_log import get_logger
+
+log = get_logger("microstructure")
+
+# 단계별 가중치 (1단계 = 1.0)
+DEPTH_WEIGHTS = MICROSTRUCTURE_DEPTH_DECAY ** np.arange(LEVELS)
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def _ewma(previous, value, alpha=MICROSTRUCTURE_EWMA_ALPHA):
+    return value if previous is None else previous + alpha * (value - previous)
+
+
+def calculate_order_flow_imbalance(prev, record):
+    """단계별 OFI(Order Flow Imbalance) - 직전 스냅샷 대비 매수/매도 잔량 유입 차이"""
+    bid_px, ask_px = record["bid_price"], record["ask_price"]
+    bid_qty, ask_qty = record["bid_qty"].astype(np.int64), record["ask_qty"].astype(np.int64)
+    prev_bid_px, prev_ask_px = prev["bid_price"], prev["ask_price"]
+    prev_bid_qty, prev_ask_qty = prev["bid_qty"].astype(np.int64), prev["ask_qty"].astype(np.int64)
+
+    bid_flow = np.where(bid_px >= prev_bid_px, bid_qty, 0) - np.where(bid_px <= prev_bid_px, prev_bid_qty, 0)
+    ask_flow = np.where(ask_px <= prev_ask_px, ask_qty, 0) - np.where(ask_px >= prev_ask_px, prev_ask_qty, 0)
+    return bid_flow - ask_flow
+
+
+def calculate_snapshot_metrics(record):
+    """단일 스냅샷 지표 - 가중 불균형, 마이크로프라이스, 스프레드, 잔량 비율"""
+    bid_qty = record["bid_qty"].astype(float)
+    ask_qty = record["ask_qty"].astype(float)
+    best_bid = record["bid_price"][0] / PRICE_SCALE
+    best_ask = record["ask_price"][0] / PRICE_SCALE
+
+    weighted_bid = float(DEPTH_WEIGHTS @ bid_qty)
+    weighted_ask = float(DEPTH_WEIGHTS @ ask_qty)
+    weighted_total = weighted_bid + weighted_ask
+    imbalance = (weighted_bid - weighted_ask) / weighted_total if weighted_total > 0 else 0.0
+
+    top_total = bid_qty[0] + ask_qty[0]
+    if top_total > 0 and best_bid > 0 and best_ask > 0:
+        microprice = (best_ask * bid_qty[0] + best_bid * ask_qty[0]) / top_total
+    else:
+        microprice = (best_bid + best_ask) / 2
+
+    total_bid = int(record["total_bid_qty"])
+    total_ask = int(record["total_ask_qty"])
+    total = total_bid + total_ask
+
+    return {
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "spread": round(best_ask - best_bid, 4),
+        "mid_price": (best_bid + best_ask) / 2,
+        "microprice": microprice,
+        "depth_imbalance": imbalance,
+        "pressure_ratio": total_bid / total_ask if total_ask > 0 else 1.0,
+        "buy_pressure_pct": total_bid / total * 100 if total > 0 else 50.0
+    }
+
+
+class MicrostructureState:
+    """종목별 미시구조 상태 - 직전 스냅샷과 지수평활 값만 보관"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.previous = None
+        self.samples = 0
+        self.updated_at = None
+        self.last = {}
+        self.ewma = {"pressure_ratio": None, "buy_pressure_pct": None, "depth_imbalance": None, "ofi": None, "spread": None}
+        self.cumulative_ofi = 0
+
+    def update(self, record):
+        metrics = calculate_snapshot_metrics(record)
+
+        if self.previous is not None:
+            level_ofi = calculate_order_flow_imbalance(self.previous, record)
+            ofi = float(DEPTH_WEIGHTS @ level_ofi)
+        else:
+            level_ofi = np.zeros(LEVELS, dtype=np.int64)
+            ofi = 0.0
+
+        metrics["ofi"] = ofi
+        metrics["level_ofi"] = level_ofi.tolist()
+        self.cumulative_ofi += ofi
+
+        for key in self.ewma:
+            self.ewma[key] = _ewma(self.ewma[key], metrics[key])
+
+        self.previous = record.copy()
+        self.last = metrics
+        self.samples += 1
+        self.updated_at = time.time()
+
+    def snapshot(self):
+        from futures_api import classify_pressure
+
+        smoothed_ratio = self.ewma["pressure_ratio"] if self.ewma["pressure_ratio"] is not None else 1.0
+        buy_pct = self.ewma["buy_pressure_pct"] if self.ewma["buy_pressure_pct"] is not None else 50.0
+
+        return {
+            "symbol": self.symbol,
+            "samples": self.samples,
+            "updated_at": self.updated_at,
+            "pressure_signal": classify_pressure(smoothed_ratio),
+            "buy_pressure_pct": round(buy_pct, 2),
+            "sell_pressure_pct": round(100 - buy_pct, 2),
+            "smoothed": {key: round(value, 4) if value is not None else None for key, value in self.ewma.items()},
+            "latest": {
+                "best_bid": self.last.get("best_bid"),
+                "best_ask": self.last.get("best_ask"),
+                "spread": self.last.get("spread"),
+                "microprice": round(self.last.get("microprice", 0), 4),
+                "depth_imbalance": round(self.last.get("depth_imbalance", 0), 4),
+                "pressure_ratio": round(self.last.get("pressure_ratio", 1.0), 3),
+                "ofi": self.last.get("ofi"),
+                "level_ofi": self.last.get("level_ofi")
+            },
+            "cumulative_ofi": self.cumulative_ofi
+        }
+
+
+def update_microstructure(symbol, record):
+    """새 호가 스냅샷으로 종목 상태 갱신"""
+    try:
+        with _states_lock:
+            state = _states.get(symbol)
+            if state is None:
+                state = _states[symbol] = MicrostructureState(symbol)
+            state.update(record)
+            pressure_ratio = state.last["pressure_ratio"]
+        
+        evaluate_metric("pressure_ratio", pressure_ratio, subject=symbol)
+    except Exception as e:
+        log.warning("미시구조 지표 갱신 오류: %s", e)
+
+
+def get_microstructure(symbol, max_age_seconds=None):
+    """종목 미시구조 상태 조회 - max_age_seconds보다 오래됐으면 None"""
+    with _states_lock:
+        state = _states.get(symbol)
+        if state is None or state.updated_at is None:
+            return None
+        if max_age_seconds is not None and time.time() - state.updated_at > max_age_seconds:
+            return None
+        return state.snapshot()
+
+
+def get_microstructure_ages():
+    """종목별 마지막 호가 갱신 이후 경과 시간 (초)"""
+    now = time.time()
+    with _states_lock:
+        return {symbol: round(now - state.updated_at, 3) for symbol, state in _states.items() if state.updated_at}
@@ -0,0 +1,247 @@
+"""
+호가 스냅샷 저장소 - 고정 레이아웃 numpy 링버퍼 + 일자별 청크 바이너리 파일
+"""
+
+import os
+import datetime
+import threading
+import numpy as np
+
+from structured_log import get_logger
+from config import ORDERBOOK_DATA_DIR, ORDERBOOK_RING_CAPACITY, ORDERBOOK_CHUNK_SIZE
+
+log = get_logger("orderbook_store")
+
+LEVELS = 5
+PRICE_SCALE = 100  # 가격은 0.01 단위 정수로 저장
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+# 스냅샷 1건 = 184 bytes (JSON dict 대비 수십 배 작음)
+ORDERBOOK_DTYPE = np.dtype([
+    ("ts", "<i8"),                    # epoch ms (aspr_acpt_hour 기준, KST)
+    ("ask_price", "<i8", (LEVELS,)),
+    ("bid_price", "<i8", (LEVELS,)),
+    ("ask_qty", "<i4", (LEVELS,)),
+    ("bid_qty", "<i4", (LEVELS,)),
+    ("ask_count", "<i4", (LEVELS,)),
+    ("bid_count", "<i4", (LEVELS,)),
+    ("total_ask_qty", "<i8"),
+    ("total_bid_qty", "<i8"),
+])
+
+
+def _to_int(value):
+    try:
+        return int(str(value).replace(',', '') or 0)
+    except ValueError:
+        return 0
+
+
+def _to_price(value):
+    try:
+        return int(round(float(str(value).replace(',', '') or 0) * PRICE_SCALE))
+    except ValueError:
+        return 0
+
+
+def parse_acceptance_time(hhmmss, now=None):
+    """호가 접수시간(HHMMSS, KST) → epoch ms (값이 없으면 현재 시각)"""
+    now = now or datetime.datetime.now(KST)
+    try:
+        t = datetime.datetime.strptime(str(hhmmss).zfill(6), '%H%M%S').time()
+        stamp = datetime.datetime.combine(now.date(), t, tzinfo=KST)
+    except ValueError:
+        stamp = now
+    return int(stamp.timestamp() * 1000)
+
+
+def build_orderbook_record(output2, ts=None):
+    """KIS 호가 응답(output2) → 구조화 배열 레코드 1건"""
+    record = np.zeros(1, dtype=ORDERBOOK_DTYPE)[0]
+    record["ts"] = ts if ts is not None else parse_acceptance_time(output2.get('aspr_acpt_hour'))
+
+    for i in range(LEVELS):
+        level = i + 1
+        record["ask_price"][i] = _to_price(output2.get(f'futs_askp{level}'))
+        record["bid_price"][i] = _to_price(output2.get(f'futs_bidp{level}'))
+        record["ask_qty"][i] = _to_int(output2.get(f'askp_rsqn{level}'))
+        record["bid_qty"][i] = _to_int(output2.get(f'bidp_rsqn{level}'))
+        record["ask_count"][i] = _to_int(output2.get(f'askp_csnu{level}'))
+        record["bid_count"][i] = _to_int(output2.get(f'bidp_csnu{level}'))
+
+    record["total_ask_qty"] = _to_int(output2.get('total_askp_rsqn'))
+    record["total_bid_qty"] = _to_int(output2.get('total_bidp_rsqn'))
+    return record
+
+
+class OrderbookRing:
+    """종목별 고정 크기 링버퍼 - 미기록 구간을 청크 파일로 내보냄"""
+
+    def __init__(self, symbol, capacity=ORDERBOOK_RING_CAPACITY):
+        self.symbol = symbol
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=ORDERBOOK_DTYPE)
+        self.written = 0   # 누적 기록 건수 (다음 기록 위치 = written % capacity)
+        self.flushed = 0   # 디스크에 기록된 누적 건수
+        self.lock = threading.Lock()
+
+    def append(self, record):
+        """레코드 추가 - 직전과 같은 접수시간/호가면 건너뜀. 추가 여부 반환"""
+        with self.lock:
+            if self.written:
+                last = self.buffer[(self.written - 1) % self.capacity]
+                if last.tobytes() == record.tobytes():
+                    return False
+
+            self.buffer[self.written % self.capacity] = record
+            self.written += 1
+
+            # 플러시 실패로 밀린 구간이 링 크기를 넘으면 오래된 것부터 버림
+            if self.written - self.flushed > self.capacity:
+                self.flushed = self.written - self.capacity
+            return True
+
+    def _slice(self, start, stop):
+        idx = np.arange(start, stop) % self.capacity
+        return self.buffer[idx]
+
+    def recent(self, n=None):
+        """최근 n건 (메모리 보관분 한도)"""
+        with self.lock:
+            available = min(self.written, self.capacity)
+            n = available if n is None else min(n, available)
+            return self._slice(self.written - n, self.written)
+
+    def pending(self):
+        """아직 디스크에 기록되지 않은 구간"""
+        with self.lock:
+            return self._slice(self.flushed, self.written)
+
+    def pending_count(self):
+        with self.lock:
+            return self.written - self.flushed
+
+    def flush(self, data_dir=ORDERBOOK_DATA_DIR):
+        """미기록 구간을 일자별 청크 파일(.npy)로 기록 - 기록 건수 반환"""
+        with self.lock:
+            start, stop = self.flushed, self.written
+            rows = self._slice(start, stop)
+
+        if not len(rows):
+            return 0
+
+        # 일자(KST) 경계별로 나눠 기록
+        days = (rows["ts"] + 9 * 3600 * 1000) // 86400000
+        for day in np.unique(days):
+            chunk = rows[days == day]
+            day_str = datetime.datetime.fromtimestamp(int(chunk["ts"][0]) / 1000, KST).strftime('%Y%m%d')
+            day_dir = os.path.join(data_dir, self.symbol, day_str)
+            os.makedirs(day_dir, exist_ok=True)
+            np.save(os.path.join(day_dir, f"{int(chunk['ts'][0])}_{start}.npy"), chunk)
+
+        with self.lock:
+            self.flushed = max(self.flushed, stop)
+        return len(rows)
+
+
+_rings = {}
+_rings_lock = threading.Lock()
+
+
+def get_ring(symbol):
+    """종목별 링버퍼 (없으면 생성)"""
+    with _rings_lock:
+        ring = _rings.get(symbol)
+        if ring is None:
+            ring = _rings[symbol] = OrderbookRing(symbol)
+        return ring
+
+
+def record_orderbook_snapshot(symbol, output2):
+    """호가 응답 캡처 - 청크 크기만큼 쌓이면 디스크로 기록. 저장된 레코드 반환(중복이면 None)"""
+    try:
+        record = build_orderbook_record(output2)
+        ring = get_ring(symbol)
+
+        if not ring.append(record):
+            return None
+
+        if ring.pending_count() >= ORDERBOOK_CHUNK_SIZE:
+            ring.flush()
+        return record
+
+    except Exception as e:
+        log.warning("호가 스냅샷 저장 오류: %s", e)
+        return None
+
+
+def flush_orderbook_store():
+    """모든 종목의 미기록 스냅샷을 디스크로 기록"""
+    with _rings_lock:
+        rings = list(_rings.values())
+
+    total = 0
+    for ring in rings:
+        try:
+            total += ring.flush()
+        except Exception as e:
+            log.warning("호가 스냅샷 기록 오류 (%s): %s", ring.symbol, e, extra={"symbol": ring.symbol})
+    return total
+
+
+def _load_chunks(symbol, start_ms, end_ms, data_dir=ORDERBOOK_DATA_DIR):
+    """기간에 해당하는 일자 디렉터리의 청크만 메모리맵으로 읽어 시간 범위 필터링"""
+    symbol_dir = os.path.join(data_dir, symbol)
+    if not os.path.isdir(symbol_dir):
+        return []
+
+    start_day = datetime.datetime.fromtimestamp(start_ms / 1000, KST).strftime('%Y%m%d')
+    end_day = datetime.datetime.fromtimestamp(end_ms / 1000, KST).strftime('%Y%m%d')
+
+    parts = []
+    for day_str in sorted(os.listdir(symbol_dir)):
+        if not start_day <= day_str <= end_day:
+            continue
+        day_dir = os.path.join(symbol_dir, day_str)
+        for name in sorted(os.listdir(day_dir)):
+            chunk = np.load(os.path.join(day_dir, name), mmap_mode='r')
+            ts = chunk["ts"]
+            if not len(ts) or ts.max() < start_ms or ts.min() > end_ms:
+                continue
+            parts.append(np.array(chunk[(ts >= start_ms) & (ts <= end_ms)]))
+    return parts
+
+
+def query_orderbook(symbol, start_ms, end_ms):
+    """시간 범위 호가 스냅샷 조회 (디스크 청크 + 메모리 미기록분)"""
+    parts = _load_chunks(symbol, start_ms, end_ms)
+
+    with _rings_lock:
+        ring = _rings.get(symbol)
+    if ring is not None:
+        pending = ring.pending()
+        parts.append(pending[(pending["ts"] >= start_ms) & (pending["ts"] <= end_ms)])
+
+    if not parts:
+        return np.zeros(0, dtype=ORDERBOOK_DTYPE)
+
+    rows = np.concatenate(parts)
+    return rows[np.argsort(rows["ts"], kind='stable')]
+
+
+def orderbook_rows_to_dicts(rows):
+    """구조화 배열 → JSON 응답용 dict 목록"""
+    return [
+        {
+            "timestamp": datetime.datetime.fromtimestamp(int(row["ts"]) / 1000, KST).isoformat(),
+            "ask_prices": (row["ask_price"] / PRICE_SCALE).tolist(),
+            "bid_prices": (row["bid_price"] / PRICE_SCALE).tolist(),
+            "ask_quantities": row["ask_qty"].tolist(),
+            "bid_quantities": row["bid_qty"].tolist(),
+            "ask_counts": row["ask_count"].tolist(),
+            "bid_counts": row["bid_count"].tolist(),
+            "total_ask_quantity": int(row["total_ask_qty"]),
+            "total_bid_quantity": int(row["total_bid_qty"])
+        }
+        for row in rows
+    ]
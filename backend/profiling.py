@@ -0,0 +1,199 @@
+"""
+운영 중 프로파일링 - 작업 프로세스를 재시작하지 않고 CPU 샘플링과 메모리 할당 추적
+
+CPU: 정해진 시간 동안 모든 스레드(백그라운드 작업/스트림 포함)의 스택을 주기적으로 수집해
+     collapsed stack 형식으로 반환 (flamegraph.pl, speedscope 에 그대로 입력 가능)
+메모리: tracemalloc 스냅샷을 보관해 두 시점 사이 할당 증가분을 위치별로 비교
+"""
+
+import os
+import sys
+import time
+import datetime
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+
+from config import PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL_MS, TRACEMALLOC_FRAMES, TRACEMALLOC_MAX_SNAPSHOTS
+
+_profile_lock = threading.Lock()
+
+# 대기 중인 스레드의 최상단 함수 - idle 제외 시 이 함수에서 멈춘 샘플은 버림 (C 함수 대기는 호출자 기준이라 완전하지 않음)
+_IDLE_FUNCTIONS = {"wait", "_wait_for_tstate_lock", "_worker", "select", "poll", "accept", "readinto", "recv_into", "_recv", "serve_forever"}
+
+
+def _frame_label(code, labels):
+    label = labels.get(code)
+    if label is None:
+        label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+    return label
+
+
+def sample_stacks(seconds, interval_ms=PROFILE_SAMPLE_INTERVAL_MS, include_idle=False):
+    """모든 스레드의 스택을 seconds 동안 수집 - (collapsed stack → 샘플 수, 요약) 반환
+
+    한 번에 하나만 실행 (동시 요청은 RuntimeError)
+    """
+    seconds = min(max(float(seconds), 0.1), PROFILE_MAX_SECONDS)
+    interval = max(float(interval_ms), 1) / 1000
+
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("이미 프로파일링이 진행 중입니다")
+
+    try:
+        me = threading.get_ident()
+        labels = {}
+        stacks = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not include_idle and frame.f_code.co_name in _IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code, labels))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}").replace(";", ":").replace(" ", "_"))
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        elapsed = time.perf_counter() - started
+    finally:
+        _profile_lock.release()
+
+    return stacks, {
+        "seconds": round(elapsed, 3),
+        "interval_ms": interval * 1000,
+        "samples": samples,
+        "stacks": len(stacks),
+        "include_idle": include_idle
+    }
+
+
+def render_collapsed(stacks):
+    """collapsed stack 텍스트 - '스레드;바깥 함수;...;안쪽 함수 샘플수' 한 줄씩"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def summarize_stacks(stacks, limit=30):
+    """함수별 self(최상단) / total(스택에 포함) 샘플 수 상위 목록"""
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+    return {
+        "self": [{"function": name, "samples": count} for name, count in self_counts.most_common(limit)],
+        "total": [{"function": name, "samples": count} for name, count in total_counts.most_common(limit)]
+    }
+
+
+# ---- 메모리 (tracemalloc) ----
+
+_snapshots = OrderedDict()      # 스냅샷 ID → (생성 시각, 스냅샷)
+_snapshot_ids = iter(range(1, sys.maxsize))
+_snapshot_lock = threading.Lock()
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def memory_status():
+    current, peak = tracemalloc.get_traced_memory()
+    with _snapshot_lock:
+        snapshots = [{"id": snapshot_id, "taken_at": taken_at} for snapshot_id, (taken_at, _) in _snapshots.items()]
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "snapshots": snapshots
+    }
+
+
+def start_memory_tracing(frames=TRACEMALLOC_FRAMES):
+    """할당 추적 시작 - 이후 할당부터 기록되며 추적 중에는 메모리/CPU 부담이 늘어남"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, int(frames)))
+    return memory_status()
+
+
+def stop_memory_tracing():
+    """할당 추적 중지 및 보관한 스냅샷 삭제"""
+    with _snapshot_lock:
+        _snapshots.clear()
+    tracemalloc.stop()
+    return memory_status()
+
+
+def _format_stats(stats, limit):
+    result = []
+    for stat in stats[:limit]:
+        entry = {
+            "size_bytes": stat.size,
+            "count": stat.count,
+            "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+        }
+        if hasattr(stat, "size_diff"):
+            entry.update({"size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff})
+        result.append(entry)
+    return result
+
+
+def take_memory_snapshot(group_by="lineno", limit=30):
+    """현재 할당 스냅샷 저장 후 상위 할당 위치 반환 (group_by: lineno|filename|traceback)"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("메모리 추적이 시작되지 않았습니다")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    with _snapshot_lock:
+        snapshot_id = next(_snapshot_ids)
+        _snapshots[snapshot_id] = (datetime.datetime.now(datetime.timezone.utc).isoformat(), snapshot)
+        while len(_snapshots) > TRACEMALLOC_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+
+    stats = snapshot.statistics(group_by)
+    return {
+        "id": snapshot_id,
+        "total_bytes": sum(stat.size for stat in stats),
+        "top": _format_stats(stats, limit)
+    }
+
+
+def diff_memory_snapshots(base_id, target_id=None, group_by="lineno", limit=30):
+    """두 스냅샷 사이 할당 증가분 (target_id 생략 시 지금 새 스냅샷을 찍어 비교)"""
+    with _snapshot_lock:
+        base = _snapshots.get(base_id)
+        target = _snapshots.get(target_id) if target_id is not None else None
+    if base is None:
+        raise KeyError(f"스냅샷 {base_id} 이(가) 없습니다")
+    if target_id is not None and target is None:
+        raise KeyError(f"스냅샷 {target_id} 이(가) 없습니다")
+
+    if target is None:
+        target_id = take_memory_snapshot(group_by, 0)["id"]
+        with _snapshot_lock:
+            target = _snapshots[target_id]
+
+    stats = target[1].compare_to(base[1], group_by)
+    return {
+        "base": base_id,
+        "target": target_id,
+        "size_diff_bytes": sum(stat.size_diff for stat in stats),
+        "top": _format_stats(stats, limit)
+    }
@@ -0,0 +1,239 @@
+"""
+단계별 보존 정책 - 원본 스냅샷을 1분/1시간/1일 집계로 롤업한 뒤 원본을 배치 삭제
+"""
+
+import datetime
+import threading
+import pandas as pd
+
+from structured_log import get_logger
+from config import (
+    GOLD_DATA_TABLE,
+    RAW_RETENTION_DAYS,
+    ROLLUP_TIERS,
+    ROLLUP_METRICS,
+    RETENTION_PAGE_SIZE,
+    RETENTION_DELETE_BATCH,
+    RETENTION_MAX_BATCHES
+)
+
+log = get_logger("retention")
+
+UTC = datetime.timezone.utc
+
+_state = {"last_run_date": None, "last_result": None}
+_run_lock = threading.Lock()
+
+
+def rollup_rows(rows, seconds, time_column="created_at"):
+    """원본 행 → 주기별 집계 행 (지표별 평균/최소/최대/종가 + 표본 수)"""
+    if not rows:
+        return []
+
+    frame = pd.DataFrame(rows)
+    frame[time_column] = pd.to_datetime(frame[time_column], utc=True, format='ISO8601')
+    frame = frame.set_index(time_column).sort_index()
+
+    metrics = [m for m in ROLLUP_METRICS if m in frame.columns]
+    values = frame[metrics].apply(pd.to_numeric, errors='coerce')
+    resampled = values.resample(f"{seconds}s")
+
+    stats = resampled.agg(['mean', 'min', 'max', 'last'])
+    stats.columns = [m if stat == 'mean' else f"{m}_{'close' if stat == 'last' else stat}" for m, stat in stats.columns]
+    stats["sample_count"] = frame.resample(f"{seconds}s").size()
+    stats = stats[stats["sample_count"] > 0]
+
+    stats = stats.astype(object).where(stats.notna(), None)
+    result = []
+    for bucket, row in stats.iterrows():
+        values = {key: value.item() if hasattr(value, 'item') else value for key, value in row.items()}
+        result.append({"bucket_start": bucket.isoformat(), **values, "sample_count": int(row["sample_count"])})
+    return result
+
+
+def _parse_time(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _rolled_until():
+    """일 집계가 끝난 시점 (다음 집계 시작일) - 집계/원본이 모두 없으면 None"""
+    from database import fetch_edge_row
+
+    latest = fetch_edge_row(ROLLUP_TIERS["1d"][0], "bucket_start", latest=True, columns="bucket_start")
+    if latest:
+        return _parse_time(latest["bucket_start"]) + datetime.timedelta(days=1)
+
+    # 집계가 없으면 원본의 가장 오래된 날짜부터
+    oldest = fetch_edge_row(GOLD_DATA_TABLE, "created_at", latest=False, columns="created_at")
+    if oldest:
+        return datetime.datetime.combine(_parse_time(oldest["created_at"]).date(), datetime.time(), tzinfo=UTC)
+    return None
+
+
+def rollup_day(day_start):
+    """하루치 원본을 한 번만 읽어 모든 단계 집계를 upsert - 원본 조회/저장이 하나라도 실패하면 False"""
+    from database import iter_rows, upsert_rows
+
+    day_end = day_start + datetime.timedelta(days=1)
+    rows = []
+    try:
+        for page in iter_rows(GOLD_DATA_TABLE, "created_at", day_start.isoformat(), day_end.isoformat(), RETENTION_PAGE_SIZE):
+            rows.extend(page)
+    except RuntimeError:
+        return False
+
+    if not rows:
+        return True
+
+    for table, seconds, _ in ROLLUP_TIERS.values():
+        if not upsert_rows(table, rollup_rows(rows, seconds), on_conflict="bucket_start"):
+            return False
+    return True
+
+
+def rollup_backfilled_days(days):
+    """백필로 원본이 추가된 날짜 중 일 집계 워터마크 이전 날짜를 다시 집계 - 건수 반환
+
+    워터마크 이후 날짜는 다음 보존 정책 실행에서 순서대로 집계되므로 건드리지 않음 (먼저 집계하면 워터마크가 건너뜀)
+    """
+    from database import fetch_edge_row
+
+    latest = fetch_edge_row(ROLLUP_TIERS["1d"][0], "bucket_start", latest=True, columns="bucket_start")
+    if not latest:
+        return 0   # 집계가 아직 없으면 보존 정책이 가장 오래된 원본부터 집계
+
+    rolled_until = _parse_time(latest["bucket_start"]) + datetime.timedelta(days=1)
+    rolled = 0
+    for day in sorted(days):
+        day_start = datetime.datetime.combine(day, datetime.time(), tzinfo=UTC)
+        if day_start >= rolled_until:
+            continue
+        if not rollup_day(day_start):
+            raise RuntimeError(f"{day} 집계 실패")
+        rolled += 1
+    return rolled
+
+
+def expire_rows(table, time_column, cutoff, key_column):
+    """cutoff 이전 행 배치 삭제 (실행당 최대 RETENTION_MAX_BATCHES회)"""
+    from database import delete_rows_before
+
+    deleted = 0
+    for _ in range(RETENTION_MAX_BATCHES):
+        count = delete_rows_before(table, time_column, cutoff.isoformat(), RETENTION_DELETE_BATCH, key_column)
+        if count <= 0:
+            break
+        deleted += count
+        if count < RETENTION_DELETE_BATCH:
+            break
+    return deleted
+
+
+def run_retention(now=None):
+    """집계 롤업 → 원본/세부 집계 만료 (집계되지 않은 원본은 삭제하지 않음)"""
+    from database import cleanup_old_data
+
+    now = now or datetime.datetime.now(UTC)
+    today = datetime.datetime.combine(now.date(), datetime.time(), tzinfo=UTC)
+    result = {"rolled_days": 0, "deleted": {}}
+
+    # 1. 마감된 날짜(어제까지) 집계
+    day = _rolled_until()
+    while day is not None and day < today:
+        if not rollup_day(day):
+            log.warning("%s 집계 실패 - 원본 삭제 보류", day.date())
+            break
+        result["rolled_days"] += 1
+        day += datetime.timedelta(days=1)
+
+    # 집계 시작점을 알 수 없으면(조회 실패 포함) 집계가 확인된 구간이 없으므로 원본은 삭제하지 않음
+    rolled_until = day
+
+    # 2. 원본 만료 - 보존 기간이 지났고 집계가 끝난 구간만 (실패한 날짜부터는 보존)
+    if rolled_until is not None:
+        raw_cutoff = min(now - datetime.timedelta(days=RAW_RETENTION_DAYS), rolled_until)
+        result["deleted"][GOLD_DATA_TABLE] = expire_rows(GOLD_DATA_TABLE, "created_at", raw_cutoff, "id")
+
+    # 3. 세부 집계 만료
+    for table, _, keep_days in ROLLUP_TIERS.values():
+        if keep_days is not None:
+            cutoff = now - datetime.timedelta(days=keep_days)
+            result["deleted"][table] = expire_rows(table, "bucket_start", cutoff, "bucket_start")
+
+    cleanup_old_data()
+    result["rolled_until"] = rolled_until.isoformat() if rolled_until else None
+    return result
+
+
+def run_daily_retention():
+    """하루 한 번만 보존 정책 실행 (백그라운드 작업에서 매 주기 호출)"""
+    today = datetime.date.today()
+    if _state["last_run_date"] == today or not _run_lock.acquire(blocking=False):
+        return None
+
+    try:
+        if _state["last_run_date"] == today:
+            return None
+        result = run_retention()
+        _state["last_run_date"] = today
+        _state["last_result"] = result
+        log.info("보존 정책 실행 완료: 집계 %d일, 삭제 %s", result['rolled_days'], result['deleted'],
+                 extra={"rolled_days": result['rolled_days'], "deleted": result['deleted']})
+        return result
+    except Exception as e:
+        log.error("보존 정책 실행 오류: %s", e)
+        return None
+    finally:
+        _run_lock.release()
+
+
+def choose_tier(start, resolution_seconds, now=None):
+    """요청 해상도를 만족하는 가장 거친 단계 - (주기명, 테이블, 주기 초), 원본이면 주기명 'raw'"""
+    now = now or datetime.datetime.now(UTC)
+
+    def covers(keep_days):
+        return keep_days is None or start >= now - datetime.timedelta(days=keep_days)
+
+    tiers = sorted(ROLLUP_TIERS.items(), key=lambda item: item[1][1], reverse=True)  # 거친 순
+
+    for name, (table, seconds, keep_days) in tiers:
+        if seconds <= resolution_seconds and covers(keep_days):
+            return name, table, seconds
+
+    if covers(RAW_RETENTION_DAYS):
+        return "raw", GOLD_DATA_TABLE, 0
+
+    # 원본/세부 집계가 이미 만료된 구간: 보존 중인 가장 세밀한 집계
+    for name, (table, seconds, keep_days) in reversed(tiers):
+        if covers(keep_days):
+            return name, table, seconds
+
+    name, (table, seconds, _) = tiers[0]
+    return name, table, seconds
+
+
+def query_gold_history(start, end, resolution_seconds=0):
+    """기간 이력 조회 - 집계 단계 자동 선택, 아직 집계되지 않은 최근 구간은 원본을 즉석 집계"""
+    from database import iter_rows
+
+    tier, table, seconds = choose_tier(start, resolution_seconds)
+    points = []
+
+    if tier == "raw":
+        rows = [row for page in iter_rows(GOLD_DATA_TABLE, "created_at", start.isoformat(), end.isoformat(), RETENTION_PAGE_SIZE) for row in page]
+        points = rollup_rows(rows, resolution_seconds) if resolution_seconds >= 1 else rows
+        return {"tier": tier, "resolution_seconds": resolution_seconds, "points": points}
+
+    rolled_until = _rolled_until() or start
+    tier_end = min(end, rolled_until)
+    if start < tier_end:
+        for page in iter_rows(table, "bucket_start", start.isoformat(), tier_end.isoformat(), RETENTION_PAGE_SIZE, key_column="bucket_start"):
+            points.extend(page)
+
+    # 집계 이후 구간은 원본에서 같은 주기로 즉석 집계
+    tail_start = max(start, rolled_until)
+    if tail_start < end:
+        tail = [row for page in iter_rows(GOLD_DATA_TABLE, "created_at", tail_start.isoformat(), end.isoformat(), RETENTION_PAGE_SIZE) for row in page]
+        points.extend(rollup_rows(tail, seconds))
+
+    return {"tier": tier, "resolution_seconds": seconds, "points": points}
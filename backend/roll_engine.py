@@ -0,0 +1,236 @@
+"""
+월물 롤오버 엔진 - 거래량/미결제약정 추적 기반 주계약 전환
+"""
+
+import datetime
+import threading
+from collections import deque
+
+from structured_log import get_logger
+from config import (
+    ROLL_WINDOW_DAYS,
+    ROLL_CONFIRM_OBSERVATIONS,
+    ROLL_HISTORY_LENGTH,
+    ROLL_POLL_MINUTES,
+    ROLL_WINDOW_POLL_MINUTES
+)
+
+log = get_logger("roll_engine")
+
+_lock = threading.Lock()
+
+# 만기 캘린더 (하루 한 번 계산)
+_calendar = {"date": None, "contracts": []}
+
+# 월물별 관측 이력: symbol -> deque[(시각, 거래량, 미결제약정)]
+_history = {}
+
+# 엔진 상태
+_state = {
+    "active": None,          # 현재 주계약 종목코드
+    "crossover_count": 0,    # 차월 거래량 역전 연속 관측 횟수
+    "last_poll": None,
+    "last_roll": None
+}
+
+
+def get_expiry_calendar(today=None):
+    """만기 캘린더 조회 - 후보 월물별 만기일과 롤 구간 시작일"""
+    from futures_api import generate_gold_futures_candidates
+
+    today = today or datetime.date.today()
+
+    with _lock:
+        if _calendar["date"] == today:
+            return list(_calendar["contracts"])
+
+    contracts = []
+    for candidate in generate_gold_futures_candidates():
+        contracts.append({
+            **candidate,
+            "roll_start": candidate['expiry_date'] - datetime.timedelta(days=ROLL_WINDOW_DAYS)
+        })
+
+    with _lock:
+        _calendar["date"] = today
+        _calendar["contracts"] = contracts
+
+    return list(contracts)
+
+
+def record_observation(symbol, volume, open_interest, observed_at=None):
+    """월물 거래량/미결제약정 관측값 기록"""
+    observed_at = observed_at or datetime.datetime.now()
+
+    with _lock:
+        series = _history.setdefault(symbol, deque(maxlen=ROLL_HISTORY_LENGTH))
+        series.append((observed_at, volume, open_interest))
+
+
+def get_contract_history(symbol):
+    """월물 관측 이력 조회"""
+    with _lock:
+        return list(_history.get(symbol, []))
+
+
+def _latest(symbol):
+    series = _history.get(symbol)
+    return series[-1] if series else None
+
+
+def get_front_and_next(calendar, active_symbol):
+    """주계약(근월)과 다음 월물 - 주계약이 캘린더에 없으면 가장 가까운 월물 기준"""
+    symbols = [c['symbol'] for c in calendar]
+
+    if active_symbol in symbols:
+        front_idx = symbols.index(active_symbol)
+    else:
+        front_idx = 0
+
+    front = calendar[front_idx] if calendar else None
+    next_ = calendar[front_idx + 1] if front_idx + 1 < len(calendar) else None
+    return front, next_
+
+
+def in_roll_window(contract, today=None):
+    """롤 구간(만기 ROLL_WINDOW_DAYS일 전 ~ 만기) 여부"""
+    today = today or datetime.date.today()
+    return contract is not None and today >= contract['roll_start']
+
+
+def detect_roll(front_symbol, next_symbol):
+    """근월/차월 교차 판정 - 차월 거래량 역전이 연속 확인되거나 미결제약정까지 역전되면 롤"""
+    with _lock:
+        front_obs = _latest(front_symbol)
+        next_obs = _latest(next_symbol)
+
+        if not front_obs or not next_obs:
+            return False
+
+        _, front_volume, front_oi = front_obs
+        _, next_volume, next_oi = next_obs
+
+        if next_volume > front_volume:
+            _state["crossover_count"] += 1
+        else:
+            _state["crossover_count"] = 0
+
+        oi_crossed = next_oi > front_oi
+        return _state["crossover_count"] >= ROLL_CONFIRM_OBSERVATIONS or (oi_crossed and _state["crossover_count"] > 0)
+
+
+def update_active_contract(force=False):
+    """주계약 갱신 - 평시 근월/차월 2개만, 롤 구간/초기화 시 전체 후보 조회
+
+    조회 주기가 아직 안 됐으면 None, 조회했으면 주계약 데이터(dict)를 반환
+    """
+    from futures_api import get_domestic_futures_data, record_contract_scan
+
+    now = datetime.datetime.now()
+    today = now.date()
+    calendar = get_expiry_calendar(today)
+
+    with _lock:
+        active = _state["active"]
+        last_poll = _state["last_poll"]
+
+    front, next_ = get_front_and_next(calendar, active)
+    full_scan = active is None or in_roll_window(front, today)
+    interval = ROLL_WINDOW_POLL_MINUTES if full_scan else ROLL_POLL_MINUTES
+
+    if not force and last_poll and now - last_poll < datetime.timedelta(minutes=interval):
+        return None
+
+    targets = calendar if full_scan else [c for c in (front, next_) if c]
+
+    polled = {}
+    for contract in targets:
+        price_data = get_domestic_futures_data(contract['symbol'])
+        if price_data:
+            record_observation(contract['symbol'], price_data['volume'], price_data['open_interest'], now)
+            polled[contract['symbol']] = {**contract, **price_data}
+
+    with _lock:
+        _state["last_poll"] = now
+
+    if not polled:
+        return None
+
+    # 평시에는 근월/차월만 조회하므로 기간구조용 전체 스캔을 덮어쓰지 않고 해당 월물만 갱신
+    record_contract_scan(list(polled.values()), merge=not full_scan)
+
+    if active is None or active not in {c['symbol'] for c in calendar}:
+        # 초기 선택 (또는 기존 주계약이 만기로 캘린더에서 빠짐): 기존 방식대로 거래량 최대 월물
+        new_active = max(polled.values(), key=lambda x: x['volume'])['symbol']
+    elif front['symbol'] not in polled:
+        # 근월 조회 실패 - 한 번의 실패로 조기 롤하지 않도록 현재 주계약 유지, 판단 보류
+        return None
+    elif next_ and detect_roll(front['symbol'], next_['symbol']):
+        new_active = next_['symbol']
+    else:
+        new_active = front['symbol']
+
+    with _lock:
+        if new_active != _state["active"]:
+            if _state["active"] is not None:
+                log.info("주계약 롤오버: %s → %s", _state["active"], new_active,
+                         extra={"from_symbol": _state["active"], "to_symbol": new_active})
+                _state["last_roll"] = now
+            _state["active"] = new_active
+            _state["crossover_count"] = 0
+
+    return polled.get(new_active)
+
+
+def set_active_symbol(symbol):
+    """주계약 수동 지정 (수동 업데이트 엔드포인트 등)"""
+    with _lock:
+        _state["active"] = symbol
+        _state["crossover_count"] = 0
+
+
+def get_active_symbol():
+    """현재 주계약 종목코드 - 엔진 상태 → DB 저장값 순으로 조회, 없으면 None"""
+    with _lock:
+        if _state["active"]:
+            return _state["active"]
+
+    from database import get_active_contract
+    stored = get_active_contract()
+    if stored and stored.get('symbol'):
+        set_active_symbol(stored['symbol'])
+        return stored['symbol']
+
+    return None
+
+
+def get_roll_status():
+    """롤오버 엔진 상태 요약"""
+    today = datetime.date.today()
+    calendar = get_expiry_calendar(today)
+
+    with _lock:
+        state = dict(_state)
+        latest = {symbol: _latest(symbol) for symbol in _history}
+
+    front, next_ = get_front_and_next(calendar, state["active"])
+
+    return {
+        "active_symbol": state["active"],
+        "front": front['symbol'] if front else None,
+        "next": next_['symbol'] if next_ else None,
+        "in_roll_window": in_roll_window(front, today),
+        "crossover_count": state["crossover_count"],
+        "last_poll": state["last_poll"].isoformat() if state["last_poll"] else None,
+        "last_roll": state["last_roll"].isoformat() if state["last_roll"] else None,
+        "calendar": [
+            {
+                "symbol": c['symbol'],
+                "expiry_date": c['expiry_date'].isoformat(),
+                "roll_start": c['roll_start'].isoformat(),
+                "volume": latest[c['symbol']][1] if latest.get(c['symbol']) else None,
+                "open_interest": latest[c['symbol']][2] if latest.get(c['symbol']) else None
+            }
+            for c in calendar
+        ]
+    }
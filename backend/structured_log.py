@@ -0,0 +1,176 @@
+"""
+구조화 로그 - 호출 스레드는 대기열에 넣기만 하고 출력은 별도 스레드가 담당 (로그 I/O가 요청 지연에 더해지지 않음)
+
+    LOG_LEVEL=INFO LOG_LEVELS="futures_api=DEBUG,database=WARNING" LOG_FORMAT=json
+
+JSON 한 줄에 시각/레벨/모듈/메시지/요청 ID와 extra 필드를 담음. 대기열이 가득 차면 기다리지 않고 버린 뒤 /metrics 에 집계
+"""
+
+import os
+import sys
+import copy
+import json
+import uuid
+import queue
+import atexit
+import logging
+import datetime
+import itertools
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+import metrics
+from config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_DEBUG_SAMPLE_EVERY
+
+LOGGER_NAMESPACE = "goldapp"
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "taskName"}
+
+LOG_DROPPED = metrics.Counter("log_records_dropped_total", "로그 대기열이 가득 차 버린 레코드 수", ("level",))
+
+
+class JsonFormatter(logging.Formatter):
+    """레코드 → JSON 한 줄 (extra로 넘긴 필드 포함)"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name[len(LOGGER_NAMESPACE) + 1:] if record.name.startswith(LOGGER_NAMESPACE + ".") else record.name,
+            "msg": record.getMessage(),
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        return text.replace(f" {LOGGER_NAMESPACE}.", " ", 1)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """대기열에 넣기만 하는 핸들러 - 메시지 병합과 요청 ID만 호출 스레드에서 처리"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = _request_id.get() or "-"
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc(record.levelname)
+
+
+_handler = None
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def _output_handler():
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    return handler
+
+
+def _start_listener():
+    """출력 스레드 시작 - 포크된 작업 프로세스에서는 대기열/스레드를 새로 만듦"""
+    global _listener
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, _output_handler(), respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()   # 남은 레코드를 모두 출력한 뒤 종료
+
+
+def configure_logging():
+    """앱 로거(goldapp.*) 설정 - 여러 번 호출해도 한 번만 적용"""
+    global _handler
+    if _handler is not None:
+        return
+
+    with _configure_lock:
+        if _handler is not None:
+            return
+
+        root = logging.getLogger(LOGGER_NAMESPACE)
+        root.setLevel(LOG_LEVEL.upper())
+        root.propagate = False
+
+        # 모듈별 레벨 - "futures_api=DEBUG,database=WARNING"
+        for item in LOG_LEVELS.split(","):
+            if "=" in item:
+                name, level = item.split("=", 1)
+                logging.getLogger(f"{LOGGER_NAMESPACE}.{name.strip()}").setLevel(level.strip().upper())
+
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        root.addHandler(handler)
+        _handler = handler
+        _start_listener()
+
+        atexit.register(_stop_listener)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_start_listener)
+
+
+def get_logger(name):
+    """모듈 로거 (goldapp.<name>)"""
+    configure_logging()
+    return logging.getLogger(f"{LOGGER_NAMESPACE}.{name}")
+
+
+# ---- 요청 ID ----
+
+def new_request_id(prefix=""):
+    return f"{prefix}{uuid.uuid4().hex[:16]}"
+
+
+def set_request_id(request_id):
+    """현재 컨텍스트(요청/작업)의 요청 ID 지정 - 이후 로그에 자동 포함"""
+    _request_id.set(request_id)
+    return request_id
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+# ---- 샘플링 ----
+
+_sample_counters = {}
+
+
+def sampled(key, every=LOG_DEBUG_SAMPLE_EVERY):
+    """key별 every번에 한 번 True (첫 호출 포함)"""
+    counter = _sample_counters.get(key)
+    if counter is None:
+        counter = _sample_counters.setdefault(key, itertools.count())
+    return every <= 1 or next(counter) % every == 0
+
+
+def debug_sampled(logger, key, msg, *args, every=LOG_DEBUG_SAMPLE_EVERY, **kwargs):
+    """핫루프용 debug 로그 - debug가 꺼져 있으면 인자 포맷 없이 바로 반환"""
+    if logger.isEnabledFor(logging.DEBUG) and sampled(key, every):
+        logger.debug(msg, *args, **kwargs)
@@ -0,0 +1,3 @@
+"""
+로컬 대역(stub) 서버 모음 - 외부 API 없이 테스트/부하 측정용
+"""
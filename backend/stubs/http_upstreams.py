@@ -0,0 +1,377 @@
+"""
+외부 REST API 로컬 대역 서버 (네이버/KIS/수출입은행/Supabase) - 부하 테스트/개발용
+
+    python -m stubs.http_upstreams --port 18080 --latency-ms 30 --error-rate 0.01
+
+아래 환경 변수로 앱을 실행하면 실제 외부 API 대신 대역 서버를 호출합니다.
+
+    KIS_API_BASE=http://127.0.0.1:18080 NAVER_API_BASE=http://127.0.0.1:18080
+    EXIM_API_BASE=http://127.0.0.1:18080 SUPABASE_URL=http://127.0.0.1:18080
+"""
+
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# 로이터 코드별 기준 가격 (없는 코드는 ETF 등으로 보고 10,000원)
+BASE_PRICES = {
+    "GCcv1": 2350.0,
+    "SIcv1": 29.5,
+    "PLcv1": 980.0,
+    "PAcv1": 1010.0,
+    "M04020000": 105000.0,
+}
+STUB_TOKEN = "stub-access-token"
+STUB_JWT = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.c3R1Yg"  # Supabase 키 형식 검사 통과용
+
+
+def upstream_of(path):
+    """요청 경로 → 집계용 외부 API 이름"""
+    if path.startswith("/front-api/chart"):
+        return "naver_chart"
+    if path.startswith("/front-api/marketIndex"):
+        return "naver_market"
+    if path.startswith("/site/program/financial"):
+        return "exim"
+    if path.startswith("/oauth2"):
+        return "kis_oauth"
+    if path.startswith("/uapi/"):
+        return f"kis:{path.rsplit('/', 1)[-1]}"
+    if path.startswith("/rest/v1/"):
+        return f"supabase:{path[len('/rest/v1/'):].split('?')[0]}"
+    return "unknown"
+
+
+class StubMarketData:
+    """결정적 가상 시세 - 같은 seed면 같은 응답"""
+
+    def __init__(self, seed=0, history_days=250):
+        self.seed = seed
+        self.history_days = history_days
+        self._history = {}
+
+    def history(self, code):
+        if code not in self._history:
+            rng = random.Random(f"{self.seed}:{code}")
+            price = BASE_PRICES.get(code, 10000.0)
+            today = datetime.date.today()
+            points = []
+            for i in range(self.history_days, -1, -1):
+                day = today - datetime.timedelta(days=i)
+                if day.weekday() >= 5:
+                    continue
+                price *= 1 + rng.gauss(0, 0.01)
+                points.append((day.strftime("%Y%m%d"), round(price, 2)))
+            self._history[code] = points
+        return self._history[code]
+
+    def chart(self, code):
+        return {"isSuccess": True, "result": {"priceInfos": [
+            {"localDate": date, "closePrice": f"{price:,.2f}", "currentPrice": f"{price:,.2f}"}
+            for date, price in self.history(code)
+        ]}}
+
+    def market_index(self, code):
+        return {"isSuccess": True, "result": {"closePrice": f"{self.history(code)[-1][1]:,.2f}"}}
+
+    def futures_quote(self, symbol):
+        rng = random.Random(f"{self.seed}:{symbol}")
+        price = 150000 + rng.randint(-50, 50) * 10
+        return {"rt_cd": "0", "msg1": "정상처리 되었습니다.", "output1": {
+            "hts_kor_isnm": f"금 {symbol}",
+            "futs_prpr": str(price),
+            "futs_prdy_clpr": str(price - 100),
+            "futs_prdy_vrss": "100",
+            "futs_prdy_ctrt": "0.07",
+            "futs_hgpr": str(price + 300),
+            "futs_lwpr": str(price - 300),
+            "acml_vol": str(rng.randint(10, 5000)),
+            "hts_otst_stpl_qty": str(rng.randint(100, 20000)),
+        }}
+
+    def futures_orderbook(self, symbol):
+        quote = self.futures_quote(symbol)
+        price = int(quote["output1"]["futs_prpr"])
+        rng = random.Random()
+        output2 = {"aspr_acpt_hour": time.strftime("%H%M%S")}
+        for i in range(1, 6):
+            output2[f"futs_askp{i}"] = f"{price + 10 * i:.2f}"
+            output2[f"futs_bidp{i}"] = f"{price - 10 * (i - 1):.2f}"
+            output2[f"askp_rsqn{i}"] = str(rng.randint(1, 50))
+            output2[f"bidp_rsqn{i}"] = str(rng.randint(1, 50))
+            output2[f"askp_csnu{i}"] = str(rng.randint(1, 10))
+            output2[f"bidp_csnu{i}"] = str(rng.randint(1, 10))
+        output2["total_askp_rsqn"] = str(sum(int(output2[f"askp_rsqn{i}"]) for i in range(1, 6)))
+        output2["total_bidp_rsqn"] = str(sum(int(output2[f"bidp_rsqn{i}"]) for i in range(1, 6)))
+        return {"rt_cd": "0", "msg1": "정상처리 되었습니다.", "output1": quote["output1"], "output2": output2}
+
+    def futures_daily(self, symbol):
+        rows = []
+        for date, price in self.history(symbol)[-60:]:
+            rows.append({
+                "stck_bsop_date": date, "futs_prpr": f"{price:.2f}", "futs_oprc": f"{price:.2f}",
+                "futs_hgpr": f"{price * 1.005:.2f}", "futs_lwpr": f"{price * 0.995:.2f}", "acml_vol": "1000"
+            })
+        return {"rt_cd": "0", "output1": {}, "output2": list(reversed(rows))}
+
+
+class StubTables:
+    """Supabase(PostgREST) 최소 대역 - 메모리 테이블, eq/gt/gte/lt/lte/in 필터, order, limit"""
+
+    def __init__(self):
+        self.tables = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _matches(row, filters):
+        for column, (op, value) in filters.items():
+            current = row.get(column)
+            if op == "in":
+                if str(current) not in value:
+                    return False
+                continue
+            if current is None:
+                return False
+            current = str(current)
+            if op == "eq" and current != value:
+                return False
+            if op == "gt" and not current > value:
+                return False
+            if op == "gte" and not current >= value:
+                return False
+            if op == "lt" and not current < value:
+                return False
+            if op == "lte" and not current <= value:
+                return False
+        return True
+
+    @staticmethod
+    def _parse(query):
+        filters, order, limit = {}, None, None
+        for key, values in query.items():
+            value = values[-1]
+            if key == "order":
+                column, _, direction = value.partition(".")
+                order = (column, direction.startswith("desc"))
+            elif key == "limit":
+                limit = int(value)
+            elif key in ("select", "on_conflict", "columns", "offset"):
+                continue
+            else:
+                op, _, operand = value.partition(".")
+                if op == "in":
+                    operand = [v.strip('"') for v in operand.strip("()").split(",")]
+                filters[key] = (op, operand)
+        return filters, order, limit
+
+    def select(self, table, query):
+        filters, order, limit = self._parse(query)
+        with self.lock:
+            rows = [row for row in self.tables.get(table, []) if self._matches(row, filters)]
+        if order:
+            rows.sort(key=lambda row: (row.get(order[0]) is None, str(row.get(order[0]))), reverse=order[1])
+        return rows[:limit] if limit is not None else rows
+
+    def insert(self, table, payload, on_conflict=None):
+        rows = payload if isinstance(payload, list) else [payload]
+        keys = on_conflict.split(",") if on_conflict else None
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self.lock:
+            stored = self.tables.setdefault(table, [])
+            result = []
+            for row in rows:
+                row = dict(row)
+                if keys:
+                    existing = next((r for r in stored if all(r.get(k) == row.get(k) for k in keys)), None)
+                    if existing is not None:
+                        existing.update(row)
+                        result.append(existing)
+                        continue
+                row.setdefault("id", self.next_id)
+                row.setdefault("created_at", now)
+                self.next_id += 1
+                stored.append(row)
+                result.append(row)
+        return result
+
+    def delete(self, table, query):
+        filters, _, _ = self._parse(query)
+        with self.lock:
+            rows = self.tables.get(table, [])
+            removed = [row for row in rows if self._matches(row, filters)]
+            self.tables[table] = [row for row in rows if not self._matches(row, filters)]
+        return removed
+
+
+class StubUpstreamServer:
+    """네이버/KIS/수출입은행/Supabase 응답 형식을 흉내 내는 HTTP 서버
+
+    latency_ms/jitter_ms: 응답 지연, error_rate: 500 응답 비율 (외부 API별 dict로 개별 지정 가능)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.market = StubMarketData(seed)
+        self.db = StubTables()
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def env(self):
+        """앱이 대역 서버를 호출하도록 하는 환경 변수"""
+        return {
+            "KIS_API_BASE": self.url,
+            "NAVER_API_BASE": self.url,
+            "EXIM_API_BASE": self.url,
+            "SUPABASE_URL": self.url,
+            "SUPABASE_KEY": STUB_JWT,
+            "KIS_APP_KEY": "stub-app-key",
+            "KIS_APP_SECRET": "stub-app-secret",
+            "EXCHANGE_RATE_API_KEY": "stub-exim-key",
+        }
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def snapshot_counts(self):
+        with self._counts_lock:
+            return dict(self.counts)
+
+    def reset_counts(self):
+        with self._counts_lock:
+            self.counts.clear()
+
+    def _setting(self, value, upstream):
+        return value.get(upstream, value.get("default", 0)) if isinstance(value, dict) else value
+
+    def _simulate(self, upstream):
+        """지연 + 오류 주입 - 오류면 True"""
+        with self._counts_lock:
+            self.counts[upstream] = self.counts.get(upstream, 0) + 1
+            jitter = self._rng.uniform(-1, 1)
+            failed = self._rng.random() < self._setting(self.error_rate, upstream)
+
+        delay = self._setting(self.latency_ms, upstream) + jitter * self._setting(self.jitter_ms, upstream)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return failed
+
+    def handle(self, method, path, query, body):
+        """(상태 코드, 응답 객체)"""
+        if path == "/__stats":
+            return 200, {"counts": self.snapshot_counts()}
+        if path == "/__reset":
+            self.reset_counts()
+            return 200, {"reset": True}
+
+        upstream = upstream_of(path)
+        if self._simulate(upstream):
+            return 500, {"error": "injected failure", "upstream": upstream}
+
+        code = query.get("reutersCode", [""])[0]
+        if upstream == "naver_chart":
+            return 200, self.market.chart(code)
+        if upstream == "naver_market":
+            return 200, self.market.market_index(code)
+        if upstream == "exim":
+            return 200, [{"result": 1, "cur_unit": "USD", "deal_bas_r": "1,365.5"}, {"result": 1, "cur_unit": "JPY(100)", "deal_bas_r": "905.1"}]
+        if path.endswith("/tokenP"):
+            return 200, {"access_token": STUB_TOKEN, "token_type": "Bearer", "expires_in": 86400}
+        if path.endswith("/Approval"):
+            return 200, {"approval_key": "stub-approval-key"}
+        if upstream.startswith("kis:"):
+            symbol = (query.get("FID_INPUT_ISCD") or query.get("fid_input_iscd") or [""])[0]
+            if path.endswith("inquire-asking-price"):
+                return 200, self.market.futures_orderbook(symbol)
+            if path.endswith("inquire-daily-fuopchartprice"):
+                return 200, self.market.futures_daily(symbol)
+            return 200, self.market.futures_quote(symbol)
+        if upstream.startswith("supabase:"):
+            table = upstream.split(":", 1)[1]
+            if method == "GET":
+                return 200, self.db.select(table, query)
+            if method == "DELETE":
+                return 200, self.db.delete(table, query)
+            return 201, self.db.insert(table, body, query.get("on_conflict", [None])[0])
+        return 404, {"error": f"unknown path {path}"}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"null") if length else None
+                status, payload = server.handle(method, parsed.path, parse_qs(parsed.query), body)
+
+                data = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def start_stub_upstreams(port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=0):
+    """테스트용 대역 서버 시작 (port=0이면 임의 포트)"""
+    return StubUpstreamServer(port=port, latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate, seed=seed).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="외부 REST API 대역 서버")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=0, help="응답 지연 (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="지연 흔들림 폭 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = start_stub_upstreams(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    print(f"외부 API 대역 서버 실행 중: {server.url}")
+    for key, value in server.env().items():
+        print(f"  {key}={value}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,258 @@
+"""
+KIS 실시간(WebSocket) 시세 로컬 대역 서버 - 테스트/개발용
+
+    python -m stubs.kis_ws_server --port 21000 --interval 0.5
+
+KIS_WS_URL=ws://127.0.0.1:21000 으로 실행하면 실제 KIS 대신 가상 시세/호가를 수신합니다.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+QUOTE_TR_ID = "H0IFCNT0"
+ORDERBOOK_TR_ID = "H0IFASP0"
+
+
+def _handshake(conn):
+    request = b""
+    while b"\r\n\r\n" not in request:
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ConnectionError("핸드셰이크 중 연결 종료")
+        request += chunk
+
+    key = ""
+    for line in request.decode("latin-1").split("\r\n"):
+        if line.lower().startswith("sec-websocket-key:"):
+            key = line.split(":", 1)[1].strip()
+    accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+    conn.sendall((
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+    ).encode())
+
+
+def _recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("연결 종료")
+        data += chunk
+    return data
+
+
+def read_frame(conn):
+    """클라이언트 프레임 1개 읽기 → (opcode, payload)"""
+    first, second = _recv_exact(conn, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", _recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", _recv_exact(conn, 8))[0]
+
+    mask = _recv_exact(conn, 4) if second & 0x80 else None
+    payload = _recv_exact(conn, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def send_frame(conn, payload, opcode=0x1):
+    """서버 프레임 전송 (마스킹 없음)"""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 65536:
+        header += bytes([126]) + struct.pack(">H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack(">Q", len(payload))
+    conn.sendall(header + payload)
+
+
+class StubMarket:
+    """종목별 가상 시세 - 가격 랜덤워크, 누적 거래량 증가"""
+
+    def __init__(self, base_price=150000.0, tick=10.0, seed=None):
+        self.rng = random.Random(seed)
+        self.base_price = base_price
+        self.tick = tick
+        self.prices = {}
+        self.volumes = {}
+
+    def step(self, symbol):
+        price = self.prices.get(symbol, self.base_price) + self.rng.choice((-1, 0, 1)) * self.tick
+        self.prices[symbol] = price
+        self.volumes[symbol] = self.volumes.get(symbol, 0) + self.rng.randint(1, 20)
+        return price
+
+    def quote_message(self, symbol):
+        price = self.step(symbol)
+        fields = [
+            symbol, time.strftime("%H%M%S"), "0", "3", "0.00",
+            f"{price:.2f}", f"{self.base_price:.2f}", f"{max(price, self.base_price):.2f}",
+            f"{min(price, self.base_price):.2f}", "1",
+            str(self.volumes[symbol]), "0", "0", "0", "0",
+            "0", "0", "0", str(5000 + self.volumes[symbol] // 10), "0"
+        ]
+        return f"0|{QUOTE_TR_ID}|001|" + "^".join(fields)
+
+    def orderbook_message(self, symbol):
+        price = self.prices.get(symbol, self.base_price)
+        asks = [f"{price + self.tick * i:.2f}" for i in range(1, 6)]
+        bids = [f"{price - self.tick * (i - 1):.2f}" for i in range(1, 6)]
+        ask_qty = [self.rng.randint(1, 50) for _ in range(5)]
+        bid_qty = [self.rng.randint(1, 50) for _ in range(5)]
+        counts = [str(self.rng.randint(1, 10)) for _ in range(10)]
+        fields = (
+            [symbol, time.strftime("%H%M%S")] + asks + bids + counts
+            + [str(q) for q in ask_qty] + [str(q) for q in bid_qty]
+            + ["0", "0", str(sum(ask_qty)), str(sum(bid_qty)), "0", "0"]
+        )
+        return f"0|{ORDERBOOK_TR_ID}|001|" + "^".join(fields)
+
+
+class StubKisWebSocketServer:
+    """구독 등록 응답 + 주기적 시세/호가 푸시 + PINGPONG 송신
+
+    drop_after: 연결당 이 개수만큼 메시지를 보낸 뒤 끊음 (재연결 테스트용)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, interval=0.5, drop_after=None, seed=None):
+        self.interval = interval
+        self.drop_after = drop_after
+        self.market = StubMarket(seed=seed)
+        self.connections = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen()
+        self.host, self.port = self._sock.getsockname()
+        self._stop = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._sock.close()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        subscriptions = set()
+        lock = threading.Lock()
+        closed = threading.Event()
+
+        def reader():
+            try:
+                while not closed.is_set():
+                    opcode, payload = read_frame(conn)
+                    if opcode == 0x8:
+                        break
+                    if opcode == 0x9:
+                        with lock:
+                            send_frame(conn, payload, 0xA)
+                        continue
+                    if opcode != 0x1:
+                        continue
+                    request = json.loads(payload)
+                    header = request.get("header", {})
+                    if header.get("tr_id") == "PINGPONG":
+                        continue
+                    body = request.get("body", {}).get("input", {})
+                    key = (body.get("tr_id"), body.get("tr_key"))
+                    if header.get("tr_type") == "2":
+                        subscriptions.discard(key)
+                        msg = "UNSUBSCRIBE SUCCESS"
+                    else:
+                        subscriptions.add(key)
+                        msg = "SUBSCRIBE SUCCESS"
+                    with lock:
+                        send_frame(conn, json.dumps({
+                            "header": {"tr_id": key[0], "tr_key": key[1], "encrypt": "N"},
+                            "body": {"rt_cd": "0", "msg_cd": "OPSP0000", "msg1": msg}
+                        }))
+            except (ConnectionError, OSError, ValueError):
+                pass
+            finally:
+                closed.set()
+
+        try:
+            _handshake(conn)
+            threading.Thread(target=reader, daemon=True).start()
+
+            sent = 0
+            last_ping = time.time()
+            while not closed.is_set() and not self._stop.is_set():
+                for tr_id, symbol in sorted(subscriptions.copy()):
+                    message = (self.market.quote_message(symbol) if tr_id == QUOTE_TR_ID
+                               else self.market.orderbook_message(symbol))
+                    with lock:
+                        send_frame(conn, message)
+                    sent += 1
+
+                if time.time() - last_ping > 10:
+                    with lock:
+                        send_frame(conn, json.dumps({"header": {"tr_id": "PINGPONG", "datetime": time.strftime("%Y%m%d%H%M%S")}}))
+                    last_ping = time.time()
+
+                if self.drop_after is not None and sent >= self.drop_after:
+                    break
+                closed.wait(self.interval)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            closed.set()
+            try:
+                conn.shutdown(socket.SHUT_RDWR)  # reader 스레드의 recv 대기도 함께 종료
+                conn.close()
+            except OSError:
+                pass
+
+
+def start_stub_server(port=0, interval=0.5, drop_after=None, seed=None):
+    """테스트용 대역 서버 시작 (port=0이면 임의 포트)"""
+    return StubKisWebSocketServer(port=port, interval=interval, drop_after=drop_after, seed=seed).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KIS 실시간 시세 대역 서버")
+    parser.add_argument("--port", type=int, default=21000)
+    parser.add_argument("--interval", type=float, default=0.5, help="푸시 주기 (초)")
+    parser.add_argument("--drop-after", type=int, default=None, help="연결당 N건 전송 후 끊기")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.interval, args.drop_after)
+    print(f"KIS 실시간 대역 서버 실행 중: {server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,121 @@
+"""
+요청 단위 구간(span) 계측 - 외부 API/DB 호출과 계산 단계 소요 시간을 모아 Server-Timing 헤더와 샘플링 추적 로그로 출력
+
+추적 중이 아닐 때(백그라운드 스레드 등) span은 컨텍스트 조회 1회 외에 비용이 없음
+"""
+
+import time
+import random
+import functools
+import contextvars
+from contextlib import contextmanager
+
+from config import TRACE_LOG_SAMPLE_RATE, TRACE_SLOW_MS, TRACE_MAX_SPANS
+from structured_log import get_logger
+
+log = get_logger("trace")
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """요청 1건의 구간 목록 - 풀 스레드에서도 같은 객체에 추가 (list.append는 스레드 안전)"""
+
+    __slots__ = ("name", "started", "spans", "dropped")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []             # (이름, 시작 오프셋 ms, 소요 ms)
+        self.dropped = 0
+
+    def add(self, name, started, duration):
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append((name, (started - self.started) * 1000, duration * 1000))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self):
+        """이름별 (합계 ms, 횟수) - 등장 순서 유지"""
+        totals = {}
+        for name, _, duration in self.spans:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + duration, count + 1)
+        return totals
+
+
+def start_trace(name):
+    """현재 컨텍스트에서 추적 시작 (요청 시작/백그라운드 주기 시작 시)"""
+    trace = Trace(name)
+    _current.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+def end_trace():
+    """추적 종료 - 샘플링 대상이거나 느린 요청이면 구간 목록을 로그로 남기고 Trace 반환"""
+    trace = _current.get()
+    if trace is None:
+        return None
+    _current.set(None)
+
+    total = trace.total_ms()
+    if total >= TRACE_SLOW_MS or (TRACE_LOG_SAMPLE_RATE and random.random() < TRACE_LOG_SAMPLE_RATE):
+        log.info("추적: %s %.1fms", trace.name, total, extra={
+            "trace": trace.name,
+            "total_ms": round(total, 2),
+            "spans": [{"name": name, "start_ms": round(start, 2), "dur_ms": round(duration, 2)}
+                      for name, start, duration in trace.spans],
+            "dropped_spans": trace.dropped
+        })
+    return trace
+
+
+@contextmanager
+def span(name):
+    """구간 계측 - 추적 중이 아니면 아무것도 하지 않음"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, started, time.perf_counter() - started)
+
+
+def record_span(name, started, duration):
+    """이미 잰 구간 추가 (훅처럼 with 블록으로 감쌀 수 없는 곳)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, started, duration)
+
+
+def traced(name):
+    """함수 전체를 구간으로 계측하는 데코레이터"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(trace):
+    """Server-Timing 헤더 값 - 이름별 합계(동시 조회는 겹쳐서 합이 total보다 클 수 있음) + 전체"""
+    parts = []
+    for name, (total, count) in trace.summary().items():
+        desc = f';desc="{count} calls"' if count > 1 else ""
+        parts.append(f"{name};dur={total:.1f}{desc}")
+    parts.append(f"total;dur={trace.total_ms():.1f}")
+    return ", ".join(parts)